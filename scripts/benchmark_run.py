@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+后端基准测试
+
+通过 httpx.ASGITransport 直接驱动 FastAPI 应用（不经过网络和 uvicorn），
+对 webapp/api 下各路由的代表性接口按固定并发发起请求，输出 p50/p95/p99 延迟和吞吐量（JSON），
+便于不同版本之间对比。
+
+前置条件：先用 scripts/benchmark_seed.py 初始化基准数据库（默认 exds_bench）。
+
+用法：
+    python scripts/benchmark_run.py                              # 全部场景，结果打印到屏幕
+    python scripts/benchmark_run.py --requests 200 --concurrency 16 --output bench.json
+    python scripts/benchmark_run.py --only market_dashboard --only customer_list
+    python scripts/benchmark_run.py --baseline bench_old.json    # 与上次结果对比
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+os.environ.setdefault('MONGODB_DATABASE', 'exds_bench')
+
+import httpx
+
+from webapp.main import app
+from webapp.tools.mongo import DATABASE, DB_NAME
+from webapp.tools.security import create_access_token
+
+BENCH_USERNAME = 'bench'
+
+
+def build_scenarios():
+    """
+    根据基准库中的实际数据构造请求场景
+
+    Returns:
+        [(场景名, 路径, 查询参数)]
+    """
+    latest_price = DATABASE.day_ahead_spot_price.find_one({}, {'date_str': 1}, sort=[('datetime', -1)])
+    if not latest_price:
+        raise RuntimeError(f"基准库 {DB_NAME} 中没有价格数据，请先运行 scripts/benchmark_seed.py")
+    date = latest_price['date_str']
+    month = date[:7]
+    customer = DATABASE.customers.find_one({}, {'_id': 1})
+    contract = DATABASE.retail_contracts.find_one({}, {'_id': 1})
+    package = DATABASE.retail_packages.find_one({}, {'_id': 1})
+    model = DATABASE.pricing_models.find_one({}, {'model_code': 1})
+    load = DATABASE.user_load_data.find_one({}, {'meter_id': 1, 'user_id': 1, 'timestamp': 1})
+
+    scenarios = [
+        # 市场价格分析（v1.py）
+        ('market_dashboard', '/api/v1/market-analysis/dashboard', {'date_str': date}),
+        ('market_dashboard_month', '/api/v1/market-analysis/dashboard/range', {'start': f'{month}-01', 'end': date}),
+        ('market_dashboard_year', '/api/v1/market-analysis/dashboard/range',
+         {'start': (datetime.strptime(date, '%Y-%m-%d') - timedelta(days=364)).strftime('%Y-%m-%d'), 'end': date}),
+        ('market_extremes_top20', '/api/v1/market-analysis/extremes',
+         {'metric': 'max_positive_spread', 'start': '2000-01-01', 'end': date, 'limit': 20}),
+        ('market_day_ahead', '/api/v1/market-analysis/day-ahead', {'date': date}),
+        ('market_real_time', '/api/v1/market-analysis/real-time', {'date': date}),
+        ('market_price_bands', '/api/v1/market-analysis/price-bands', {'date': date, 'days': 90}),
+        ('market_spread_attribution', '/api/v1/market-analysis/spread-attribution', {'date': date}),
+        ('price_comparison', '/api/v1/price_comparison', {'date': date}),
+        ('price_comparison_week', '/api/v1/price_comparison',
+         {'start': (datetime.strptime(date, '%Y-%m-%d') - timedelta(days=6)).strftime('%Y-%m-%d'), 'end': date}),
+        ('timeslot_analysis', '/api/v1/timeslot_analysis', {'month': month, 'slot': '18:00'}),
+        ('price_matrix_month', '/api/v1/market-analysis/price-matrix', {'start': f'{month}-01', 'end': date}),
+        ('available_months', '/api/v1/available_months', {}),
+        ('pricing_models', '/api/v1/pricing-models', {}),
+        # 客户档案（v1_customers.py）
+        ('customer_list', '/api/v1/customers', {'page': 1, 'page_size': 20}),
+        ('customer_list_filtered', '/api/v1/customers', {'status': 'active', 'region': '南昌市', 'page': 2}),
+        ('customer_search', '/api/v1/customers', {'keyword': '基准0012'}),
+        # 零售合同（v1_retail_contracts.py）
+        ('contract_list', '/api/v1/retail-contracts', {'page': 1, 'page_size': 20}),
+        ('contract_list_filtered', '/api/v1/retail-contracts', {'customer_name': '基准', 'status': 'active'}),
+        # 零售套餐（v1_retail_packages.py）
+        ('package_list', '/api/v1/retail-packages', {'page': 1, 'page_size': 20}),
+    ]
+    if customer:
+        scenarios.append(('customer_detail', f"/api/v1/customers/{customer['_id']}", {}))
+    if contract:
+        scenarios.append(('contract_detail', f"/api/v1/retail-contracts/{contract['_id']}", {}))
+    if package:
+        scenarios.append(('package_detail', f"/api/v1/retail-packages/{package['_id']}", {}))
+    if model:
+        scenarios.append(('pricing_model_detail', f"/api/v1/pricing-models/{model['model_code']}", {}))
+    if load:
+        load_date = load['timestamp'].strftime('%Y-%m-%d')
+        scenarios += [
+            ('load_users', '/api/v1/users', {}),
+            ('load_meters', '/api/v1/meters', {'user_id': load['user_id']}),
+            ('load_curve', '/api/v1/load_curve', {'meter_id': load['meter_id'], 'date': load_date}),
+            ('load_curve_30d', '/api/v1/load_curve',
+             {'meter_id': load['meter_id'],
+              'date': [(load['timestamp'] - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(30)]}),
+            ('load_daily_energy', '/api/v1/daily_energy', {'meter_id': load['meter_id'], 'month': load_date[:7]}),
+            ('load_monthly_energy', '/api/v1/monthly_energy', {'meter_id': load['meter_id'], 'month': load_date[:7]}),
+            ('load_available_dates', '/api/v1/available-dates', {'meter_id': load['meter_id']}),
+        ]
+    return scenarios
+
+
+def percentile(sorted_values, pct):
+    """线性插值百分位数"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+async def run_scenario(client, path, params, requests, concurrency, warmup):
+    """按固定并发执行一个场景，返回统计结果"""
+    for _ in range(warmup):
+        await client.get(path, params=params)
+
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path, params=params)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    begin = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - begin
+
+    latencies.sort()
+    return {
+        'path': path,
+        'params': params,
+        'requests': requests,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'mean_ms': round(statistics.mean(latencies), 2),
+        'max_ms': round(latencies[-1], 2),
+        'throughput_rps': round(requests / elapsed, 2) if elapsed > 0 else None,
+    }
+
+
+def collection_volumes():
+    names = ['day_ahead_spot_price', 'real_time_spot_price', 'customers', 'retail_contracts',
+             'retail_packages', 'user_load_data', 'mp_load_curve', 'meter_data']
+    return {name: DATABASE[name].estimated_document_count() for name in names}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+async def run(args):
+    scenarios = build_scenarios()
+    if args.only:
+        scenarios = [s for s in scenarios if s[0] in args.only]
+
+    token = create_access_token({'sub': BENCH_USERNAME}, expires_delta=timedelta(hours=2))
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url='http://benchmark',
+                                 headers={'Authorization': f'Bearer {token}'}, timeout=120) as client:
+        for name, path, params in scenarios:
+            results[name] = await run_scenario(client, path, params, args.requests, args.concurrency, args.warmup)
+            r = results[name]
+            print(f"  {name:<28} p50={r['p50_ms']:>8.2f}ms p95={r['p95_ms']:>8.2f}ms "
+                  f"p99={r['p99_ms']:>8.2f}ms {r['throughput_rps']:>8.1f} req/s errors={r['errors']}",
+                  file=sys.stderr)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'database': DB_NAME,
+            'python': platform.python_version(),
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'warmup': args.warmup,
+            'volumes': collection_volumes(),
+        },
+        'results': results,
+    }
+
+
+def print_comparison(report, baseline):
+    """与基准结果对比（正数表示变慢）"""
+    print(f"\n与基准 {baseline['meta'].get('git_commit')} ({baseline['meta'].get('timestamp')}) 对比:",
+          file=sys.stderr)
+    for name, current in report['results'].items():
+        old = baseline.get('results', {}).get(name)
+        if not old:
+            continue
+        deltas = []
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if old.get(key):
+                deltas.append(f"{key[:3]} {(current[key] - old[key]) / old[key] * 100:+.1f}%")
+        print(f"  {name:<28} {'  '.join(deltas)}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='后端基准测试')
+    parser.add_argument('--requests', type=int, default=100, help='每个场景的请求数，默认 100')
+    parser.add_argument('--concurrency', type=int, default=8, help='并发数，默认 8')
+    parser.add_argument('--warmup', type=int, default=5, help='每个场景的预热请求数，默认 5')
+    parser.add_argument('--only', action='append', help='只运行指定场景（可多次指定）')
+    parser.add_argument('--output', help='结果 JSON 输出文件，默认打印到标准输出')
+    parser.add_argument('--baseline', help='对比用的历史结果 JSON 文件')
+    args = parser.parse_args()
+
+    print(f"基准数据库: {DB_NAME}，每场景 {args.requests} 次请求，并发 {args.concurrency}", file=sys.stderr)
+    report = asyncio.run(run(args))
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"结果已写入 {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            print_comparison(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
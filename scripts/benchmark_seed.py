@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+基准测试数据初始化脚本
+
+向独立的基准测试数据库写入可复现（固定随机种子）的合成数据：
+- day_ahead_spot_price / real_time_spot_price：N 天 × 96 点现货价格（24:00 记为次日 00:00）
+- tou_rules：全年分时电价规则
+- pricing_models / retail_packages：定价模型和零售套餐
+- customers：带户号、计量点、电表嵌套结构的客户档案
+- retail_contracts：关联上述客户和套餐的零售合同
+- users：基准测试登录用户
+
+数据库名通过环境变量 MONGODB_DATABASE 指定（默认 exds_bench），为防止误写生产库，
+库名不包含 "bench" 时需显式加 --force。
+
+用法：
+    python scripts/benchmark_seed.py --drop
+    python scripts/benchmark_seed.py --days 1095 --customers 5000 --contracts 50000 --drop
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+os.environ.setdefault('MONGODB_DATABASE', 'exds_bench')
+
+from dateutil.relativedelta import relativedelta
+
+from webapp.services.data_catalog import data_catalog
+from webapp.tools.mongo import DATABASE, DB_NAME
+from webapp.tools.indexes import ensure_indexes
+from webapp.tools.security import get_password_hash
+
+BENCH_USERNAME = 'bench'
+BENCH_PASSWORD = 'bench123'
+BATCH_SIZE = 5000
+
+# 分时规则（月份 -> 时段），与交易中心公布的规则结构一致
+TOU_TEMPLATE = [
+    ('尖峰', '18:00', '20:00'),
+    ('高峰', '08:00', '11:00'),
+    ('高峰', '17:00', '18:00'),
+    ('高峰', '20:00', '22:00'),
+    ('低谷', '00:00', '06:00'),
+    ('深谷', '11:00', '14:00'),
+]
+
+REGIONS = ['南昌市', '九江市', '赣州市', '上饶市', '宜春市', '吉安市', '抚州市', '萍乡市', '新余市', '鹰潭市', '景德镇市']
+INDUSTRIES = ['制造业', '商业', '电子', '化工', '纺织', '食品', '建材', '医药']
+USER_TYPES = ['大工业', '一般工商业']
+VOLTAGES = ['10kV', '35kV', '110kV']
+CUSTOMER_STATUSES = ['prospect', 'pending', 'active', 'active', 'active', 'suspended', 'terminated']
+PACKAGE_MODELS = [
+    ('fixed_linked_fee_time', 'time_based'),
+    ('fixed_linked_fee_non_time', 'non_time_based'),
+    ('single_comprehensive_fixed_time', 'time_based'),
+    ('single_comprehensive_fixed_non_time', 'non_time_based'),
+    ('price_spread_formula_time', 'time_based'),
+]
+
+
+def insert_batches(collection, docs):
+    """分批无序插入，返回插入条数"""
+    count, batch = 0, []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= BATCH_SIZE:
+            collection.insert_many(batch, ordered=False)
+            count += len(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+        count += len(batch)
+    return count
+
+
+def slot_time_str(slot):
+    """第 slot 个 15 分钟时段（1..96）的业务时刻字符串，最后一个时段为 24:00"""
+    minutes = slot * 15
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def generate_prices(rng, start_date, days, real_time=False):
+    """生成现货价格文档：每天 96 点，datetime 为时段结束时刻"""
+    for day_offset in range(days):
+        day = start_date + timedelta(days=day_offset)
+        date_str = day.strftime('%Y-%m-%d')
+        level = rng.uniform(280, 420)
+        for slot in range(1, 97):
+            hour = slot / 4
+            # 早晚双峰 + 午间光伏低谷
+            shape = 1 + 0.35 * (1 if 8 <= hour < 11 or 17 <= hour < 22 else 0) - 0.3 * (1 if 11 <= hour < 14 else 0)
+            noise = rng.gauss(0, 45 if real_time else 20)
+            price = max(0.0, round(level * shape + noise, 2))
+            solar = max(0.0, 3000 * (1 - abs(hour - 12.5) / 6)) if 6 <= hour <= 19 else 0.0
+            wind = rng.uniform(500, 2500)
+            total = rng.uniform(15000, 24000)
+            hydro = rng.uniform(800, 2000)
+            yield {
+                'datetime': day + timedelta(minutes=15 * slot),
+                'date_str': date_str,
+                'time_str': slot_time_str(slot),
+                'avg_clearing_price': price,
+                'total_clearing_power': round(total, 2),
+                'thermal_clearing_power': round(max(0.0, total - solar - wind - hydro), 2),
+                'hydro_clearing_power': round(hydro, 2),
+                'wind_clearing_power': round(wind, 2),
+                'solar_clearing_power': round(solar, 2),
+                'pumped_storage_clearing_power': round(rng.uniform(-300, 300), 2),
+                'battery_storage_clearing_power': round(rng.uniform(-100, 100), 2),
+            }
+
+
+def generate_tou_rules():
+    """全年分时规则"""
+    for period_type, start_time, end_time in TOU_TEMPLATE:
+        yield {'months': list(range(1, 13)), 'period_type': period_type,
+               'start_time': start_time, 'end_time': end_time}
+
+
+def generate_pricing_models():
+    for sort_order, (model_code, package_type) in enumerate(PACKAGE_MODELS, start=1):
+        yield {'model_code': model_code, 'display_name': model_code, 'package_type': package_type,
+               'enabled': True, 'sort_order': sort_order, 'created_at': datetime.utcnow(),
+               'updated_at': datetime.utcnow()}
+
+
+def generate_packages(rng, count):
+    now = datetime.utcnow()
+    for i in range(count):
+        model_code, package_type = PACKAGE_MODELS[i % len(PACKAGE_MODELS)]
+        yield {
+            'package_name': f'基准套餐{i + 1:04d}',
+            'package_description': '基准测试合成套餐',
+            'package_type': package_type,
+            'model_code': model_code,
+            'pricing_config': {'fixed_price_value': round(rng.uniform(0.35, 0.5), 4)},
+            'is_green_power': i % 7 == 0,
+            'status': 'active' if i % 5 else 'draft',
+            'created_by': BENCH_USERNAME,
+            'created_at': now - timedelta(days=i),
+            'updated_at': now - timedelta(days=i),
+        }
+
+
+def generate_customers(rng, count, metering_points_per_customer):
+    now = datetime.utcnow()
+    for i in range(count):
+        accounts = []
+        for a in range(rng.randint(1, 3)):
+            points = []
+            for p in range(rng.randint(1, metering_points_per_customer)):
+                points.append({
+                    'metering_point_id': f'MP{i:06d}{a}{p:02d}',
+                    'allocation_percentage': 100.0,
+                    'meter': {'meter_id': f'M{i:06d}{a}{p:02d}', 'multiplier': float(rng.choice([1, 40, 80, 200]))},
+                })
+            accounts.append({'account_id': f'36{i:08d}{a}', 'metering_points': points})
+        created = now - timedelta(minutes=i)
+        yield {
+            'user_name': f'江西基准测试{rng.choice(INDUSTRIES)}有限公司{i + 1:05d}',
+            'short_name': f'基准{i + 1:05d}',
+            'user_type': rng.choice(USER_TYPES),
+            'industry': rng.choice(INDUSTRIES),
+            'voltage': rng.choice(VOLTAGES),
+            'region': rng.choice(REGIONS),
+            'status': rng.choice(CUSTOMER_STATUSES),
+            'utility_accounts': accounts,
+            'created_by': BENCH_USERNAME,
+            'updated_by': BENCH_USERNAME,
+            'created_at': created,
+            'updated_at': created,
+        }
+
+
+def generate_contracts(rng, count, customers, packages, start_month):
+    now = datetime.utcnow()
+    for i in range(count):
+        customer = customers[i % len(customers)]
+        package = rng.choice(packages)
+        # 同一客户的合同按年顺延，避免日期范围重叠
+        start = start_month + relativedelta(years=i // len(customers))
+        end = start + relativedelta(months=11)
+        yield {
+            'contract_name': f"{customer['short_name']}{start.year}年度零售合同",
+            'package_name': package['package_name'],
+            'package_id': str(package['_id']),
+            'customer_name': customer['user_name'],
+            'customer_id': str(customer['_id']),
+            'purchasing_electricity_quantity': round(rng.uniform(1e5, 5e7), 2),
+            'purchase_start_month': start,
+            'purchase_end_month': end,
+            'package_snapshot': {'package_type': package['package_type'], 'model_code': package['model_code'],
+                                 'is_green_power': package['is_green_power'],
+                                 'pricing_config': package['pricing_config']},
+            'created_by': BENCH_USERNAME,
+            'created_at': now - timedelta(seconds=i),
+            'updated_by': BENCH_USERNAME,
+            'updated_at': now - timedelta(seconds=i),
+        }
+
+
+def seed(days, start_date, customers, contracts, packages, metering_points, random_seed):
+    """写入全部基准数据，返回各集合写入条数"""
+    rng = random.Random(random_seed)
+    counts = {}
+
+    def timed(name, func):
+        begin = time.perf_counter()
+        counts[name] = func()
+        print(f"  ✅ {name}: {counts[name]} 条 ({time.perf_counter() - begin:.1f}s)")
+
+    timed('day_ahead_spot_price',
+          lambda: insert_batches(DATABASE.day_ahead_spot_price, generate_prices(rng, start_date, days)))
+    timed('real_time_spot_price',
+          lambda: insert_batches(DATABASE.real_time_spot_price, generate_prices(rng, start_date, days, real_time=True)))
+    # 价格写入后重建数据日期目录（available_months 接口）
+    for name in ('day_ahead_spot_price', 'real_time_spot_price'):
+        data_catalog.rebuild(name)
+    timed('tou_rules', lambda: insert_batches(DATABASE.tou_rules, generate_tou_rules()))
+    timed('pricing_models', lambda: insert_batches(DATABASE.pricing_models, generate_pricing_models()))
+    timed('retail_packages', lambda: insert_batches(DATABASE.retail_packages, generate_packages(rng, packages)))
+    timed('customers',
+          lambda: insert_batches(DATABASE.customers, generate_customers(rng, customers, metering_points)))
+
+    customer_docs = list(DATABASE.customers.find({}, {'user_name': 1, 'short_name': 1}))
+    package_docs = list(DATABASE.retail_packages.find({}))
+    contract_start = datetime(start_date.year, start_date.month, 1)
+    timed('retail_contracts', lambda: insert_batches(
+        DATABASE.retail_contracts, generate_contracts(rng, contracts, customer_docs, package_docs, contract_start)))
+
+    DATABASE.users.update_one(
+        {'username': BENCH_USERNAME},
+        {'$set': {'username': BENCH_USERNAME, 'hashed_password': get_password_hash(BENCH_PASSWORD),
+                  'full_name': '基准测试用户', 'is_active': True}},
+        upsert=True)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='基准测试数据初始化')
+    parser.add_argument('--days', type=int, default=730, help='现货价格天数，默认 730（两年）')
+    parser.add_argument('--start-date', default='2023-01-01', help='价格起始日期，默认 2023-01-01')
+    parser.add_argument('--customers', type=int, default=2000, help='客户数，默认 2000')
+    parser.add_argument('--metering-points', type=int, default=4, help='每个户号最多计量点数，默认 4')
+    parser.add_argument('--packages', type=int, default=50, help='套餐数，默认 50')
+    parser.add_argument('--contracts', type=int, default=20000, help='合同数，默认 20000')
+    parser.add_argument('--seed', type=int, default=20240101, help='随机种子，默认 20240101')
+    parser.add_argument('--drop', action='store_true', help='写入前删除整个基准数据库')
+    parser.add_argument('--force', action='store_true', help='允许写入库名不含 bench 的数据库')
+    args = parser.parse_args()
+
+    if 'bench' not in DB_NAME and not args.force:
+        print(f"❌ 当前数据库为 '{DB_NAME}'，为防止误写生产库，请设置 MONGODB_DATABASE 为基准库或加 --force")
+        sys.exit(1)
+
+    if args.drop:
+        DATABASE.client.drop_database(DB_NAME)
+        print(f"已删除数据库 {DB_NAME}")
+
+    print(f"创建索引（{DB_NAME}）...")
+    ensure_indexes(DATABASE)
+
+    print("写入基准数据...")
+    start_date = datetime.strptime(args.start_date, '%Y-%m-%d')
+    seed(args.days, start_date, args.customers, args.contracts, args.packages, args.metering_points, args.seed)
+    print("完成。")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+数据日期目录重建脚本
+
+全量重建 data_catalog 集合（见 webapp/services/data_catalog.py）。
+接口读取目录时只读：目录范围之外的新数据、没有目录或旧口径的分组当场聚合后返回，不写回目录。
+外部导入数据、区间内删除或补录数据后执行本脚本，把结果保存到目录，读取不再重复聚合。
+负荷数据目录已改为业务日口径（D+1 00:00 归入 D），升级后执行 --dataset user_load_data 重建全部电表。
+
+用法：
+    python scripts/build_data_catalog.py                                   # 重建全部数据集
+    python scripts/build_data_catalog.py --dataset day_ahead_spot_price    # 只重建指定数据集
+    python scripts/build_data_catalog.py --dataset user_load_data --key 电表ID
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from webapp.services.data_catalog import CATALOG_COLLECTION, DATASETS, data_catalog
+from webapp.tools.indexes import ensure_indexes
+from webapp.tools.mongo import DATABASE, DB_NAME
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据日期目录重建')
+    parser.add_argument('--dataset', choices=list(DATASETS), action='append',
+                        help='只重建指定数据集，可重复指定，默认全部')
+    parser.add_argument('--key', help='只重建指定分组键（如电表ID）')
+    args = parser.parse_args()
+
+    ensure_indexes(DATABASE, [CATALOG_COLLECTION])
+
+    for dataset in args.dataset or list(DATASETS):
+        begin = time.perf_counter()
+        count = data_catalog.rebuild(dataset, args.key)
+        print(f"{DB_NAME}.{CATALOG_COLLECTION}: {dataset} 写入 {count} 条目录，"
+              f"用时 {time.perf_counter() - begin:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
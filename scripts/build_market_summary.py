@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+现货市场日汇总构建脚本
+
+增量维护 market_daily_summary 集合（见 webapp/services/market_summary.py）：
+按业务日比较日前/实时价格集合的源数据指纹，只重算新到、补齐或订正的业务日。
+建议在价格数据导入任务之后执行，或用 cron 定时执行（例如每 15 分钟）。
+
+用法：
+    python scripts/build_market_summary.py                          # 增量构建全部业务日
+    python scripts/build_market_summary.py --start 2025-01-01       # 只检查指定日期之后
+    python scripts/build_market_summary.py --full                   # 全部重算（KPI 口径调整后）
+    python scripts/build_market_summary.py --dry-run                # 只统计需要重算的业务日
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from webapp.services.market_summary import SUMMARY_COLLECTION, market_summary_service
+from webapp.tools.indexes import ensure_indexes
+from webapp.tools.mongo import DATABASE, DB_NAME
+
+
+def main():
+    parser = argparse.ArgumentParser(description='现货市场日汇总构建')
+    parser.add_argument('--start', help='起始业务日 YYYY-MM-DD（含）')
+    parser.add_argument('--end', help='结束业务日 YYYY-MM-DD（含）')
+    parser.add_argument('--full', action='store_true', help='忽略源数据指纹，全部重算')
+    parser.add_argument('--dry-run', action='store_true', help='只统计需要重算的业务日，不写入')
+    args = parser.parse_args()
+
+    ensure_indexes(DATABASE, [SUMMARY_COLLECTION])
+
+    begin = time.perf_counter()
+    stats = market_summary_service.build(args.start, args.end, full=args.full, dry_run=args.dry_run)
+    elapsed = time.perf_counter() - begin
+
+    action = '需要重算' if args.dry_run else '已重算'
+    print(f"{DB_NAME}.{SUMMARY_COLLECTION}: 检查 {stats['checked']} 个业务日，{action} {stats['changed']} 个，"
+          f"写入 {stats['written']} 条，删除 {stats['deleted']} 条，用时 {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
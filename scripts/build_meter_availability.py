@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+电表数据可用性位图重建脚本
+
+由 user_load_data 全量重建 meter_availability 集合（见 webapp/services/meter_availability.py）。
+写入负荷数据时已同步登记位图，只有删除负荷数据或首次启用时才需要执行本脚本。
+
+用法：
+    python scripts/build_meter_availability.py                    # 重建全部电表
+    python scripts/build_meter_availability.py --meter 电表ID     # 只重建指定电表，可重复指定
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from webapp.services.meter_availability import AVAILABILITY_COLLECTION, meter_availability
+from webapp.tools.indexes import ensure_indexes
+from webapp.tools.mongo import DATABASE, DB_NAME
+
+
+def main():
+    parser = argparse.ArgumentParser(description='电表数据可用性位图重建')
+    parser.add_argument('--meter', action='append', help='只重建指定电表，可重复指定，默认全部')
+    args = parser.parse_args()
+
+    ensure_indexes(DATABASE, [AVAILABILITY_COLLECTION])
+
+    begin = time.perf_counter()
+    written = meter_availability.rebuild(args.meter)
+    print(f"{DB_NAME}.{AVAILABILITY_COLLECTION}: 写入 {written} 条位图，用时 {time.perf_counter() - begin:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
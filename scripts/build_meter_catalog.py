@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+用户/电表目录重建脚本
+
+由 user_load_data 重建 meter_catalog 集合（见 webapp/services/meter_catalog.py）。
+首次部署必须执行一次（目录为空时 /users 接口返回 503）；之后写入负荷数据时已同步登记目录，
+删除或外部导入负荷数据后再执行本脚本补齐点数并清理目录。
+
+用法：
+    python scripts/build_meter_catalog.py                     # 重建全部用户
+    python scripts/build_meter_catalog.py --user 用户ID       # 只重建指定用户的电表
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from webapp.services.meter_catalog import METER_CATALOG_COLLECTION, meter_catalog
+from webapp.tools.indexes import ensure_indexes
+from webapp.tools.mongo import DATABASE, DB_NAME
+
+
+def main():
+    parser = argparse.ArgumentParser(description='用户/电表目录重建')
+    parser.add_argument('--user', help='只重建指定用户的电表')
+    args = parser.parse_args()
+
+    ensure_indexes(DATABASE, [METER_CATALOG_COLLECTION])
+
+    begin = time.perf_counter()
+    count = meter_catalog.rebuild(args.user)
+    print(f"{DB_NAME}.{METER_CATALOG_COLLECTION}: 写入 {count} 条目录，用时 {time.perf_counter() - begin:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
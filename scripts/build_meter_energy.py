@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+电表日电量汇总重建脚本
+
+重建 meter_daily_energy 集合（见 webapp/services/meter_energy.py）。
+接口读取时对新增数据、分时规则变化的业务日当场计算但不保存；写入负荷数据的程序已调用 record() 时无需执行。
+- --sync：增量保存汇总范围之外的新数据（外部导入）和分时规则/结构版本变化的业务日
+- 默认全量重建：区间内补录或删除负荷数据后使用
+
+用法：
+    python scripts/build_meter_energy.py                                        # 重建全部电表
+    python scripts/build_meter_energy.py --sync                                 # 增量保存全部电表
+    python scripts/build_meter_energy.py --meter 电表ID                          # 只重建指定电表，可重复指定
+    python scripts/build_meter_energy.py --meter 电表ID --start 2025-01-01 --end 2025-01-31
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from webapp.services.meter_energy import LOAD_COLLECTION, ROLLUP_COLLECTION, meter_energy_service
+from webapp.tools.indexes import ensure_indexes
+from webapp.tools.mongo import DATABASE, DB_NAME
+
+
+def main():
+    parser = argparse.ArgumentParser(description='电表日电量汇总重建')
+    parser.add_argument('--meter', action='append', help='只重建指定电表，可重复指定，默认全部')
+    parser.add_argument('--start', help='起始业务日 YYYY-MM-DD（含）')
+    parser.add_argument('--end', help='结束业务日 YYYY-MM-DD（含）')
+    parser.add_argument('--sync', action='store_true', help='只增量保存新数据和分时规则变化的业务日（忽略 --start/--end）')
+    args = parser.parse_args()
+
+    ensure_indexes(DATABASE, [ROLLUP_COLLECTION])
+
+    meters = args.meter or sorted(set(DATABASE[LOAD_COLLECTION].distinct('meter_id'))
+                                  | set(DATABASE[ROLLUP_COLLECTION].distinct('meter_id')))
+    begin = time.perf_counter()
+    written = 0
+    for i, meter_id in enumerate(meters, start=1):
+        if args.sync:
+            written += meter_energy_service.sync(meter_id)
+        else:
+            written += meter_energy_service.rebuild(meter_id, args.start, args.end)
+        print(f"  进度 {i}/{len(meters)}，写入 {written:,} 条", end='\r')
+    print()
+    print(f"{DB_NAME}.{ROLLUP_COLLECTION}: {len(meters)} 个电表写入 {written:,} 条日汇总，"
+          f"用时 {time.perf_counter() - begin:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
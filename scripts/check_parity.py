@@ -0,0 +1,958 @@
+#!/usr/bin/env python3
+"""
+数值路径一致性检查
+
+向量化/批量改写后的数值计算，与改写前的逐点循环（参照实现，照搬旧接口的写法）在固定夹具上逐项比对：
+- 夹具由固定随机种子生成，覆盖缺失时段、缺失字段、零电量、并列极值，
+  以及 24:00（次日 00:00）时段和跨零点的分时规则
+- 不连接 MongoDB：源数据放在内存夹具集合中，直接调用服务层/接口层的计算函数
+- 浮点数按相对误差 1e-9 比较（求和顺序不同带来的舍入差异），其余字段要求完全一致
+
+用法：
+    python scripts/check_parity.py                     # 运行全部检查
+    python scripts/check_parity.py --only market_kpi   # 只运行指定检查，可重复指定
+
+任一检查不一致时打印首个差异的位置并以退出码 1 结束。
+"""
+
+import argparse
+import math
+import operator
+import os
+import random
+import statistics
+import sys
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from webapp.api import v1
+from webapp.services import market_kpi, tou_aggregation
+from webapp.services.meter_availability import AVAILABILITY_COLLECTION, LOAD_COLLECTION, MeterAvailability
+from webapp.services.market_summary import SUMMARY_COLLECTION, SUMMARY_VERSION, MarketSummaryService
+from webapp.services.meter_energy import ROLLUP_COLLECTION, MeterEnergyService
+from webapp.services.price_cube import MARKET_COLLECTIONS, PRICE_FIELDS, SLOT_TIME_STRS, PriceCube, load_span
+from webapp.services.tou_service import TouService, build_tou_map
+
+SEED = 20250101
+# 夹具业务日：跨月，且包含一个没有日前数据的业务日
+FIXTURE_START = date(2025, 1, 29)
+FIXTURE_DAYS = 5
+FIXTURE_MISSING_DAY = date(2025, 1, 31)
+
+# 分时规则夹具：重叠规则按优先级覆盖、非整刻规则、跨零点的低谷（拆成两段）、起点晚于终点的规则（不覆盖任何时段）
+FIXTURE_TOU_RULES = [
+    {'months': [1, 2], 'period_type': '低谷', 'start_time': '00:00', 'end_time': '08:00'},
+    {'months': [1, 2], 'period_type': '低谷', 'start_time': '23:00', 'end_time': '24:00'},
+    {'months': [1, 2], 'period_type': '高峰', 'start_time': '08:00', 'end_time': '12:00'},
+    {'months': [1, 2], 'period_type': '高峰', 'start_time': '17:00', 'end_time': '21:00'},
+    {'months': [1], 'period_type': '尖峰', 'start_time': '18:00', 'end_time': '20:00'},
+    {'months': [2], 'period_type': '深谷', 'start_time': '02:10', 'end_time': '05:00'},
+    {'months': [2], 'period_type': '深谷', 'start_time': '22:30', 'end_time': '01:00'},
+]
+
+
+# ##############################################################################
+# 夹具
+# ##############################################################################
+
+_COMPARISONS = {'$gt': operator.gt, '$gte': operator.ge, '$lt': operator.lt, '$lte': operator.le}
+
+
+def _field(doc, path: str):
+    """按点号路径取字段（如 extremes.max_rt_price）"""
+    for name in path.split('.'):
+        doc = doc.get(name) if isinstance(doc, dict) else None
+    return doc
+
+
+def _matches(value, condition) -> bool:
+    """单个字段的查询条件"""
+    if not (isinstance(condition, dict) and condition and all(key.startswith('$') for key in condition)):
+        return value == condition
+    for op, operand in condition.items():
+        if op == '$in':
+            ok = value in operand
+        elif op == '$nin':
+            ok = value not in operand
+        elif op == '$ne':
+            ok = value != operand
+        else:
+            ok = value is not None and _COMPARISONS[op](value, operand)
+        if not ok:
+            return False
+    return True
+
+
+class FixtureCollection:
+    """
+    内存夹具集合：只支持计算函数用到的查询（等值、$gt/$gte/$lt/$lte/$in/$nin/$ne、$or，字段可为点号路径）、排序和 limit，
+    以及位图维护用到的写入（replace_one、delete_many、update_one 的 $set/$setOnInsert/$bit or）
+    """
+
+    def __init__(self, docs):
+        self.docs = [dict(doc) for doc in docs]
+
+    def _match(self, doc, query) -> bool:
+        for key, condition in (query or {}).items():
+            if key == '$or':
+                if not any(self._match(doc, branch) for branch in condition):
+                    return False
+            elif not _matches(_field(doc, key), condition):
+                return False
+        return True
+
+    def find(self, query=None, projection=None, sort=None):
+        return _FixtureCursor([dict(doc) for doc in self.docs if self._match(doc, query)], sort)
+
+    def find_one(self, query=None, projection=None, sort=None):
+        return next(iter(self.find(query, projection, sort)), None)
+
+    def delete_many(self, query):
+        self.docs = [doc for doc in self.docs if not self._match(doc, query)]
+
+    def replace_one(self, query, doc, upsert=False):
+        self.delete_many(query)
+        self.docs.append(dict(doc))
+
+    def update_one(self, query, update, upsert=False):
+        doc = next((doc for doc in self.docs if self._match(doc, query)), None)
+        if doc is None:
+            doc = {key: value for key, value in query.items() if not key.startswith('$')}
+            doc.update({key: list(value) if isinstance(value, list) else value
+                        for key, value in update.get('$setOnInsert', {}).items()})
+            self.docs.append(doc)
+        doc.update(update.get('$set', {}))
+        for path, operation in update.get('$bit', {}).items():
+            field, index = path.split('.')
+            doc[field][int(index)] = doc[field][int(index)] | operation['or']
+
+
+class _FixtureCursor(list):
+    def __init__(self, docs, sort=None):
+        super().__init__(docs)
+        if sort:
+            self.sort(sort)
+
+    def sort(self, key, direction=None):
+        keys = [(key, direction or 1)] if isinstance(key, str) else list(key)
+        for field, order in reversed(keys):
+            super().sort(key=lambda doc: _field(doc, field), reverse=order < 0)
+        return self
+
+    def limit(self, count):
+        del self[count:]
+        return self
+
+
+def _fixture_dates():
+    return [FIXTURE_START + timedelta(days=i) for i in range(FIXTURE_DAYS)]
+
+
+def _price_docs(market: str):
+    """
+    现货价格夹具文档（与 Mongo 中的结构一致：datetime 为时段结束时刻，24:00 记为次日 00:00）
+
+    随机缺失时段和字段（字段缺失而不是 None，与旧接口 doc.get(字段, 0) 的读法一致），
+    偶尔为零电量、与上一时段价格相同（并列极值）
+    """
+    rng = random.Random(f'{SEED}-{market}')
+    missing_slot = 0.03 if market == 'day_ahead' else 0.06
+    docs, previous = [], None
+    for day in _fixture_dates():
+        if market == 'day_ahead' and day == FIXTURE_MISSING_DAY:
+            continue
+        day_start = datetime.combine(day, datetime.min.time())
+        for slot in range(96):
+            if rng.random() < missing_slot:
+                continue
+            doc = {'datetime': day_start + timedelta(minutes=15 * (slot + 1)), 'date_str': day.strftime('%Y-%m-%d'),
+                   'time_str': SLOT_TIME_STRS[slot]}
+            for name in PRICE_FIELDS:
+                if name != 'total_clearing_power' and rng.random() < 0.05:
+                    continue
+                if name == 'avg_clearing_price':
+                    value = previous if previous is not None and rng.random() < 0.05 else round(rng.uniform(-50, 800), 2)
+                    previous = value
+                elif name == 'total_clearing_power' and rng.random() < 0.05:
+                    value = 0
+                else:
+                    value = round(rng.uniform(0, 3000), 3)
+                doc[name] = value
+            docs.append(doc)
+    return docs
+
+
+def _price_arrays():
+    """夹具价格经价格立方体的加载路径转换为 (天数, 96, 字段数) 数组"""
+    first, last = _fixture_dates()[0], _fixture_dates()[-1]
+    return (load_span(FixtureCollection(_price_docs('day_ahead')), first, last),
+            load_span(FixtureCollection(_price_docs('real_time')), first, last))
+
+
+def _fixture_tou_service(rules=FIXTURE_TOU_RULES) -> TouService:
+    """读取夹具分时规则的分时时段服务"""
+    return TouService(SimpleNamespace(tou_rules=FixtureCollection(rules)))
+
+
+def _fixture_price_cube(enabled: bool) -> PriceCube:
+    """从夹具价格加载的价格立方体；enabled 为 False 时接口走直接查询集合的路径"""
+    cube = PriceCube({name: FixtureCollection(_price_docs(market)) for market, name in MARKET_COLLECTIONS.items()})
+    cube._enabled = enabled
+    return cube
+
+
+# ##############################################################################
+# 参照实现（改写前的逐点循环）
+# ##############################################################################
+
+def old_tou_map(rules, month: int):
+    """改写前的 get_tou_rule_for_date：逐个时刻 strptime 比较"""
+    rules = [rule for rule in rules if month in rule['months']]
+    time_to_period_map = {}
+    for i in range(96):
+        time_obj = datetime(2000, 1, 1) + timedelta(minutes=15 * i)
+        time_to_period_map[time_obj.strftime("%H:%M")] = "平段"
+
+    priority = ["高峰", "低谷", "尖峰", "深谷"]
+    sorted_rules = sorted(rules, key=lambda r: priority.index(r['period_type']) if r['period_type'] in priority else -1)
+
+    for rule in sorted_rules:
+        start = datetime.strptime(rule['start_time'], '%H:%M').time()
+        end_time_str = rule['end_time']
+        for time_str in time_to_period_map:
+            current_time = datetime.strptime(time_str, '%H:%M').time()
+            if end_time_str == '24:00':
+                if current_time >= start:
+                    time_to_period_map[time_str] = rule['period_type']
+            else:
+                end = datetime.strptime(end_time_str, '%H:%M').time()
+                if start <= current_time < end:
+                    time_to_period_map[time_str] = rule['period_type']
+    return time_to_period_map
+
+
+def old_dashboard(da_docs, rt_docs, tou_map_of):
+    """
+    改写前的市场总览逐点循环（财务 / 风险 KPI、时序、分时段汇总）
+
+    Args:
+        da_docs / rt_docs: 按 datetime 升序的价格文档（可以跨多个业务日）
+        tou_map_of: 业务日 -> 分时时段映射
+    """
+    rt_map = {(doc['date_str'], doc['time_str']): doc for doc in rt_docs}
+    time_series = []
+    da_weighted_sum, da_volume_sum, rt_weighted_sum, rt_volume_sum = 0, 0, 0, 0
+    da_prices, rt_prices = [], []
+    max_positive_spread = {"value": float('-inf'), "time_str": "", "period": 0, "date": None}
+    max_negative_spread = {"value": float('inf'), "time_str": "", "period": 0, "date": None}
+    max_rt_price = {"value": float('-inf'), "time_str": "", "period": 0, "date": None}
+    min_rt_price = {"value": float('inf'), "time_str": "", "period": 0, "date": None}
+    period_collector = {}
+
+    for i, da_doc in enumerate(da_docs):
+        period = i + 1
+        time_str = da_doc.get("time_str")
+        rt_doc = rt_map.get((da_doc['date_str'], time_str), {})
+        da_price = da_doc.get('avg_clearing_price')
+        da_volume = da_doc.get('total_clearing_power', 0)
+        rt_price = rt_doc.get('avg_clearing_price')
+        rt_volume = rt_doc.get('total_clearing_power', 0)
+        rt_wind = rt_doc.get('wind_clearing_power', 0)
+        rt_solar = rt_doc.get('solar_clearing_power', 0)
+        spread = (rt_price - da_price) if (rt_price is not None and da_price is not None) else None
+        period_type = tou_map_of(da_doc['date_str']).get(time_str, "平段")
+        time_series.append({"period": period, "time": time_str, "time_str": time_str, "price_rt": rt_price,
+                            "price_da": da_price, "volume_rt": rt_volume, "volume_da": da_volume,
+                            "spread": spread, "period_type": period_type})
+
+        if da_price is not None and da_volume > 0:
+            da_weighted_sum += da_price * da_volume
+            da_volume_sum += da_volume
+            da_prices.append(da_price)
+        if rt_price is not None and rt_volume > 0:
+            rt_weighted_sum += rt_price * rt_volume
+            rt_volume_sum += rt_volume
+            rt_prices.append(rt_price)
+
+        point = {"time_str": time_str, "period": period, "date": da_doc['date_str']}
+        if spread is not None:
+            if spread > max_positive_spread["value"]:
+                max_positive_spread.update(value=spread, **point)
+            if spread < max_negative_spread["value"]:
+                max_negative_spread.update(value=spread, **point)
+        if rt_price is not None:
+            if rt_price > max_rt_price["value"]:
+                max_rt_price.update(value=rt_price, **point)
+            if rt_price < min_rt_price["value"]:
+                min_rt_price.update(value=rt_price, **point)
+
+        collector = period_collector.setdefault(period_type, {
+            "da_weighted_sum": 0, "da_volume_sum": 0, "rt_weighted_sum": 0, "rt_volume_sum": 0,
+            "rt_wind_sum": 0, "rt_solar_sum": 0, "count": 0})
+        if da_price is not None and da_volume > 0:
+            collector["da_weighted_sum"] += da_price * da_volume
+            collector["da_volume_sum"] += da_volume
+        if rt_price is not None and rt_volume > 0:
+            collector["rt_weighted_sum"] += rt_price * rt_volume
+            collector["rt_volume_sum"] += rt_volume
+            collector["rt_wind_sum"] += rt_wind
+            collector["rt_solar_sum"] += rt_solar
+            collector["count"] += 1
+
+    vwap_da = da_weighted_sum / da_volume_sum if da_volume_sum > 0 else None
+    vwap_rt = rt_weighted_sum / rt_volume_sum if rt_volume_sum > 0 else None
+    financial_kpis = {"vwap_rt": vwap_rt, "vwap_da": vwap_da,
+                      "vwap_spread": (vwap_rt - vwap_da) if (vwap_rt is not None and vwap_da is not None) else None,
+                      "twap_rt": statistics.mean(rt_prices) if rt_prices else None,
+                      "twap_da": statistics.mean(da_prices) if da_prices else None}
+    risk_kpis = {
+        "max_positive_spread": max_positive_spread if max_positive_spread["value"] != float('-inf') else None,
+        "max_negative_spread": max_negative_spread if max_negative_spread["value"] != float('inf') else None,
+        "max_rt_price": max_rt_price if max_rt_price["value"] != float('-inf') else None,
+        "min_rt_price": min_rt_price if min_rt_price["value"] != float('inf') else None,
+    }
+    period_summary = []
+    for period_name in ["尖峰", "高峰", "平段", "低谷", "深谷"]:
+        if period_name not in period_collector:
+            continue
+        data = period_collector[period_name]
+        vwap_da_period = data["da_weighted_sum"] / data["da_volume_sum"] if data["da_volume_sum"] > 0 else None
+        vwap_rt_period = data["rt_weighted_sum"] / data["rt_volume_sum"] if data["rt_volume_sum"] > 0 else None
+        period_summary.append({
+            "period_name": period_name, "vwap_da": vwap_da_period, "vwap_rt": vwap_rt_period,
+            "vwap_spread": (vwap_rt_period - vwap_da_period) if (vwap_rt_period and vwap_da_period) else None,
+            "avg_volume_rt": data["rt_volume_sum"] / data["count"] if data["count"] > 0 else None,
+            "renewable_ratio": (data["rt_wind_sum"] + data["rt_solar_sum"]) / data["rt_volume_sum"]
+            if data["rt_volume_sum"] > 0 else None,
+        })
+    return {"financial_kpis": financial_kpis, "risk_kpis": risk_kpis, "time_series": time_series,
+            "period_summary": period_summary}
+
+
+def old_price_comparison(day: str, da_docs, rt_docs, tou_rules):
+    """改写前的单日价格对比：日历日 [D 00:00, D+1 00:00) 逐个时刻取价格，逐个时段收集后统计"""
+    start_date = datetime.strptime(day, "%Y-%m-%d")
+    da_price_map = {doc['datetime']: doc for doc in da_docs}
+    rt_price_map = {doc['datetime']: doc for doc in rt_docs}
+
+    chart_data, da_prices_for_stats, rt_prices_for_stats = [], [], []
+    tou_stats_collector = {period: {"da": [], "rt": []} for period in set(tou_rules.values())}
+    for i in range(96):
+        time_obj = start_date + timedelta(minutes=15 * i)
+        da_doc = da_price_map.get(time_obj)
+        rt_doc = rt_price_map.get(time_obj)
+        da_price = da_doc.get('avg_clearing_price') if da_doc else None
+        rt_price = rt_doc.get('avg_clearing_price') if rt_doc else None
+        time_str = time_obj.strftime("%H:%M")
+        period_type = tou_rules.get(time_str, "平段")
+        chart_data.append({"time": time_str, "day_ahead_price": da_price, "real_time_price": rt_price,
+                           "period_type": period_type})
+        if da_price is not None:
+            da_prices_for_stats.append(da_price)
+            if period_type in tou_stats_collector:
+                tou_stats_collector[period_type]["da"].append(da_price)
+        if rt_price is not None:
+            rt_prices_for_stats.append(rt_price)
+            if period_type in tou_stats_collector:
+                tou_stats_collector[period_type]["rt"].append(rt_price)
+
+    stats = {
+        "day_ahead_avg": statistics.mean(da_prices_for_stats) if da_prices_for_stats else None,
+        "day_ahead_std_dev": statistics.stdev(da_prices_for_stats) if len(da_prices_for_stats) > 1 else 0,
+        "day_ahead_max": max(da_prices_for_stats) if da_prices_for_stats else None,
+        "day_ahead_min": min(da_prices_for_stats) if da_prices_for_stats else None,
+        "real_time_avg": statistics.mean(rt_prices_for_stats) if rt_prices_for_stats else None,
+        "real_time_std_dev": statistics.stdev(rt_prices_for_stats) if len(rt_prices_for_stats) > 1 else 0,
+        "real_time_max": max(rt_prices_for_stats) if rt_prices_for_stats else None,
+        "real_time_min": min(rt_prices_for_stats) if rt_prices_for_stats else None,
+    }
+    tou_stats = {}
+    for period, values in tou_stats_collector.items():
+        tou_stats[period] = {
+            "day_ahead_avg": statistics.mean(values["da"]) if values["da"] else None,
+            "real_time_avg": statistics.mean(values["rt"]) if values["rt"] else None,
+        }
+    flat_da_avg = tou_stats.get("平段", {}).get("day_ahead_avg")
+    flat_rt_avg = tou_stats.get("平段", {}).get("real_time_avg")
+    for period, values in tou_stats.items():
+        values["day_ahead_ratio"] = round(values["day_ahead_avg"] / flat_da_avg, 2) \
+            if flat_da_avg and values["day_ahead_avg"] is not None else None
+        values["real_time_ratio"] = round(values["real_time_avg"] / flat_rt_avg, 2) \
+            if flat_rt_avg and values["real_time_avg"] is not None else None
+    return {"chart_data": chart_data, "stats": stats, "tou_stats": tou_stats}
+
+
+def old_spread_attribution(da_docs, rt_docs, tou_rules):
+    """改写前的价差归因：逐点计算偏差，按时段名称收集到 {时段: {指标: [值, ...]}} 后求均值"""
+    rt_map = {doc['time_str']: doc for doc in rt_docs}
+    time_series, period_collector = [], {}
+    for da_point in da_docs:
+        time_str = da_point.get("time_str")
+        if not time_str:
+            continue
+        rt_point = rt_map.get(time_str, {})
+        price_spread = (rt_point.get('avg_clearing_price') - da_point.get('avg_clearing_price')) \
+            if rt_point.get('avg_clearing_price') is not None and da_point.get('avg_clearing_price') is not None else None
+
+        def calc_dev(key):
+            return (rt_point.get(key, 0) or 0) - (da_point.get(key, 0) or 0)
+
+        point_data = {
+            "time_str": time_str,
+            "price_spread": price_spread,
+            "total_volume_deviation": calc_dev('total_clearing_power'),
+            "thermal_deviation": calc_dev('thermal_clearing_power'),
+            "hydro_deviation": calc_dev('hydro_clearing_power'),
+            "wind_deviation": calc_dev('wind_clearing_power'),
+            "solar_deviation": calc_dev('solar_clearing_power'),
+            "storage_deviation": calc_dev('pumped_storage_clearing_power') + calc_dev('battery_storage_clearing_power'),
+        }
+        time_series.append(point_data)
+
+        period_type = tou_rules.get(time_str, "平段")
+        if period_type not in period_collector:
+            period_collector[period_type] = {key: [] for key in point_data if key != 'time_str'}
+        for key, value in point_data.items():
+            if key != 'time_str' and value is not None:
+                period_collector[period_type][key].append(value)
+
+    systematic_bias = []
+    for period_name in ["尖峰", "高峰", "平段", "低谷", "深谷"]:
+        if period_name in period_collector:
+            agg_data = {"period_name": period_name}
+            for key, values in period_collector[period_name].items():
+                agg_data[f"avg_{key}"] = statistics.mean(values) if values else None
+            systematic_bias.append(agg_data)
+    return {"time_series": time_series, "systematic_bias": systematic_bias}
+
+
+def old_day_extremes(da_docs, rt_docs, tou_map):
+    """
+    单个业务日的极值指标：价格/价差极值取旧总览接口的 risk_kpis，
+    价格爬坡照搬现货市场复盘接口逐点计算 price_ramp（与前一个存在的实时时段之差），取绝对值最大的首个时段
+    """
+    risk = old_dashboard(da_docs, rt_docs, lambda day: tou_map)['risk_kpis']
+    extremes = {key: point['value'] if point else None for key, point in risk.items()}
+    times = {key: point['time_str'] if point else None for key, point in risk.items()}
+
+    docs = sorted(rt_docs, key=lambda doc: doc['datetime'])
+    best = None
+    for i in range(1, len(docs)):
+        if docs[i].get('avg_clearing_price') is not None and docs[i - 1].get('avg_clearing_price') is not None:
+            ramp = docs[i]['avg_clearing_price'] - docs[i - 1]['avg_clearing_price']
+            if best is None or abs(ramp) > abs(best[0]):
+                best = (ramp, docs[i]['time_str'])
+    extremes.update(max_abs_ramp=abs(best[0]) if best else None, ramp=best[0] if best else None)
+    times['max_abs_ramp'] = best[1] if best else None
+    return extremes, times
+
+
+def old_load_curve(meter_id: str, dates, load_docs):
+    """
+    改写前的负荷曲线：每个日期单独查询、逐点 strftime
+
+    区间按业务日口径 (D 00:00, D+1 00:00]，次日 00:00 的点标为 24:00（改写时有意修正的口径，其余照旧）
+    """
+    response_data = {}
+    for date_str in dates:
+        try:
+            start_date = datetime.strptime(date_str, "%Y-%m-%d")
+        except ValueError:
+            response_data[date_str] = {"error": "Invalid date format."}
+            continue
+        end_date = start_date + timedelta(days=1)
+        docs = sorted((doc for doc in load_docs
+                       if doc['meter_id'] == meter_id and start_date < doc['timestamp'] <= end_date),
+                      key=lambda doc: doc['timestamp'])
+        response_data[date_str] = [{"time": "24:00" if doc["timestamp"] == end_date else doc["timestamp"].strftime("%H:%M"),
+                                    "value": doc["load_value"]} for doc in docs]
+    return response_data
+
+
+# ##############################################################################
+# 比较
+# ##############################################################################
+
+def assert_same(actual, expected, path='结果'):
+    """递归比较；浮点数按相对误差 1e-9，其余要求相等"""
+    if isinstance(expected, dict):
+        if not isinstance(actual, dict) or set(actual) != set(expected):
+            raise AssertionError(f"{path}: 键不一致 {sorted(actual) if isinstance(actual, dict) else actual!r} "
+                                 f"!= {sorted(expected)}")
+        for key in expected:
+            assert_same(actual[key], expected[key], f"{path}.{key}")
+    elif isinstance(expected, (list, tuple)):
+        if not isinstance(actual, (list, tuple)) or len(actual) != len(expected):
+            raise AssertionError(f"{path}: 长度不一致 {len(actual) if isinstance(actual, (list, tuple)) else actual!r} "
+                                 f"!= {len(expected)}")
+        for i, (a, e) in enumerate(zip(actual, expected)):
+            assert_same(a, e, f"{path}[{i}]")
+    elif isinstance(expected, (int, float)) and not isinstance(expected, bool) \
+            and isinstance(actual, (int, float)) and not isinstance(actual, bool):
+        if not math.isclose(actual, expected, rel_tol=1e-9, abs_tol=1e-9):
+            raise AssertionError(f"{path}: {actual!r} != {expected!r}")
+    elif actual != expected:
+        raise AssertionError(f"{path}: {actual!r} != {expected!r}")
+
+
+def _nan_to_none(values):
+    """{键: 值} 中的 NaN 换为 None（与接口输出的口径一致）"""
+    return {key: None if isinstance(value, float) and math.isnan(value) else value for key, value in values.items()}
+
+
+# ##############################################################################
+# 检查项
+# ##############################################################################
+
+CHECKS = {}
+
+
+def check(name: str, description: str):
+    """注册检查项"""
+    def register(func):
+        CHECKS[name] = (description, func)
+        return func
+    return register
+
+
+@check('market_kpi', '市场总览 KPI 引擎（单日与区间）= 逐点循环')
+def check_market_kpi():
+    dates = [day.strftime('%Y-%m-%d') for day in _fixture_dates()]
+    da, rt = _price_arrays()
+    da_docs, rt_docs = _price_docs('day_ahead'), _price_docs('real_time')
+    tou_maps = {day: old_tou_map(FIXTURE_TOU_RULES, int(day[5:7])) for day in dates}
+    periods = np.stack([market_kpi.period_codes(tou_maps[day]) for day in dates])
+
+    # 单日：每个业务日与旧接口的逐点循环一致（没有日前数据的业务日为空结构）
+    for i, day in enumerate(dates):
+        expected = old_dashboard([doc for doc in da_docs if doc['date_str'] == day],
+                                 [doc for doc in rt_docs if doc['date_str'] == day], tou_maps.get)
+        actual = market_kpi.day_kpis(da[i], rt[i], periods[i])
+        for point in expected['risk_kpis'].values():
+            if point is not None:
+                point.pop('date')
+        assert_same(actual['financial_kpis'], expected['financial_kpis'], f"{day}.financial_kpis")
+        assert_same(actual['risk_kpis'], expected['risk_kpis'], f"{day}.risk_kpis")
+        assert_same(actual['period_summary'], expected['period_summary'], f"{day}.period_summary")
+        assert_same(market_kpi.day_time_series(da[i], rt[i], tou_maps[day]), expected['time_series'],
+                    f"{day}.time_series")
+
+    # 区间：由逐日可累加汇总合并，与在全部原始点上直接循环一致；极值取首次出现的业务日
+    expected = old_dashboard(da_docs, rt_docs, tou_maps.get)
+    summary = market_kpi.range_kpis(dates, da, rt, periods)['summary']
+    assert_same(summary['financial_kpis'], expected['financial_kpis'], "区间.financial_kpis")
+    assert_same(summary['period_summary'], expected['period_summary'], "区间.period_summary")
+    for key, point in expected['risk_kpis'].items():
+        actual = summary['risk_kpis'][key]
+        assert_same({name: actual[name] for name in ('value', 'time_str', 'date')},
+                    {name: point[name] for name in ('value', 'time_str', 'date')}, f"区间.risk_kpis.{key}")
+
+
+@check('price_comparison', '批量价格对比（价格立方体与直接查询两条路径）= 单日逐时刻循环')
+def check_price_comparison():
+    # 日历日 D 的 00:00 为业务日 D-1 的 24:00：首日缺前一业务日、缺日前数据的业务日的次日、
+    # 以及只有 00:00 一个点的夹具后一日
+    days = [FIXTURE_START + timedelta(days=i) for i in range(FIXTURE_DAYS + 1)]
+    dates = [day.strftime('%Y-%m-%d') for day in days]
+    da_docs, rt_docs = _price_docs('day_ahead'), _price_docs('real_time')
+    expected = {day: old_price_comparison(day, da_docs, rt_docs, old_tou_map(FIXTURE_TOU_RULES, int(day[5:7])))
+                for day in dates}
+
+    for enabled in (True, False):
+        cube = _fixture_price_cube(enabled)
+        with mock.patch.object(v1, 'price_cube', cube), \
+                mock.patch.object(v1, 'tou_service', _fixture_tou_service()), \
+                mock.patch.object(v1, 'DA_PRICE_COLLECTION', cube.db[MARKET_COLLECTIONS['day_ahead']]), \
+                mock.patch.object(v1, 'RT_PRICE_COLLECTION', cube.db[MARKET_COLLECTIONS['real_time']]):
+            assert_same(v1._compare_prices(dates), expected, '立方体' if enabled else '直接查询')
+
+
+def _random_rules(rng: random.Random):
+    """随机分时规则：5 分钟粒度（含非整刻）、可能以 24:00 结束、可能起点晚于终点（跨零点写法）、可能相互重叠"""
+    rules = []
+    for _ in range(rng.randint(0, 8)):
+        start = rng.randrange(0, 1440, 5)
+        end = 1440 if rng.random() < 0.15 else rng.randrange(0, 1440, 5)
+        rules.append({'months': [1], 'period_type': rng.choice(['尖峰', '高峰', '低谷', '深谷', '平段']),
+                      'start_time': f"{start // 60:02d}:{start % 60:02d}",
+                      'end_time': '24:00' if end == 1440 else f"{end // 60:02d}:{end % 60:02d}"})
+    return rules
+
+
+@check('tou_tables', '编译的分时时段表与时段编号矩阵 = 逐时刻 strptime 比较')
+def check_tou_tables():
+    rng = random.Random(SEED)
+    rule_sets = [(month, FIXTURE_TOU_RULES) for month in (1, 2)] + [(1, _random_rules(rng)) for _ in range(2000)]
+    for n, (month, rules) in enumerate(rule_sets):
+        assert_same(build_tou_map(rule for rule in rules if month in rule['months']), old_tou_map(rules, month),
+                    f"规则组 {n}")
+
+    # 服务：按月份取编译结果，结束时刻口径（00:15..24:00，24:00 按平段）与开始时刻口径的编号矩阵
+    service = _fixture_tou_service()
+    dates = [day.strftime('%Y-%m-%d') for day in _fixture_dates()]
+    maps = [old_tou_map(FIXTURE_TOU_RULES, int(day[5:7])) for day in dates]
+    order = {name: i for i, name in enumerate(market_kpi.PERIOD_ORDER)}
+    for day, tou_map in zip(dates, maps):
+        assert_same(service.get_tou_map(datetime.strptime(day, '%Y-%m-%d')), tou_map, f"{day}.tou_map")
+        assert_same(list(service.slot_periods(day)), list(tou_map.values()), f"{day}.slot_periods")
+    assert_same(service.period_matrix(dates).tolist(),
+                [[order.get(tou_map.get(time_str, '平段'), -1) for time_str in SLOT_TIME_STRS] for tou_map in maps],
+                'period_matrix')
+    assert_same(service.period_matrix(dates, by_slot_start=True).tolist(),
+                [[order.get(period, -1) for period in tou_map.values()] for tou_map in maps],
+                'period_matrix(by_slot_start)')
+
+
+@check('period_stats', '分时段聚合（价差归因与随机加权数据）= {时段: [值, ...]} 收集器')
+def check_period_stats():
+    # 价差归因接口：24:00 点按平段归入，跨零点低谷/深谷；没有日前数据的业务日返回空结构
+    da_docs, rt_docs = _price_docs('day_ahead'), _price_docs('real_time')
+    cube = _fixture_price_cube(True)
+    passthrough = SimpleNamespace(lookup=lambda request, day: None,
+                                  respond=lambda request, day, content, has_data=True: content)
+    with mock.patch.object(v1, 'price_cube', cube), mock.patch.object(v1, 'market_day_cache', passthrough), \
+            mock.patch.object(v1, 'tou_service', _fixture_tou_service()):
+        for day in _fixture_dates():
+            day_str = day.strftime('%Y-%m-%d')
+            day_da = [doc for doc in da_docs if doc['date_str'] == day_str]
+            day_rt = [doc for doc in rt_docs if doc['date_str'] == day_str]
+            expected = old_spread_attribution(day_da, day_rt, old_tou_map(FIXTURE_TOU_RULES, day.month)) \
+                if day_da and day_rt else {"time_series": [], "systematic_bias": []}
+            assert_same(v1.get_spread_attribution_analysis(None, day_str), expected, day_str)
+
+    # 直接调用：(天数, 指标, 96) 随机数据，NaN 缺失、单独的有效掩码、零权重、时段外编号 -1
+    rng = np.random.default_rng(SEED)
+    values = rng.uniform(-100, 100, (4, 3, 96))
+    values[rng.random(values.shape) < 0.1] = np.nan
+    weights = rng.uniform(0, 50, values.shape)
+    weights[rng.random(values.shape) < 0.1] = 0
+    valid = ~np.isnan(values) & (rng.random(values.shape) < 0.9)
+    periods = rng.integers(-1, len(tou_aggregation.PERIOD_ORDER), (4, 1, 96))
+    stats = tou_aggregation.period_stats(values, periods, weights, valid, total='全天')
+    for index in np.ndindex(values.shape[:-1]):
+        collector = {}
+        for slot in range(96):
+            if not valid[index][slot]:
+                continue
+            code = periods[index[0], 0, slot]
+            names = ['全天'] + ([tou_aggregation.PERIOD_ORDER[code]] if code >= 0 else [])
+            for name in names:
+                collector.setdefault(name, []).append((values[index][slot], weights[index][slot]))
+        for name in ('全天',) + tou_aggregation.PERIOD_ORDER:
+            points = collector.get(name, [])
+            weight = sum(w for _, w in points)
+            expected = {'count': len(points), 'sum': sum(v for v, _ in points),
+                        'mean': statistics.mean(v for v, _ in points) if points else None,
+                        'weight': weight, 'weighted': sum(v * w for v, w in points),
+                        'vwap': sum(v * w for v, w in points) / weight if weight > 0 else None}
+            actual = {key: array[index].item() for key, array in stats[name].items()}
+            assert_same(_nan_to_none(actual), expected, f"{index}.{name}")
+
+
+def old_daily_energy(meter_id: str, dates, load_docs, rules):
+    """
+    逐日逐点的电表日电量：业务日 (D 00:00, D+1 00:00]，时段结束时刻向上取整到 15 分钟（24:00 为次日 00:00），
+    时段按当月分时映射 tou_map.get(时刻, "平段") 归入（与市场总览相同，24:00 按平段），
+    峰谷值取首次出现的时段
+    """
+    result = {}
+    for day in dates:
+        start_date = datetime.strptime(day, "%Y-%m-%d")
+        tou_map = old_tou_map(rules, start_date.month)
+        slots, stamps = {}, []
+        for doc in load_docs:
+            timestamp = doc['timestamp']
+            if doc['meter_id'] != meter_id or not start_date < timestamp <= start_date + timedelta(days=1):
+                continue
+            stamps.append(timestamp)
+            if doc.get('load_value') is None:
+                continue
+            slot = math.ceil((timestamp - start_date).total_seconds() / 900)
+            label = "24:00" if slot == 96 else (start_date + timedelta(minutes=15 * slot)).strftime("%H:%M")
+            slots.setdefault(slot, [label, 0.0, 0])
+            slots[slot][1] += doc['load_value']
+            slots[slot][2] += 1
+        if not slots:
+            continue
+        ordered = [slots[slot] for slot in sorted(slots)]
+        peak = max(ordered, key=lambda item: item[1])
+        low = min(ordered, key=lambda item: item[1])
+        periods = {}
+        for label, value, _ in ordered:
+            period = tou_map.get(label, "平段")
+            periods[period] = periods.get(period, 0.0) + value
+        result[day] = {
+            'meter_id': meter_id, 'date_str': day, 'month': day[:7],
+            'energy': sum(item[1] for item in ordered), 'count': sum(item[2] for item in ordered),
+            'peak': peak[1], 'peak_time': peak[0], 'min': low[1], 'min_time': low[0],
+            'periods': periods, 'first': min(stamps), 'last': max(stamps),
+        }
+    return result
+
+
+def old_availability(meter_ids, start: date, end: date, load_docs):
+    """
+    逐点扫描原始负荷的数据可用性：每个时间戳在相邻两个日历日中找出所属业务日 (D 00:00, D+1 00:00]
+    和时段（结束时刻向上取整到 15 分钟），再逐日统计
+    """
+    result = {}
+    total_days = (end - start).days + 1
+    for meter_id in meter_ids:
+        present = set()
+        for doc in load_docs:
+            if doc['meter_id'] != meter_id:
+                continue
+            timestamp = doc['timestamp']
+            for day in (timestamp.date() - timedelta(days=1), timestamp.date()):
+                day_start = datetime.combine(day, datetime.min.time())
+                if day_start < timestamp <= day_start + timedelta(days=1):
+                    present.add((day, math.ceil((timestamp - day_start).total_seconds() / 900) - 1))
+        days = [start + timedelta(days=i) for i in range(total_days)]
+        slot_counts = [sum(1 for slot in range(96) if (day, slot) in present) for day in days]
+        result[meter_id] = {'days': ''.join('1' if count else '0' for count in slot_counts),
+                            'count': sum(1 for count in slot_counts if count), 'slot_counts': slot_counts}
+    return result
+
+
+def _load_docs(start: datetime, days: int):
+    """
+    负荷夹具文档：两块电表 start 起 days 天的 15 分钟负荷（timestamp 为时段结束时刻，00:00 即前一业务日的 24:00），
+    随机缺点、与上一点相同（并列极值），另有第二天上午带秒数的非整刻点
+    """
+    rng = random.Random(f'{SEED}-load-{start:%Y%m%d}')
+    docs = []
+    for meter_id in ('M1', 'M2'):
+        value = None
+        for slot in range(96 * days + 1):
+            if rng.random() < 0.05:
+                continue
+            if value is None or rng.random() > 0.05:
+                value = round(rng.uniform(0, 500), 3)
+            docs.append({'meter_id': meter_id, 'timestamp': start + timedelta(minutes=15 * slot), 'load_value': value})
+        docs.append({'meter_id': meter_id, 'timestamp': start + timedelta(days=2, hours=10, minutes=7, seconds=30),
+                     'load_value': 1.5})
+    return docs
+
+
+@check('load_curve', '多日期负荷曲线（单次 $or 查询）= 逐日查询')
+def check_load_curve():
+    docs = _load_docs(datetime(2024, 12, 29), 6)
+    # 连续日期（合并为一个区间）、跨年、重复日期、不连续日期、无数据日期、格式无效的日期
+    dates = ['2024-12-30', '2024-12-31', '2025-01-01', '2024-12-31', '2025-01-03', '2024-12-28', '2025-02-01',
+             '2025-13-01', '2024-12-29']
+    with mock.patch.object(v1, 'USER_COLLECTION', FixtureCollection(docs)):
+        for meter_id in ('M1', 'M2', 'M3'):
+            for subset in (dates, dates[:1], dates[2:3], []):
+                assert_same(v1.get_load_curve(meter_id, subset), old_load_curve(meter_id, subset, docs),
+                            f"{meter_id}.{subset}")
+
+
+@check('meter_energy', '电表日电量汇总与读取路径（日/月）= 逐日逐点循环')
+def check_meter_energy():
+    # 跨月且 2 月有跨零点深谷；另有同一时刻的重复点、空值点和多年前的孤立点
+    docs = _load_docs(datetime(2025, 1, 29), 5)
+    docs += [{'meter_id': 'M1', 'timestamp': datetime(2025, 2, 1, 23, 0), 'load_value': 7.25},
+             {'meter_id': 'M1', 'timestamp': datetime(2025, 2, 2, 0, 0), 'load_value': None},
+             {'meter_id': 'M1', 'timestamp': datetime(2025, 1, 30, 0, 0, 1), 'load_value': 3.0},
+             # 远早于夹具区间的孤立数据：未保存汇总的范围跨越多年
+             {'meter_id': 'M1', 'timestamp': datetime(2023, 6, 15, 12, 0), 'load_value': 2.0}]
+    dates = [(FIXTURE_START - timedelta(days=1) + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(8)]
+    service = MeterEnergyService({LOAD_COLLECTION: FixtureCollection(docs), ROLLUP_COLLECTION: FixtureCollection([])},
+                                 tou=_fixture_tou_service())
+    volatile = ('tou', 'version', 'updated_at')
+    for meter_id in ('M1', 'M2', 'M3'):
+        expected = old_daily_energy(meter_id, dates, docs, FIXTURE_TOU_RULES)
+        rollups = service._rollups(service.db, meter_id, dates)
+        assert_same({doc['date_str']: {key: value for key, value in doc.items() if key not in volatile}
+                     for doc in rollups}, expected, f"{meter_id}.rollups")
+
+        # 读取路径：没有保存的汇总时当场计算，区间首尾裁剪
+        daily = service.daily(meter_id, dates[1], dates[-2])
+        assert_same([{key: value for key, value in doc.items() if key not in volatile} for doc in daily],
+                    [expected[day] for day in dates[1:-1] if day in expected], f"{meter_id}.daily")
+
+        months = {}
+        for doc in expected.values():
+            total = months.setdefault(doc['month'], {'energy': 0.0, 'days': 0, 'peak': None, 'peak_date': None,
+                                                     'peak_time': None, 'periods': {}})
+            total['energy'] += doc['energy']
+            total['days'] += 1
+            if total['peak'] is None or doc['peak'] > total['peak']:
+                total.update(peak=doc['peak'], peak_date=doc['date_str'], peak_time=doc['peak_time'])
+            for name, value in doc['periods'].items():
+                total['periods'][name] = total['periods'].get(name, 0.0) + value
+        assert_same(service.monthly(meter_id, ['2025-01', '2025-02', '2025-03']),
+                    {month: months.get(month) for month in ('2025-01', '2025-02', '2025-03')}, f"{meter_id}.monthly")
+
+        # 不相邻、重叠、无序的区间：只读取和计算所请求的业务日
+        loaded = []
+        load = service._load
+
+        def recording_load(source, meter, days):
+            loaded.extend(days)
+            return load(source, meter, days)
+
+        ranges = [(dates[5], dates[6]), (dates[0], dates[0]), (dates[5], dates[5]), (dates[3], dates[3])]
+        requested = {day for first, last in ranges for day in dates if first <= day <= last}
+        with mock.patch.object(service, '_load', recording_load):
+            assert_same([{key: value for key, value in doc.items() if key not in volatile}
+                         for doc in service.daily_ranges(meter_id, ranges)],
+                        [expected[day] for day in dates if day in requested and day in expected],
+                        f"{meter_id}.daily_ranges")
+        assert_same(sorted(set(loaded) - requested), [], f"{meter_id}.daily_ranges 读取范围")
+
+        # 日电量接口：相隔多年的月份
+        loaded.clear()
+        months = ['2020-01', '2025-02', 'bad', '2025-01']
+        month_days = {month: [(date(int(month[:4]), int(month[5:]), 1) + timedelta(days=i)).strftime('%Y-%m-%d')
+                              for i in range(31)] for month in months if month != 'bad'}
+        with mock.patch.object(service, '_load', recording_load), \
+                mock.patch.object(v1, 'meter_energy_service', service):
+            actual = v1.get_daily_energy(meter_id, months)
+        expected_months = {'bad': {"error": "Invalid month format."}}
+        for month, days in month_days.items():
+            days = [day for day in days if day[:7] == month]
+            expected_months[month] = [{"day": int(day[8:]), "energy": doc['energy']}
+                                      for day, doc in old_daily_energy(meter_id, days, docs, FIXTURE_TOU_RULES).items()]
+        assert_same(actual, expected_months, f"{meter_id}.daily_energy")
+        assert_same(sorted({day[:7] for day in loaded} - set(months)), [], f"{meter_id}.daily_energy 读取范围")
+
+
+@check('meter_availability', '电表数据可用性位图（登记与重建两条写入路径）= 逐点扫描原始负荷')
+def check_meter_availability():
+    # 跨年（2024 为闰年，12-31 为当年第 366 天），2025-01-01 00:00 的点为 2024-12-31 的 24:00
+    docs = _load_docs(datetime(2024, 12, 29), 6) + [
+        {'meter_id': 'M2', 'timestamp': datetime(2024, 2, 29, 0, 0), 'load_value': 1.0},
+        {'meter_id': 'M2', 'timestamp': datetime(2024, 3, 1, 0, 0, 1), 'load_value': 1.0},
+    ]
+    meter_ids = ['M1', 'M2', 'M3']
+    ranges = [(date(2024, 12, 27), date(2025, 1, 5)), (date(2024, 12, 31), date(2024, 12, 31)),
+              (date(2024, 2, 27), date(2025, 1, 1)), (date(2025, 1, 4), date(2025, 1, 4))]
+
+    # 登记：乱序、重叠的多个批次按位或写入
+    rng = random.Random(SEED)
+    recorded = MeterAvailability({AVAILABILITY_COLLECTION: FixtureCollection([])})
+    for meter_id in meter_ids:
+        points = [doc['timestamp'] for doc in docs if doc['meter_id'] == meter_id]
+        rng.shuffle(points)
+        for begin in range(0, len(points), 97):
+            recorded.record(meter_id, points[begin:begin + 120])
+
+    rebuilt = MeterAvailability({AVAILABILITY_COLLECTION: FixtureCollection([]),
+                                 LOAD_COLLECTION: FixtureCollection(docs)})
+    rebuilt.rebuild()
+
+    for name, service in (('登记', recorded), ('重建', rebuilt)):
+        for start, end in ranges:
+            expected = old_availability(meter_ids, start, end, docs)
+            assert_same(service.query(meter_ids, start, end, slots=True), expected, f"{name}.{start}~{end}")
+            for entry in expected.values():
+                entry.pop('slot_counts')
+            assert_same(service.query(meter_ids, start, end), expected, f"{name}.{start}~{end}(days)")
+
+
+@check('market_extremes', '逐日极值排名（已存汇总 + 立方体已加载区间当场计算）= 逐日逐点循环')
+def check_market_extremes():
+    da_docs, rt_docs = _price_docs('day_ahead'), _price_docs('real_time')
+    dates = [day.strftime('%Y-%m-%d') for day in _fixture_dates()]
+    fresh = {}
+    for day in dates:
+        day_da = [doc for doc in da_docs if doc['date_str'] == day]
+        if day_da:
+            fresh[day] = old_day_extremes(day_da, [doc for doc in rt_docs if doc['date_str'] == day],
+                                          old_tou_map(FIXTURE_TOU_RULES, int(day[5:7])))
+
+    # 已存汇总：立方体范围外的历史业务日（含空值和并列值）、范围内指纹一致的汇总、
+    # 范围内源数据已变化的过期汇总，以及源数据已删除（没有日前数据）的业务日
+    rng = random.Random(f'{SEED}-extremes')
+    stored = []
+    for i in range(40):
+        day = (date(2020, 1, 1) + timedelta(days=37 * i)).strftime('%Y-%m-%d')
+        extremes = {metric: None if rng.random() < 0.1 else round(rng.uniform(-300, 1200), 1) if rng.random() < 0.9
+                    else 500.0 for metric in market_kpi.EXTREME_METRICS}
+        stored.append({'date_str': day, 'extremes': {**extremes, 'ramp': extremes['max_abs_ramp']},
+                       'extreme_times': {metric: '12:00' for metric in extremes}, 'version': SUMMARY_VERSION})
+    da, rt = _price_arrays()
+    tou = _fixture_tou_service()
+    current = market_kpi.daily_summaries(dates[:1], da[:1], rt[:1], tou.period_matrix(dates[:1]))[0]
+    stored.append({**current, 'version': SUMMARY_VERSION, 'source_fingerprint': {
+        'day_ahead': market_kpi.fingerprints(da[:1])[0], 'real_time': market_kpi.fingerprints(rt[:1])[0],
+        'tou': tou.signatures(dates[:1])[0]}})
+    bogus = {'extremes': {**{metric: 1e6 for metric in market_kpi.EXTREME_METRICS}, 'ramp': 1e6},
+             'extreme_times': {metric: '00:15' for metric in market_kpi.EXTREME_METRICS}, 'version': SUMMARY_VERSION,
+             'source_fingerprint': {}}
+    stored += [{'date_str': dates[1], **bogus}, {'date_str': FIXTURE_MISSING_DAY.strftime('%Y-%m-%d'), **bogus}]
+    service = MarketSummaryService({SUMMARY_COLLECTION: FixtureCollection(stored)}, tou=tou)
+
+    # 立方体之外的已存汇总按原值参与排序；立方体范围内全部按当前源数据
+    candidates = {doc['date_str']: (doc['extremes'], doc['extreme_times']) for doc in stored[:40]}
+    candidates.update(fresh)
+
+    cube = _fixture_price_cube(True)
+    spans = []
+    span = cube.span
+
+    def recording_span(market, start, end):
+        dates_, values = span(market, start, end)
+        spans.append(len(values))
+        return dates_, values
+
+    passthrough = SimpleNamespace(lookup=lambda request, day: None,
+                                  respond=lambda request, day, content, has_data=True: content)
+    ranges = [('0001-01-01', '9999-12-31'), ('2021-06-01', dates[2]), (dates[3], '2030-01-01'),
+              ('2020-01-01', '2024-12-31')]
+    thresholds = [(None, None), (0.0, 800.0), (500.0, 500.0)]
+    with mock.patch.object(cube, 'span', recording_span), mock.patch.object(v1, 'price_cube', cube), \
+            mock.patch.object(v1, 'market_summary_service', service), \
+            mock.patch.object(v1, 'market_day_cache', passthrough):
+        for metric, natural in market_kpi.EXTREME_METRICS.items():
+            for start, end in ranges:
+                for order in (None, 'asc', 'desc'):
+                    for min_value, max_value in thresholds:
+                        for limit in (3, 1000):
+                            descending = natural if order is None else order == 'desc'
+                            rows = [(day, extremes, times) for day, (extremes, times) in candidates.items()
+                                    if start <= day <= end and extremes[metric] is not None
+                                    and (min_value is None or extremes[metric] >= min_value)
+                                    and (max_value is None or extremes[metric] <= max_value)]
+                            rows.sort(key=lambda row: row[0])
+                            rows.sort(key=lambda row: row[1][metric], reverse=descending)
+                            expected = [{'date': day, 'value': extremes[metric], 'time_str': times[metric],
+                                         'extremes': extremes} for day, extremes, times in rows[:limit]]
+                            actual = v1.get_market_extremes(None, metric, start, end, limit, order,
+                                                            min_value, max_value)
+                            assert_same(actual['days'], expected,
+                                        f"{metric}.{start}~{end}.{order}.{min_value}~{max_value}.{limit}")
+    # 不限长度的区间只在立方体已加载的业务日上做当场计算
+    assert_same(max(spans), FIXTURE_DAYS, '立方体区间天数')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数值路径一致性检查（向量化实现 vs 逐点循环）')
+    parser.add_argument('--only', action='append', choices=list(CHECKS), help='只运行指定检查，可重复指定')
+    args = parser.parse_args()
+
+    failed = 0
+    for name in args.only or list(CHECKS):
+        description, func = CHECKS[name]
+        try:
+            func()
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {description}\n   {e}")
+            continue
+        print(f"✅ {name}: {description}")
+    if failed:
+        print(f"{failed} 项检查不一致")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
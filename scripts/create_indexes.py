@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+数据库索引创建脚本
+
+根据索引注册表（webapp/tools/indexes.py）为各集合创建缺失的索引。
+注意：应用启动时（webapp.main 的 lifespan）会在后台自动对账一次索引，不等待索引建完即开始服务；
+大集合上新增索引时建议在部署前运行此脚本预建，排查索引缺失（如唯一索引遇到重复数据）时也可手动运行。
+
+用法：
+    python scripts/create_indexes.py                      # 处理注册表中的全部集合
+    python scripts/create_indexes.py customers retail_contracts   # 只处理指定集合
+    python scripts/create_indexes.py --drop customers     # 删除指定集合中注册表管理的索引
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from webapp.tools.mongo import DATABASE
+from webapp.tools.indexes import INDEX_REGISTRY, ensure_indexes
+
+
+def create_indexes(collections=None):
+    """创建注册表中缺失的索引"""
+    print("=" * 60)
+    print("开始创建数据库索引...")
+    print("=" * 60)
+
+    created = ensure_indexes(DATABASE, collections, verbose=True)
+
+    print("\n" + "=" * 60)
+    print("索引创建完成！")
+    for collection_name, names in created.items():
+        total = len(list(DATABASE[collection_name].list_indexes()))
+        print(f"  {collection_name}: 新建 {len(names)} 个，当前共 {total} 个索引")
+    print("=" * 60)
+
+
+def drop_indexes(collections):
+    """删除指定集合中由注册表管理的索引（不影响 _id 索引和注册表外的索引）"""
+    for collection_name in collections:
+        collection = DATABASE[collection_name]
+        existing = {idx.get('name') for idx in collection.list_indexes()}
+        for spec in INDEX_REGISTRY[collection_name]:
+            if spec.name not in existing:
+                continue
+            try:
+                collection.drop_index(spec.name)
+                print(f"✅ [{collection_name}] 删除索引: {spec.name}")
+            except Exception as e:
+                print(f"❌ [{collection_name}] 删除索引失败 '{spec.name}': {str(e)}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    drop = '--drop' in args
+    names = [arg for arg in args if arg != '--drop']
+
+    unknown = [name for name in names if name not in INDEX_REGISTRY]
+    if unknown:
+        print(f"❌ 注册表中没有这些集合: {', '.join(unknown)}")
+        print(f"可选集合: {', '.join(INDEX_REGISTRY)}")
+        sys.exit(1)
+
+    if drop:
+        if not names:
+            print("❌ --drop 必须显式指定集合名")
+            sys.exit(1)
+        drop_indexes(names)
+    else:
+        create_indexes(names or None)
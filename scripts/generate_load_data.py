@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+负荷/电表合成数据生成脚本
+
+为 N 个计量点生成 M 年的合成时序数据，用于负荷曲线相关接口的容量和扩展性测试：
+- user_load_data：15 分钟负荷（load_value，kWh，已乘倍率）
+- meter_data：15 分钟电表累计示数（示数）和时段用电量（用电量 = 相邻示数之差）
+- mp_load_curve：计量点负荷曲线（load_mwh，默认 30 分钟 48 点，与 RPA 结算数据一致）
+
+时间约定：时间戳表示时段结束时刻，业务日 D 的 24:00 存为 D+1 00:00，
+即业务日 D 的数据落在 (D 00:00, D+1 00:00] 区间内。
+
+性能要点：
+- 每个计量点的整段时序用 NumPy 向量化生成，再分批转换为文档
+- insert_many(ordered=False) 批量无序写入，多进程并行（--workers）
+- 可先不建索引（--defer-indexes），写完后统一创建，大数据量时显著更快
+
+重复执行：目标集合已有数据时默认拒绝写入（user_load_data 没有唯一索引，重复写入会使日/月电量翻倍；
+mp_load_curve 的唯一索引会使批量写入报错中断）。--drop 清空后重新生成；--append 追加不重叠的数据
+（新的计量点或另一段 --start-date），与已有数据的时间段重叠时同样拒绝。
+
+计量点来源：默认从 customers 集合中读取（与 scripts/benchmark_seed.py 生成的客户档案一致），
+客户档案中计量点不足时补充合成编号。
+
+用法：
+    python scripts/generate_load_data.py --meters 100 --years 1
+    python scripts/generate_load_data.py --meters 5000 --years 3 --workers 8 --defer-indexes
+    python scripts/generate_load_data.py --meters 50 --collections meter_data,user_load_data
+    python scripts/generate_load_data.py --meters 100 --years 1 --start-date 2024-01-01 --append
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+os.environ.setdefault('MONGODB_DATABASE', 'exds_bench')
+
+import numpy as np
+
+from webapp.services.data_catalog import DATASETS as CATALOG_DATASETS, data_catalog
+from webapp.services.meter_availability import AVAILABILITY_COLLECTION, meter_availability
+from webapp.services.meter_catalog import METER_CATALOG_COLLECTION, meter_catalog
+from webapp.services.meter_energy import ROLLUP_COLLECTION, meter_energy_service
+from webapp.tools.mongo import DATABASE, DB_NAME
+from webapp.tools.indexes import ensure_indexes
+
+ALL_COLLECTIONS = ('user_load_data', 'meter_data', 'mp_load_curve')
+SLOTS_PER_DAY = 96
+BATCH_SIZE = 10000
+# 各集合的 (计量点字段, 计量点清单中的键, 时间字段)，用于检查与已有数据是否重叠
+SERIES_KEYS = {
+    'user_load_data': ('meter_id', 'meter_id', 'timestamp'),
+    'meter_data': ('表号', 'meter_id', '日期时间'),
+    'mp_load_curve': ('mp_id', 'mp_id', 'datetime'),
+}
+
+
+def load_metering_points(count):
+    """
+    读取计量点清单：优先使用客户档案中的计量点，不足部分用合成编号补齐
+
+    Returns:
+        [{'user_id', 'user_name', 'mp_id', 'meter_id', 'multiplier', 'allocation'}]
+    """
+    points = []
+    cursor = DATABASE.customers.find({}, {'user_name': 1, 'utility_accounts': 1})
+    for customer in cursor:
+        for account in customer.get('utility_accounts', []):
+            for mp in account.get('metering_points', []):
+                meter = mp.get('meter') or {}
+                if not mp.get('metering_point_id') or not meter.get('meter_id'):
+                    continue
+                points.append({
+                    'user_id': str(customer['_id']),
+                    'user_name': customer.get('user_name'),
+                    'mp_id': mp['metering_point_id'],
+                    'meter_id': meter['meter_id'],
+                    'multiplier': float(meter.get('multiplier') or 1),
+                    'allocation': float(mp.get('allocation_percentage') or 100) / 100,
+                })
+                if len(points) >= count:
+                    return points
+
+    for i in range(len(points), count):
+        points.append({
+            'user_id': f'SYN{i // 4:06d}',
+            'user_name': f'合成用户{i // 4:06d}',
+            'mp_id': f'SYNMP{i:07d}',
+            'meter_id': f'SYNM{i:07d}',
+            'multiplier': 1.0,
+            'allocation': 1.0,
+        })
+    return points
+
+
+def find_conflicts(collections, points, start_date, days, append):
+    """
+    已有数据、会被重复写入的集合
+
+    Args:
+        append: False 时目标集合非空即冲突；True 时只检查本次计量点在 (start_date, start_date+days] 内是否已有数据
+
+    Returns:
+        冲突的集合名称列表
+    """
+    conflicts = []
+    end_date = start_date + timedelta(days=days)
+    for name in collections:
+        if append:
+            field, point_key, time_field = SERIES_KEYS[name]
+            query = {field: {'$in': [point[point_key] for point in points]},
+                     time_field: {'$gt': start_date, '$lte': end_date}}
+        else:
+            query = {}
+        if DATABASE[name].find_one(query, {'_id': 1}) is not None:
+            conflicts.append(name)
+    return conflicts
+
+
+def slot_timestamps(start_date, days):
+    """(D 00:00, D+days 00:00] 区间内的 15 分钟时段结束时刻"""
+    start = np.datetime64(start_date, 'm')
+    offsets = np.arange(1, days * SLOTS_PER_DAY + 1) * 15
+    return start + offsets.astype('timedelta64[m]')
+
+
+def synthesize_usage(rng, days):
+    """
+    生成一个计量点的 15 分钟用电量序列（电表读数单位，未乘倍率）
+
+    日内双峰形状 + 工作日/周末差异 + 季节波动 + 噪声，偶尔出现停产日
+    """
+    hours = (np.arange(SLOTS_PER_DAY) + 1) / 4
+    daily_shape = (0.35
+                   + 0.5 * np.exp(-((hours - 10) ** 2) / 6)
+                   + 0.45 * np.exp(-((hours - 15.5) ** 2) / 5)
+                   + 0.15 * np.exp(-((hours - 20) ** 2) / 3))
+    base = rng.uniform(0.5, 20)
+
+    day_index = np.arange(days)
+    weekday_factor = np.where(day_index % 7 >= 5, rng.uniform(0.4, 0.8), 1.0)
+    season_factor = 1 + 0.2 * np.sin(2 * np.pi * day_index / 365.25 + rng.uniform(0, 2 * np.pi))
+    shutdown = rng.random(days) < 0.01
+    day_factor = weekday_factor * season_factor * np.where(shutdown, 0.05, 1.0)
+
+    usage = base * np.outer(day_factor, daily_shape) * rng.normal(1, 0.08, (days, SLOTS_PER_DAY))
+    return np.round(np.clip(usage, 0, None).ravel(), 4)
+
+
+def build_documents(point, start_date, days, collections, mp_interval, rng):
+    """按集合生成一个计量点的全部文档（生成器，按批返回）"""
+    timestamps = slot_timestamps(start_date, days)
+    usage = synthesize_usage(rng, days)
+    times = timestamps.astype('datetime64[ms]').astype(datetime).tolist()
+
+    if 'user_load_data' in collections:
+        load_values = np.round(usage * point['multiplier'], 4).tolist()
+        for begin in range(0, len(times), BATCH_SIZE):
+            yield 'user_load_data', [
+                {'user_id': point['user_id'], 'user_name': point['user_name'], 'meter_id': point['meter_id'],
+                 'timestamp': ts, 'load_value': value}
+                for ts, value in zip(times[begin:begin + BATCH_SIZE], load_values[begin:begin + BATCH_SIZE])]
+
+    if 'meter_data' in collections:
+        # 示数为累计读数；用电量取相邻示数之差，保证两者严格一致
+        initial = round(float(rng.uniform(1000, 100000)), 2)
+        readings = np.round(initial + np.cumsum(usage), 4)
+        deltas = np.round(np.diff(readings, prepend=initial), 4).tolist()
+        readings = readings.tolist()
+        for begin in range(0, len(times), BATCH_SIZE):
+            end = begin + BATCH_SIZE
+            yield 'meter_data', [
+                {'表号': point['meter_id'], '日期时间': ts, '示数': reading, '用电量': delta}
+                for ts, reading, delta in zip(times[begin:end], readings[begin:end], deltas[begin:end])]
+
+    if 'mp_load_curve' in collections:
+        group = mp_interval // 15
+        mwh = usage * point['multiplier'] * point['allocation'] / 1000
+        mwh = np.round(mwh.reshape(-1, group).sum(axis=1), 6).tolist()
+        mp_times = times[group - 1::group]
+        for begin in range(0, len(mp_times), BATCH_SIZE):
+            yield 'mp_load_curve', [
+                {'mp_id': point['mp_id'], 'datetime': ts, 'load_mwh': value}
+                for ts, value in zip(mp_times[begin:begin + BATCH_SIZE], mwh[begin:begin + BATCH_SIZE])]
+
+
+def generate_for_points(task):
+    """工作进程：为一组计量点生成并写入数据，返回各集合写入条数"""
+    points, start_date, days, collections, mp_interval, seed, rollups = task
+    counts = {name: 0 for name in collections}
+    for point in points:
+        # 每个计量点独立的随机流，保证结果与进程数无关、可复现
+        rng = np.random.default_rng([seed, zlib.crc32(point['mp_id'].encode('utf-8'))])
+        span = None
+        for collection_name, docs in build_documents(point, start_date, days, collections, mp_interval, rng):
+            DATABASE[collection_name].insert_many(docs, ordered=False, bypass_document_validation=True)
+            if collection_name in CATALOG_DATASETS:
+                # 登记数据日期目录（available-dates 接口）
+                data_catalog.record(collection_name, (doc['timestamp'] for doc in docs), key=point['meter_id'])
+            if collection_name == 'user_load_data':
+                # 登记数据可用性位图（只置位，不读取原始数据）
+                meter_availability.record(point['meter_id'], (doc['timestamp'] for doc in docs))
+                span = [docs[0]['timestamp'] if span is None else span[0], docs[-1]['timestamp']]
+            counts[collection_name] += len(docs)
+        if span:
+            # 登记用户/电表目录：点数取自可用性位图，重复写入同一批数据不会重复计数
+            meter_catalog.record(point['meter_id'], point['user_id'], point['user_name'], span,
+                                 count=meter_availability.slot_count(point['meter_id']))
+        if rollups and span:
+            # 计量点写完后一次性重算电表日电量汇总（daily_energy 接口）
+            meter_energy_service.record(point['meter_id'], span)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='负荷/电表合成数据生成')
+    parser.add_argument('--meters', type=int, default=100, help='计量点数，默认 100')
+    parser.add_argument('--years', type=float, default=1, help='年数，默认 1')
+    parser.add_argument('--start-date', default='2023-01-01', help='起始业务日，默认 2023-01-01')
+    parser.add_argument('--collections', default=','.join(ALL_COLLECTIONS),
+                        help=f'要生成的集合，逗号分隔，默认 {",".join(ALL_COLLECTIONS)}')
+    parser.add_argument('--mp-interval', type=int, default=30, choices=[15, 30, 60],
+                        help='mp_load_curve 时间粒度（分钟），默认 30（48 点）')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2), help='并行进程数')
+    parser.add_argument('--seed', type=int, default=20240101, help='随机种子，默认 20240101')
+    parser.add_argument('--defer-indexes', action='store_true', help='先删除目标集合的注册表索引，写完后再创建')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--drop', action='store_true', help='写入前清空目标集合')
+    mode.add_argument('--append', action='store_true', help='向非空集合追加（与已有数据的时间段不能重叠）')
+    parser.add_argument('--force', action='store_true', help='允许写入库名不含 bench 的数据库')
+    args = parser.parse_args()
+
+    collections = [name.strip() for name in args.collections.split(',') if name.strip()]
+    unknown = [name for name in collections if name not in ALL_COLLECTIONS]
+    if unknown:
+        print(f"❌ 不支持的集合: {', '.join(unknown)}")
+        sys.exit(1)
+    if 'bench' not in DB_NAME and not args.force:
+        print(f"❌ 当前数据库为 '{DB_NAME}'，为防止误写生产库，请设置 MONGODB_DATABASE 为基准库或加 --force")
+        sys.exit(1)
+
+    start_date = datetime.strptime(args.start_date, '%Y-%m-%d')
+    days = int(round(args.years * 365))
+    points = load_metering_points(args.meters)
+    per_point = {'user_load_data': days * SLOTS_PER_DAY, 'meter_data': days * SLOTS_PER_DAY,
+                 'mp_load_curve': days * SLOTS_PER_DAY * 15 // args.mp_interval}
+    expected = sum(per_point[name] for name in collections) * len(points)
+    print(f"数据库 {DB_NAME}：{len(points)} 个计量点 × {days} 天，集合 {', '.join(collections)}，"
+          f"预计 {expected:,} 条，{args.workers} 个进程")
+
+    if not args.drop:
+        conflicts = find_conflicts(collections, points, start_date, days, args.append)
+        if conflicts:
+            if args.append:
+                print(f"❌ {', '.join(conflicts)} 中已有这些计量点 {args.start_date} 起 {days} 天内的数据，"
+                      f"重复写入会使电量翻倍，请换用其他 --start-date 或 --meters")
+            else:
+                print(f"❌ {', '.join(conflicts)} 已有数据，请加 --drop 清空后重新生成，或加 --append 追加不重叠的数据")
+            sys.exit(1)
+
+    for name in collections:
+        if args.drop:
+            DATABASE[name].drop()
+            data_catalog.clear(name)
+            if name == 'user_load_data':
+                DATABASE[ROLLUP_COLLECTION].drop()
+                DATABASE[AVAILABILITY_COLLECTION].drop()
+                meter_catalog.clear()
+        if args.defer_indexes:
+            DATABASE[name].drop_indexes()
+
+    # 按进程数切分计量点，每个任务处理若干计量点
+    chunk = max(1, len(points) // (args.workers * 4))
+    # 推迟建索引时不同步生成日电量汇总（无索引时逐电表查询过慢），建完索引后提示执行 build_meter_energy.py
+    rollups = 'user_load_data' in collections and not args.defer_indexes
+    if 'user_load_data' in collections:
+        ensure_indexes(DATABASE, [AVAILABILITY_COLLECTION, METER_CATALOG_COLLECTION]
+                       + ([ROLLUP_COLLECTION] if rollups else []))
+    tasks = [(points[i:i + chunk], start_date, days, collections, args.mp_interval, args.seed, rollups)
+             for i in range(0, len(points), chunk)]
+
+    begin = time.perf_counter()
+    totals = {name: 0 for name in collections}
+    if args.workers > 1:
+        # spawn：每个进程独立导入并创建自己的 MongoClient，避免 fork 共享连接
+        with multiprocessing.get_context('spawn').Pool(args.workers) as pool:
+            for counts in pool.imap_unordered(generate_for_points, tasks):
+                for name, count in counts.items():
+                    totals[name] += count
+                done = sum(totals.values())
+                print(f"  进度 {done:,}/{expected:,} ({done / max(expected, 1):.0%})，"
+                      f"{done / (time.perf_counter() - begin):,.0f} 条/秒", end='\r')
+    else:
+        for task in tasks:
+            for name, count in generate_for_points(task).items():
+                totals[name] += count
+    elapsed = time.perf_counter() - begin
+
+    print()
+    for name, count in totals.items():
+        print(f"  ✅ {name}: {count:,} 条")
+    print(f"写入完成，用时 {elapsed:.1f}s，{sum(totals.values()) / max(elapsed, 1e-9):,.0f} 条/秒")
+
+    print("创建索引...")
+    index_begin = time.perf_counter()
+    ensure_indexes(DATABASE, collections, verbose=True)
+    print(f"索引完成，用时 {time.perf_counter() - index_begin:.1f}s")
+    if 'user_load_data' in collections and not rollups:
+        print("日电量汇总未生成，请执行 python scripts/build_meter_energy.py --sync")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+慢查询报表
+
+汇总诊断集合 diagnostics_slow_queries（由 webapp/tools/slow_query.py 自动写入），
+按查询形状归并后按总耗时排名，标出全表扫描（COLLSCAN）和扫描/返回比过高的查询。
+
+用法：
+    python scripts/slow_query_report.py                 # 最近 7 天，前 20 名
+    python scripts/slow_query_report.py --days 1 --limit 50
+    python scripts/slow_query_report.py --collection customers --show-command
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from webapp.tools.mongo import DATABASE
+from webapp.tools.slow_query import SLOW_QUERY_COLLECTION
+
+
+def build_pipeline(since, collection=None, limit=20):
+    """按 (集合, 命令, 查询形状) 归并慢查询，按总耗时降序"""
+    match = {'timestamp': {'$gte': since}}
+    if collection:
+        match['collection'] = collection
+    return [
+        {'$match': match},
+        {'$sort': {'timestamp': -1}},
+        {'$group': {
+            '_id': {'collection': '$collection', 'command_name': '$command_name', 'shape': '$shape'},
+            'count': {'$sum': 1},
+            'total_ms': {'$sum': '$duration_ms'},
+            'avg_ms': {'$avg': '$duration_ms'},
+            'max_ms': {'$max': '$duration_ms'},
+            'collscan': {'$max': '$has_collscan'},
+            'max_docs_examined': {'$max': '$docs_examined'},
+            'max_examined_ratio': {'$max': '$examined_ratio'},
+            'routes': {'$addToSet': '$route'},
+            'index_names': {'$first': '$index_names'},
+            'plan_stages': {'$first': '$plan_stages'},
+            'sample_command': {'$first': '$command'},
+            'last_seen': {'$first': '$timestamp'},
+        }},
+        {'$sort': {'total_ms': -1}},
+        {'$limit': limit},
+    ]
+
+
+def print_report(rows, show_command=False):
+    """打印排名"""
+    if not rows:
+        print("没有慢查询记录。")
+        return
+
+    for rank, row in enumerate(rows, start=1):
+        key = row['_id']
+        flag = '⚠️ COLLSCAN' if row.get('collscan') else ''
+        print(f"\n#{rank} {key['collection']}.{key['command_name']} {flag}")
+        print(f"  次数: {row['count']}  总耗时: {row['total_ms']:.0f}ms  "
+              f"平均: {row['avg_ms']:.1f}ms  最大: {row['max_ms']:.1f}ms")
+        print(f"  最大扫描文档数: {row.get('max_docs_examined')}  最大扫描/返回比: {row.get('max_examined_ratio')}")
+        print(f"  计划: {' > '.join(row.get('plan_stages') or []) or '-'}  "
+              f"索引: {', '.join(row.get('index_names') or []) or '-'}")
+        print(f"  路由: {', '.join(sorted(r for r in row['routes'] if r))}")
+        print(f"  最近出现: {row['last_seen']:%Y-%m-%d %H:%M:%S}")
+        print(f"  查询形状: {key['shape']}")
+        if show_command:
+            print(f"  示例命令: {row.get('sample_command')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='慢查询报表')
+    parser.add_argument('--days', type=float, default=7, help='统计最近 N 天，默认 7')
+    parser.add_argument('--limit', type=int, default=20, help='输出前 N 名，默认 20')
+    parser.add_argument('--collection', help='只看指定集合')
+    parser.add_argument('--show-command', action='store_true', help='输出示例命令')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出')
+    args = parser.parse_args()
+
+    since = datetime.now() - timedelta(days=args.days)
+    rows = list(DATABASE[SLOW_QUERY_COLLECTION].aggregate(
+        build_pipeline(since, args.collection, args.limit)))
+
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2, default=str))
+        return
+
+    print("=" * 60)
+    print(f"慢查询报表（{since:%Y-%m-%d %H:%M} 至今，按总耗时排名）")
+    print("=" * 60)
+    print_report(rows, args.show_command)
+
+
+if __name__ == "__main__":
+    main()
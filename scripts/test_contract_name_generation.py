@@ -5,6 +5,7 @@
 此脚本测试新的合同名称生成逻辑，确保使用客户的 short_name 字段
 """
 
+import asyncio
 import sys
 import os
 from datetime import datetime
@@ -13,7 +14,7 @@ from bson import ObjectId
 # 添加项目根目录到 Python 路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from webapp.tools.mongo import DATABASE
+from webapp.tools.mongo import DATABASE, ASYNC_DATABASE
 from webapp.services.contract_service import ContractService
 
 
@@ -27,7 +28,9 @@ def test_contract_name_generation():
 
     try:
         # 创建合同服务实例
-        service = ContractService(DATABASE)
+        service = ContractService(ASYNC_DATABASE)
+        # 服务层为异步实现，脚本中复用同一个事件循环驱动
+        loop = asyncio.new_event_loop()
 
         # 获取一些测试数据
         print("\n1. 检查测试数据...")
@@ -67,7 +70,7 @@ def test_contract_name_generation():
 
             for date in test_dates:
                 try:
-                    contract_name = service._generate_contract_name(customer_id, date)
+                    contract_name = loop.run_until_complete(service._generate_contract_name(customer_id, date))
                     expected_name = f"{short_name}{date.strftime('%Y%m')}"
 
                     print(f"  - {date.strftime('%Y-%m')}: {contract_name}")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+分时电价规则版本切换脚本
+
+从指定日期起用新规则替换 tou_rules 中涉及月份的现行规则，历史日期仍按原规则分析
+（规则版本见 webapp/services/tou_service.py）：
+- 生效日当天仍有效的旧规则：原生效起点早于切换日的结束于切换日前一天，未涉及的月份从切换日起另存一份继续生效；
+  原生效起点不早于切换日的只保留未涉及的月份（全部涉及时删除）
+- 新规则以 effective_from = 切换日写入；涉及月份在切换日之后已录入新版本的，新规则在该版本生效前一天结束，
+  之后的版本不受影响
+
+规则文件为 JSON 数组，每项 {"months": [1, 2, ...], "period_type": "高峰", "start_time": "08:00", "end_time": "11:00"}，
+新规则涉及的月份即各项 months 的并集（这些月份未声明的时刻为平段）。
+
+用法：
+    python scripts/tou_rules_version.py --effective-from 2025-07-01 --rules tou_2025_summer.json
+    python scripts/tou_rules_version.py --effective-from 2025-07-01 --rules tou_2025_summer.json --dry-run
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from webapp.services.tou_service import compile_periods
+from webapp.tools.mongo import DATABASE, DB_NAME
+
+RULE_FIELDS = ('months', 'period_type', 'start_time', 'end_time')
+
+
+def load_rules(path):
+    """读取并校验规则文件"""
+    with open(path, encoding='utf-8') as f:
+        rules = json.load(f)
+    if not isinstance(rules, list) or not rules:
+        raise ValueError("规则文件应为非空 JSON 数组")
+    for rule in rules:
+        missing = [field for field in RULE_FIELDS if field not in rule]
+        if missing:
+            raise ValueError(f"规则缺少字段 {missing}: {rule}")
+        if not rule['months'] or any(month not in range(1, 13) for month in rule['months']):
+            raise ValueError(f"规则月份无效: {rule}")
+    # 时刻格式不合法时这里抛出异常
+    compile_periods(rules)
+    return [{field: rule[field] for field in RULE_FIELDS} for rule in rules]
+
+
+def plan(collection, effective_from, rules):
+    """
+    计算切换操作
+
+    Returns:
+        [(操作, 描述, 参数)]，操作为 'update' / 'delete' / 'insert'
+    """
+    months = sorted({month for rule in rules for month in rule['months']})
+    previous_day = (datetime.strptime(effective_from, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+    active = collection.find({
+        'months': {'$in': months},
+        '$and': [
+            {'$or': [{'effective_from': None}, {'effective_from': {'$lte': effective_from}}]},
+            {'$or': [{'effective_to': None}, {'effective_to': {'$gte': effective_from}}]},
+        ],
+    })
+
+    operations = []
+    for doc in active:
+        remaining = [month for month in doc['months'] if month not in months]
+        label = f"{doc['period_type']} {doc['start_time']}-{doc['end_time']} 月份 {doc['months']}"
+        if doc.get('effective_from') and doc['effective_from'] >= effective_from:
+            if remaining:
+                operations.append(('update', f"{label} -> 月份 {remaining}",
+                                   ({'_id': doc['_id']}, {'$set': {'months': remaining}})))
+            else:
+                operations.append(('delete', label, {'_id': doc['_id']}))
+            continue
+        operations.append(('update', f"{label} 结束于 {previous_day}",
+                           ({'_id': doc['_id']}, {'$set': {'effective_to': previous_day}})))
+        if remaining:
+            carried = {field: doc[field] for field in RULE_FIELDS}
+            carried.update({'months': remaining, 'effective_from': effective_from,
+                            'effective_to': doc.get('effective_to')})
+            operations.append(('insert', f"{label} 未涉及月份 {remaining} 继续生效", carried))
+
+    # 切换日之后已录入的版本：新规则在对应月份下一版本生效前一天结束
+    next_from = {}
+    for doc in collection.find({'months': {'$in': months}, 'effective_from': {'$gt': effective_from}},
+                               {'months': 1, 'effective_from': 1}):
+        for month in doc['months']:
+            if month in months and (month not in next_from or doc['effective_from'] < next_from[month]):
+                next_from[month] = doc['effective_from']
+
+    for rule in rules:
+        groups = {}
+        for month in rule['months']:
+            groups.setdefault(next_from.get(month), []).append(month)
+        for until, group in groups.items():
+            effective_to = None
+            if until:
+                effective_to = (datetime.strptime(until, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+            operations.append(('insert', f"{rule['period_type']} {rule['start_time']}-{rule['end_time']} "
+                                         f"月份 {group} 自 {effective_from} 生效"
+                                         + (f"至 {effective_to}" if effective_to else ''),
+                               {**rule, 'months': group, 'effective_from': effective_from,
+                                'effective_to': effective_to}))
+    return operations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分时电价规则版本切换')
+    parser.add_argument('--effective-from', required=True, help='新规则生效日 YYYY-MM-DD')
+    parser.add_argument('--rules', required=True, help='新规则 JSON 文件')
+    parser.add_argument('--dry-run', action='store_true', help='只打印将要执行的操作，不写入')
+    args = parser.parse_args()
+
+    try:
+        effective_from = datetime.strptime(args.effective_from, '%Y-%m-%d').strftime('%Y-%m-%d')
+        rules = load_rules(args.rules)
+    except (ValueError, OSError) as e:
+        print(f"参数错误: {e}")
+        sys.exit(1)
+
+    collection = DATABASE.tou_rules
+    operations = plan(collection, effective_from, rules)
+    for action, description, _ in operations:
+        print(f"[{action}] {description}")
+    if args.dry_run:
+        print(f"共 {len(operations)} 项操作（dry-run，未写入）")
+        return
+
+    for action, _, params in operations:
+        if action == 'update':
+            collection.update_one(*params)
+        elif action == 'delete':
+            collection.delete_one(params)
+        else:
+            collection.insert_one(params)
+    print(f"{DB_NAME}.tou_rules: 已执行 {len(operations)} 项操作；"
+          f"各服务进程在 [MARKET] tou_refresh_seconds 内读取新规则，"
+          f"受影响业务日的市场汇总由 scripts/build_market_summary.py 自动重算，"
+          f"电表日电量汇总执行 scripts/build_meter_energy.py --sync 重算")
+
+
+if __name__ == "__main__":
+    main()
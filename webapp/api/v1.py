@@ -1,19 +1,32 @@
 import os
 import tempfile
 import shutil
-from fastapi import APIRouter, Query, HTTPException, File, UploadFile, Form, Response, Body
-from webapp.tools.mongo import DATABASE
-from typing import List, Dict
+from fastapi import APIRouter, Query, HTTPException, File, UploadFile, Form, Request, Response, Body
+from fastapi.responses import StreamingResponse
+from urllib.parse import quote
+from webapp.tools.mongo import ANALYTICS_DATABASE
+from webapp.tools.responses import BSONResponse
+from webapp.tools.http_cache import market_day_cache
+from webapp.tools import table_export
+from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 import calendar
 import statistics
-from bson import json_util
-import json
+
+import numpy as np
 
 from webapp.api import v1_retail_packages, v1_customers, v1_retail_contracts
-from webapp.services.package_service import PackageService
+from webapp.services.package_service import package_service
 from webapp.services.pricing_engine import PricingEngine
 from webapp.services.pricing_model_service import pricing_model_service
+from webapp.services.price_cube import FIELD_INDEX, PRICE_FIELDS, SLOT_TIME_STRS, price_cube, slot_index
+from webapp.services import market_kpi, tou_aggregation
+from webapp.services.market_summary import market_summary_service
+from webapp.services.data_catalog import data_catalog
+from webapp.services.meter_availability import meter_availability
+from webapp.services.meter_catalog import MeterCatalogNotBuilt, meter_catalog
+from webapp.services.meter_energy import meter_energy_service
+from webapp.services.tou_service import tou_service
 
 # 创建一个API路由器
 router = APIRouter(prefix="/api/v1", tags=["v1"])
@@ -22,11 +35,36 @@ router.include_router(v1_customers.router)  # 客户管理路由
 router.include_router(v1_retail_contracts.router)  # 零售合同管理路由
 
 # --- 集合定义 ---
-USER_COLLECTION = DATABASE['user_load_data']
-DA_PRICE_COLLECTION = DATABASE['day_ahead_spot_price']
-RT_PRICE_COLLECTION = DATABASE['real_time_spot_price']
-TOU_RULES_COLLECTION = DATABASE['tou_rules']
-PRICE_SGCC_COLLECTION = DATABASE['price_sgcc']
+USER_COLLECTION = ANALYTICS_DATABASE['user_load_data']
+DA_PRICE_COLLECTION = ANALYTICS_DATABASE['day_ahead_spot_price']
+RT_PRICE_COLLECTION = ANALYTICS_DATABASE['real_time_spot_price']
+PRICE_SGCC_COLLECTION = ANALYTICS_DATABASE['price_sgcc']
+SETTLEMENT_PERIOD_COLLECTION = ANALYTICS_DATABASE['spot_settlement_period']
+
+
+# 区间类接口最多支持的天数
+MAX_RANGE_DAYS = 731
+
+
+def _validate_date_range(start: str, end: str):
+    """校验日期区间参数（含首尾），不合法时抛出 400"""
+    try:
+        start_date = datetime.strptime(start, "%Y-%m-%d")
+        end_date = datetime.strptime(end, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="日期格式无效，请使用 YYYY-MM-DD 格式")
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="结束日期不能早于开始日期")
+    if (end_date - start_date).days + 1 > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"日期区间不能超过 {MAX_RANGE_DAYS} 天")
+
+
+def _price_day_docs(market: str, date_str: str) -> List[Dict]:
+    """业务日的价格文档（按时间升序）：启用价格立方体时从内存读取，否则查询 Mongo"""
+    if price_cube.enabled:
+        return price_cube.day_docs(market, date_str)
+    collection = DA_PRICE_COLLECTION if market == 'day_ahead' else RT_PRICE_COLLECTION
+    return list(collection.find({"date_str": date_str}, {'_id': 0}).sort("datetime", 1))
 
 
 # ##############################################################################
@@ -35,164 +73,264 @@ PRICE_SGCC_COLLECTION = DATABASE['price_sgcc']
 
 @router.get("/users", summary="获取所有唯一的用户列表")
 def get_users():
-    pipeline = [
-        {'$group': {'_id': "$user_id", 'user_name': {'$first': '$user_name'}}},
-        {'$project': {'user_id': '$_id', 'user_name': '$user_name', '_id': 0}},
-        {'$sort': {'user_name': 1}}
-    ]
-    return list(USER_COLLECTION.aggregate(pipeline))
+    # 从用户/电表目录读取，不再对全部负荷数据做 $group；目录未建立时提示执行重建脚本
+    try:
+        return meter_catalog.get_users()
+    except MeterCatalogNotBuilt as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 @router.get("/meters", summary="获取指定用户的所有电表列表")
 def get_meters(user_id: str = Query(..., description="要查询的用户的ID")):
-    query = {'user_id': user_id}
-    meter_ids = USER_COLLECTION.distinct("meter_id", query)
-    return [{"meter_id": meter_id} for meter_id in sorted(meter_ids)]
+    # 从用户/电表目录按索引读取（含负荷数据首尾时间、点数），目录之外的新数据按索引补齐
+    return meter_catalog.get_meters(user_id)
+
+# 负荷曲线时刻标签：按时段结束时刻，当天分钟数 -> "00:15".."23:45"，次日 00:00 为 "24:00"
+LOAD_TIME_LABELS = {minutes % 1440: time_str for minutes, time_str in
+                    ((i * 15, f"{i * 15 // 60:02d}:{i * 15 % 60:02d}") for i in range(1, 97))}
+
+
+def _load_curves(meter_id: str, days: List[datetime]) -> Dict[str, List[Dict]]:
+    """
+    一次查询取回电表多个业务日的负荷曲线
+
+    每个业务日的区间为左开右闭 (D 00:00, D+1 00:00]，D+1 00:00 的点即当日 24:00；
+    连续的日期合并为一个区间，所有区间放在同一个 $or 查询中。
+
+    Args:
+        meter_id: 电表ID
+        days: 业务日（00:00 的 datetime）
+
+    Returns:
+        {date_str: [{"time", "value"}]}，按时间升序
+    """
+    curves = {day.strftime("%Y-%m-%d"): [] for day in days}
+    ranges = []
+    for day in sorted(set(days)):
+        if ranges and ranges[-1][1] == day:
+            ranges[-1][1] = day + timedelta(days=1)
+        else:
+            ranges.append([day, day + timedelta(days=1)])
+    if not ranges:
+        return curves
+
+    windows = [{"timestamp": {"$gt": first, "$lte": last}} for first, last in ranges]
+    query = {"meter_id": meter_id, **(windows[0] if len(windows) == 1 else {"$or": windows})}
+    cursor = USER_COLLECTION.find(query, {"timestamp": 1, "load_value": 1, "_id": 0}).sort("timestamp", 1)
+    for doc in cursor:
+        timestamp = doc["timestamp"]
+        # 左开右闭：00:00 的点属于前一个业务日（24:00）
+        points = curves.get((timestamp - timedelta(microseconds=1)).strftime("%Y-%m-%d"))
+        if points is None:
+            continue
+        label = LOAD_TIME_LABELS.get(timestamp.hour * 60 + timestamp.minute) \
+            if not (timestamp.second or timestamp.microsecond) else None
+        points.append({"time": label or timestamp.strftime("%H:%M"), "value": doc["load_value"]})
+    return curves
+
 
 @router.get("/load_curve", summary="获取指定电表一个或多个日期的负荷曲线")
 def get_load_curve(meter_id: str = Query(..., description="电表ID"), date: List[str] = Query(..., description="查询的日期列表, 格式 YYYY-MM-DD")):
-    response_data = {}
+    days = {}
     for date_str in date:
         try:
-            start_date = datetime.strptime(date_str, "%Y-%m-%d")
-            end_date = start_date + timedelta(days=1)
-            query = {"meter_id": meter_id, "timestamp": {"$gte": start_date, "$lt": end_date}}
-            projection = {"timestamp": 1, "load_value": 1, "_id": 0}
-            cursor = USER_COLLECTION.find(query, projection).sort("timestamp", 1)
-            points = [{"time": doc["timestamp"].strftime("%H:%M"), "value": doc["load_value"]} for doc in cursor]
-            response_data[date_str] = points
+            days[date_str] = datetime.strptime(date_str, "%Y-%m-%d")
         except ValueError:
-            response_data[date_str] = {"error": "Invalid date format."}
             continue
-    return response_data
+    curves = _load_curves(meter_id, list(days.values()))
 
-@router.get("/daily_energy", summary="获取指定电表一个或多个月份的日电量数据")
-def get_daily_energy(meter_id: str = Query(..., description="电表ID"), month: List[str] = Query(..., description="查询的月份列表, 格式 YYYY-MM")):
     response_data = {}
-    for month_str in month:
+    for date_str in date:
+        if date_str in days:
+            response_data[date_str] = curves[days[date_str].strftime("%Y-%m-%d")]
+        else:
+            response_data[date_str] = {"error": "Invalid date format."}
+    return response_data
+
+def _parse_months(months: List[str]) -> Dict[str, Optional[tuple]]:
+    """月份参数 -> (首日, 末日)，格式无效的月份为 None"""
+    parsed = {}
+    for month_str in months:
         try:
             year, mon = map(int, month_str.split('-'))
-            start_date = datetime(year, mon, 1)
-            end_date = datetime(year, mon, calendar.monthrange(year, mon)[1], 23, 59, 59)
-            pipeline = [
-                {'$match': {'meter_id': meter_id, 'timestamp': {'$gte': start_date, '$lte': end_date}}},
-                {'$group': {'_id': {'$dayOfMonth': '$timestamp'}, 'energy': {'$sum': '$load_value'}}},
-                {'$sort': {'_id': 1}},
-                {'$project': {'day': '$_id', 'energy': '$energy', '_id': 0}}
-            ]
-            response_data[month_str] = list(USER_COLLECTION.aggregate(pipeline))
+            parsed[month_str] = (f"{year:04d}-{mon:02d}-01", f"{year:04d}-{mon:02d}-{calendar.monthrange(year, mon)[1]:02d}")
         except ValueError:
+            parsed[month_str] = None
+    return parsed
+
+
+@router.get("/daily_energy", summary="获取指定电表一个或多个月份的日电量数据")
+def get_daily_energy(meter_id: str = Query(..., description="电表ID"), month: List[str] = Query(..., description="查询的月份列表, 格式 YYYY-MM")):
+    # 读取 meter_daily_energy 日汇总（所有月份一次查询，只读取所请求的月份），不再对原始 15 分钟负荷做 $group
+    parsed = _parse_months(month)
+    docs = meter_energy_service.daily_ranges(meter_id, [value for value in parsed.values() if value])
+
+    response_data = {}
+    for month_str, value in parsed.items():
+        if value is None:
             response_data[month_str] = {"error": "Invalid month format."}
             continue
+        first, last = value
+        response_data[month_str] = [{"day": int(doc['date_str'][8:]), "energy": doc['energy']}
+                                    for doc in docs if first <= doc['date_str'] <= last]
     return response_data
 
+
+@router.get("/monthly_energy", summary="获取指定电表一个或多个月份的月度电量汇总")
+def get_monthly_energy(meter_id: str = Query(..., description="电表ID"), month: List[str] = Query(..., description="查询的月份列表, 格式 YYYY-MM")):
+    parsed = _parse_months(month)
+    valid = [value[0][:7] for value in parsed.values() if value]
+    totals = meter_energy_service.monthly(meter_id, valid)
+    return {month_str: (totals[value[0][:7]] if value else {"error": "Invalid month format."})
+            for month_str, value in parsed.items()}
+
 @router.get("/available-dates", summary="获取指定电表所有存在数据的日期")
 def get_available_dates(meter_id: str = Query(..., description="电表ID")):
-    pipeline = [
-        {'$match': {'meter_id': meter_id}},
-        {'$project': {'date': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$timestamp'}}, '_id': 0}},
-        {'$group': {'_id': '$date'}},
-        {'$sort': {'_id': 1}}
-    ]
-    return [doc['_id'] for doc in USER_COLLECTION.aggregate(pipeline)]
+    # 从数据日期目录读取，不再对电表全部负荷数据做 $dateToString 聚合
+    return data_catalog.get_dates('user_load_data', meter_id)
+
+# 数据可用性批量查询最多支持的电表数
+MAX_AVAILABILITY_METERS = 10000
+
+
+@router.post("/load-availability", summary="批量查询电表负荷数据可用性（按天/按时段完整性）")
+def get_load_availability(data: dict = Body(..., description="{meter_ids: [...], start: YYYY-MM-DD, end: YYYY-MM-DD, slots: bool}")):
+    meter_ids = data.get("meter_ids") or []
+    if not isinstance(meter_ids, list) or not meter_ids:
+        raise HTTPException(status_code=400, detail="meter_ids 不能为空")
+    if len(meter_ids) > MAX_AVAILABILITY_METERS:
+        raise HTTPException(status_code=400, detail=f"一次最多查询 {MAX_AVAILABILITY_METERS} 个电表")
+    start, end = data.get("start"), data.get("end")
+    if not start or not end:
+        raise HTTPException(status_code=400, detail="start / end 不能为空")
+    _validate_date_range(start, end)
+    # 从可用性位图读取，一次查询覆盖全部电表，不扫描原始负荷数据
+    return meter_availability.query([str(meter_id) for meter_id in meter_ids],
+                                    datetime.strptime(start, "%Y-%m-%d").date(),
+                                    datetime.strptime(end, "%Y-%m-%d").date(), slots=bool(data.get("slots")))
 
 @router.get("/available_months", summary="获取所有存在价格数据的月份")
 def get_available_months():
     try:
-        pipeline = [
-            {'$project': {'month': {'$dateToString': {'format': '%Y-%m', 'date': '$datetime'}}}},
-            {'$group': {'_id': '$month'}},
-            {'$sort': {'_id': -1}}
-        ]
-        # 这里我们假设日前和实时数据的月份范围基本一致，使用日前价格集合进行查询
-        months = [doc['_id'] for doc in DA_PRICE_COLLECTION.aggregate(pipeline)]
-        return months
+        # 这里我们假设日前和实时数据的月份范围基本一致，使用日前价格集合的目录
+        return data_catalog.get_months('day_ahead_spot_price')[::-1]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
+def _slot_business_key(slot: str):
+    """
+    把日历时刻 HH:MM（时段结束时刻）转换为 (业务时刻 time_str, 业务日相对日历日的偏移天数)
+
+    00:00 是前一业务日的 24:00，其余时刻与 time_str 相同
+    """
+    time_str = datetime.strptime(slot, "%H:%M").strftime("%H:%M") if slot != "24:00" else slot
+    if time_str == "00:00":
+        return "24:00", 1
+    if slot_index(time_str) < 0:
+        raise ValueError(f"无效的时段: {slot}")
+    return time_str, 0
+
+
 def get_tou_rule_for_date(date: datetime) -> Dict[str, str]:
-    month = date.month
-    query = {"months": month}
-    rules = list(TOU_RULES_COLLECTION.find(query))
-    
-    time_to_period_map = {}
-    for i in range(96):
-        time_obj = datetime(2000, 1, 1) + timedelta(minutes=15 * i)
-        time_to_period_map[time_obj.strftime("%H:%M")] = "平段"
-
-    priority = ["高峰", "低谷", "尖峰", "深谷"]
-    sorted_rules = sorted(rules, key=lambda r: priority.index(r['period_type']) if r['period_type'] in priority else -1)
-
-    for rule in sorted_rules:
-        start = datetime.strptime(rule['start_time'], '%H:%M').time()
-        end_time_str = rule['end_time']
-        for time_str in time_to_period_map:
-            current_time = datetime.strptime(time_str, '%H:%M').time()
-            if end_time_str == '24:00':
-                if current_time >= start:
-                    time_to_period_map[time_str] = rule['period_type']
-            else:
-                end = datetime.strptime(end_time_str, '%H:%M').time()
-                if start <= current_time < end:
-                    time_to_period_map[time_str] = rule['period_type']
-    return time_to_period_map
+    """指定日期所在月份的分时时段映射（编译结果由 tou_service 进程内缓存）"""
+    return tou_service.get_tou_map(date)
 
-@router.get("/price_comparison", summary="获取指定单日的日前与实时价格对比数据")
-def get_price_comparison(date: str = Query(..., description="查询日期, 格式 YYYY-MM-DD")):
-    try:
-        start_date = datetime.strptime(date, "%Y-%m-%d")
-        end_date = start_date + timedelta(days=1)
-        tou_rules = get_tou_rule_for_date(start_date)
+# 日历日内 96 个时刻（价格对比图按时段结束时刻的日历日展示，00:00 为前一业务日的 24:00）
+CLOCK_TIME_STRS = tuple(f"{m // 60:02d}:{m % 60:02d}" for m in range(0, 1440, 15))
 
-        # --- 优化：一次性查询当天所有数据 ---
-        query = {"datetime": {"$gte": start_date, "$lt": end_date}}
-        da_docs = list(DA_PRICE_COLLECTION.find(query))
-        rt_docs = list(RT_PRICE_COLLECTION.find(query))
 
-        # --- 优化：将列表转换为字典以便快速查找 ---
-        da_price_map = {doc['datetime']: doc for doc in da_docs}
-        rt_price_map = {doc['datetime']: doc for doc in rt_docs}
+def _clock_price_matrix(market: str, dates: List[str]) -> np.ndarray:
+    """
+    多个日历日的出清价格矩阵
 
-        chart_data, da_prices_for_stats, rt_prices_for_stats = [], [], []
-        tou_stats_collector = {period: {"da": [], "rt": []} for period in set(tou_rules.values())}
+    日历日 D 的 96 个时刻为 D 00:00..23:45，对应业务日 D-1 的 24:00 和业务日 D 的 00:15..23:45。
+    启用价格立方体时从内存读取，否则每个集合只查询一次（date_str $in）。
 
-        for i in range(96):
-            time_obj = start_date + timedelta(minutes=15 * i)
-            # --- 优化：从字典中直接获取数据，而不是查询数据库 ---
-            da_doc = da_price_map.get(time_obj)
-            rt_doc = rt_price_map.get(time_obj)
-            
-            da_price = da_doc.get('avg_clearing_price') if da_doc else None
-            rt_price = rt_doc.get('avg_clearing_price') if rt_doc else None
-            time_str = time_obj.strftime("%H:%M")
-            period_type = tou_rules.get(time_str, "平段")
-            
-            chart_data.append({"time": time_str, "day_ahead_price": da_price, "real_time_price": rt_price, "period_type": period_type})
-            
-            if da_price is not None:
-                da_prices_for_stats.append(da_price)
-                if period_type in tou_stats_collector: tou_stats_collector[period_type]["da"].append(da_price)
-            if rt_price is not None:
-                rt_prices_for_stats.append(rt_price)
-                if period_type in tou_stats_collector: tou_stats_collector[period_type]["rt"].append(rt_price)
+    Returns:
+        形状 (日期数, 96) 的数组，缺失为 NaN
+    """
+    business_days = sorted({d for day in dates for d in (
+        (datetime.strptime(day, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d"), day)})
+    result = np.full((len(dates), 96), np.nan)
+    column = FIELD_INDEX['avg_clearing_price']
+    if price_cube.enabled:
+        days = {}
+        for day in business_days:
+            values = price_cube.day(market, day)
+            if values is not None:
+                days[day] = values[:, column]
+        for i, day in enumerate(dates):
+            previous = (datetime.strptime(day, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+            if previous in days:
+                result[i, 0] = days[previous][-1]
+            if day in days:
+                result[i, 1:] = days[day][:-1]
+        return result
 
-        # --- 统计计算部分保持不变 ---
-        stats = {
-            "day_ahead_avg": statistics.mean(da_prices_for_stats) if da_prices_for_stats else None,
-            "day_ahead_std_dev": statistics.stdev(da_prices_for_stats) if len(da_prices_for_stats) > 1 else 0,
-            "day_ahead_max": max(da_prices_for_stats) if da_prices_for_stats else None,
-            "day_ahead_min": min(da_prices_for_stats) if da_prices_for_stats else None,
-            "real_time_avg": statistics.mean(rt_prices_for_stats) if rt_prices_for_stats else None,
-            "real_time_std_dev": statistics.stdev(rt_prices_for_stats) if len(rt_prices_for_stats) > 1 else 0,
-            "real_time_max": max(rt_prices_for_stats) if rt_prices_for_stats else None,
-            "real_time_min": min(rt_prices_for_stats) if rt_prices_for_stats else None,
-        }
-        tou_stats = {}
-        for period, values in tou_stats_collector.items():
-            tou_stats[period] = {
-                "day_ahead_avg": statistics.mean(values["da"]) if values["da"] else None,
-                "real_time_avg": statistics.mean(values["rt"]) if values["rt"] else None,
-            }
+    collection = DA_PRICE_COLLECTION if market == 'day_ahead' else RT_PRICE_COLLECTION
+    row_of = {day: i for i, day in enumerate(dates)}
+    cursor = collection.find({"date_str": {"$in": business_days}},
+                             {'_id': 0, 'datetime': 1, 'avg_clearing_price': 1})
+    for doc in cursor:
+        ts, price = doc.get('datetime'), doc.get('avg_clearing_price')
+        row = row_of.get(ts.strftime("%Y-%m-%d")) if ts else None
+        if row is not None and price is not None and ts.minute % 15 == 0:
+            result[row, ts.hour * 4 + ts.minute // 15] = price
+    return result
+
+
+def _nan_to_none(values) -> List:
+    return [None if v != v else v for v in values]
+
+
+def _compare_prices(dates: List[str]) -> Dict[str, Dict]:
+    """
+    多个日历日的日前/实时价格对比（图表数据、统计、分时段统计），一次向量化计算
+
+    Returns:
+        {date: {"chart_data", "stats", "tou_stats"}}
+    """
+    da = _clock_price_matrix('day_ahead', dates)
+    rt = _clock_price_matrix('real_time', dates)
+
+    # 各日期生效的分时时段表（CLOCK_TIME_STRS 即时段开始时刻，与编译结果的顺序一致）
+    day_periods = [tou_service.slot_periods(day) for day in dates]
+    periods = tou_service.period_matrix(dates, by_slot_start=True)
+
+    def summarize(values):
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(valid, values, 0).sum(axis=1) / count
+            squares = np.where(valid, values - mean[:, None], 0) ** 2
+            std = np.where(count > 1, np.sqrt(squares.sum(axis=1) / (count - 1)), 0.0)
+        high = np.where(count > 0, np.where(valid, values, -np.inf).max(axis=1), np.nan)
+        low = np.where(count > 0, np.where(valid, values, np.inf).min(axis=1), np.nan)
+        return [_nan_to_none(column.tolist()) for column in (mean, std, high, low)]
+
+    da_stats, rt_stats = summarize(da), summarize(rt)
+
+    # 分时段均值：(日期数, 96) 一次按时段聚合
+    period_avgs = {}
+    for name, values in (("da", da), ("rt", rt)):
+        for period, stats in tou_aggregation.period_stats(values, periods).items():
+            period_avgs[(period, name)] = _nan_to_none(stats['mean'].tolist())
+    no_data = [None] * len(dates)
+
+    result = {}
+    da_rows, rt_rows = da.tolist(), rt.tolist()
+    for i, day in enumerate(dates):
+        chart_data = [{"time": time_str, "day_ahead_price": da_price, "real_time_price": rt_price, "period_type": period}
+                      for time_str, da_price, rt_price, period in zip(
+                          CLOCK_TIME_STRS, _nan_to_none(da_rows[i]), _nan_to_none(rt_rows[i]), day_periods[i])]
+        stats = {}
+        for prefix, (mean, std, high, low) in (("day_ahead", da_stats), ("real_time", rt_stats)):
+            stats.update({f"{prefix}_avg": mean[i], f"{prefix}_std_dev": std[i],
+                          f"{prefix}_max": high[i], f"{prefix}_min": low[i]})
+
+        tou_stats = {period: {"day_ahead_avg": period_avgs.get((period, "da"), no_data)[i],
+                              "real_time_avg": period_avgs.get((period, "rt"), no_data)[i]}
+                     for period in dict.fromkeys(day_periods[i])}
         flat_da_avg = tou_stats.get("平段", {}).get("day_ahead_avg")
         flat_rt_avg = tou_stats.get("平段", {}).get("real_time_avg")
         for period, values in tou_stats.items():
@@ -200,40 +338,73 @@ def get_price_comparison(date: str = Query(..., description="查询日期, 格
             else: values["day_ahead_ratio"] = None
             if flat_rt_avg and values["real_time_avg"] is not None: values["real_time_ratio"] = round(values["real_time_avg"] / flat_rt_avg, 2)
             else: values["real_time_ratio"] = None
-        return {"chart_data": chart_data, "stats": stats, "tou_stats": tou_stats}
+        result[day] = {"chart_data": chart_data, "stats": stats, "tou_stats": tou_stats}
+    return result
+
+
+@router.get("/price_comparison", summary="获取指定日期的日前与实时价格对比数据（支持多日批量）")
+def get_price_comparison(date: Optional[str] = Query(None, description="查询日期, 格式 YYYY-MM-DD（单日，返回该日结果）"),
+                         dates: Optional[List[str]] = Query(None, description="查询日期列表（批量，返回 {日期: 结果}）"),
+                         start: Optional[str] = Query(None, description="批量查询开始日期 YYYY-MM-DD（含）"),
+                         end: Optional[str] = Query(None, description="批量查询结束日期 YYYY-MM-DD（含）")):
+    if date is None and not dates and not (start and end):
+        raise HTTPException(status_code=400, detail="请提供 date、dates 或 start/end 参数")
+    if date is None:
+        if start and end:
+            _validate_date_range(start, end)
+            first = datetime.strptime(start, "%Y-%m-%d")
+            dates = [(first + timedelta(days=i)).strftime("%Y-%m-%d")
+                     for i in range((datetime.strptime(end, "%Y-%m-%d") - first).days + 1)]
+        try:
+            dates = sorted({datetime.strptime(day, "%Y-%m-%d").strftime("%Y-%m-%d") for day in dates})
+        except ValueError:
+            raise HTTPException(status_code=400, detail="日期格式无效，请使用 YYYY-MM-DD 格式")
+        if len(dates) > MAX_RANGE_DAYS:
+            raise HTTPException(status_code=400, detail=f"日期数量不能超过 {MAX_RANGE_DAYS} 天")
+    try:
+        if date is not None:
+            date = datetime.strptime(date, "%Y-%m-%d").strftime("%Y-%m-%d")
+            return _compare_prices([date])[date]
+        return _compare_prices(dates)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 @router.get("/timeslot_analysis", summary="获取指定月份、指定时段的每日价格数据")
 def get_timeslot_analysis(month: str = Query(..., description="查询月份, 格式 YYYY-MM"), slot: str = Query(..., description="查询的单个时段, 格式 HH:MM")):
+    try:
+        time_str, day_shift = _slot_business_key(slot)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="时段格式无效，请使用 15 分钟整点的 HH:MM 格式")
     try:
         year, mon = map(int, month.split('-'))
         num_days = calendar.monthrange(year, mon)[1]
-        slot_hour, slot_minute = map(int, slot.split(':'))
-        
-        start_date = datetime(year, mon, 1)
-        end_date = start_date + timedelta(days=num_days)
 
-        # --- 优化：使用聚合查询一次性获取所有符合条件的数据 ---
-        pipeline = [
-            {
-                '$match': {
-                    'datetime': {'$gte': start_date, '$lt': end_date},
-                    '$expr': {
-                        '$and': [
-                            {'$eq': [{'$hour': '$datetime'}, slot_hour]},
-                            {'$eq': [{'$minute': '$datetime'}, slot_minute]}
-                        ]
-                    }
-                }
+        start_date = datetime(year, mon, 1)
+        # 日历日 day 的 slot 时刻对应业务日 (day - day_shift) 的 time_str 时段
+        first_day = start_date - timedelta(days=day_shift)
+        last_day = first_day + timedelta(days=num_days - 1)
+
+        if price_cube.enabled:
+            # 从价格立方体取整月的单个时段列
+            column = slot_index(time_str)
+            da_price_map, rt_price_map = {}, {}
+            for market, price_map in (('day_ahead', da_price_map), ('real_time', rt_price_map)):
+                _, values = price_cube.span(market, first_day.strftime("%Y-%m-%d"), last_day.strftime("%Y-%m-%d"))
+                for offset, price in enumerate(values[:, column, FIELD_INDEX['avg_clearing_price']].tolist()):
+                    price_map[offset + 1] = {'avg_clearing_price': price} if price == price else None
+        else:
+            # 按 {date_str, time_str} 查询，可以使用索引，不再对整月数据做 $expr 过滤
+            query = {
+                'time_str': time_str,
+                'date_str': {'$gte': first_day.strftime("%Y-%m-%d"), '$lte': last_day.strftime("%Y-%m-%d")},
             }
-        ]
-        da_docs = list(DA_PRICE_COLLECTION.aggregate(pipeline))
-        rt_docs = list(RT_PRICE_COLLECTION.aggregate(pipeline))
+            projection = {'_id': 0, 'date_str': 1, 'avg_clearing_price': 1}
+
+            def day_of(doc):
+                return (datetime.strptime(doc['date_str'], "%Y-%m-%d") - first_day).days + 1
 
-        # --- 优化：转换为以“天”为键的字典以便快速查找 ---
-        da_price_map = {doc['datetime'].day: doc for doc in da_docs}
-        rt_price_map = {doc['datetime'].day: doc for doc in rt_docs}
+            da_price_map = {day_of(doc): doc for doc in DA_PRICE_COLLECTION.find(query, projection)}
+            rt_price_map = {day_of(doc): doc for doc in RT_PRICE_COLLECTION.find(query, projection)}
 
         chart_data, da_prices_for_stats, rt_prices_for_stats = [], [], []
         for day in range(1, num_days + 1):
@@ -263,6 +434,46 @@ def get_timeslot_analysis(month: str = Query(..., description="查询月份, 格
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
+@router.get("/market-analysis/price-matrix", summary="获取日期区间 × 时段的价格矩阵")
+def get_price_matrix(request: Request,
+                     start: str = Query(..., description="开始日期, 格式 YYYY-MM-DD"),
+                     end: str = Query(..., description="结束日期(含), 格式 YYYY-MM-DD"),
+                     slot: Optional[List[str]] = Query(None, description="业务时刻列表 00:15..24:00，不传为全部 96 个时段")):
+    """
+    一次返回日期区间内指定时段的日前价格、实时价格和价差（实时 - 日前）矩阵，用于热力图等展示。
+
+    - **dates**: 行（业务日）
+    - **slots**: 列（业务时刻 time_str，24:00 为当日最后一个时段）
+    - **day_ahead / real_time / spread**: 行 × 列 的二维数组，缺失为 null
+    """
+    _validate_date_range(start, end)
+    slots = list(SLOT_TIME_STRS) if not slot else slot
+    columns = [slot_index(time_str) for time_str in slots]
+    if min(columns) < 0:
+        raise HTTPException(status_code=400, detail="时段无效，请使用 00:15..24:00 之间的 15 分钟整点时刻")
+
+    try:
+        cached = market_day_cache.lookup(request, end)
+        if cached is not None:
+            return cached
+
+        price = FIELD_INDEX['avg_clearing_price']
+        dates, da_values = price_cube.span('day_ahead', start, end)
+        _, rt_values = price_cube.span('real_time', start, end)
+        # orjson 只能直接编码 C 连续的 NumPy 数组（NaN 输出为 null）
+        da_matrix = np.ascontiguousarray(da_values[:, columns, price])
+        rt_matrix = np.ascontiguousarray(rt_values[:, columns, price])
+        return market_day_cache.respond(request, end, {
+            "dates": dates,
+            "slots": slots,
+            "day_ahead": da_matrix,
+            "real_time": rt_matrix,
+            "spread": rt_matrix - da_matrix,
+        }, has_data=not np.isnan(da_matrix).all())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取价格矩阵时出错: {str(e)}")
+
+
 # ##############################################################################
 # 国网代购电价API (SGCC Agency Price APIs)
 # ##############################################################################
@@ -302,7 +513,7 @@ def get_sgcc_prices(page: int = 1, pageSize: int = 10):
             "chartData": chart_data
         }
         
-        return json.loads(json_util.dumps(response))
+        return BSONResponse(response)
 
     except Exception as e:
         print(f"[DEBUG] Error in get_sgcc_prices: {e}")
@@ -399,8 +610,7 @@ async def calculate_package_price(data: dict = Body(...)):
     time_period = data.get("time_period")
     volume_mwh = data.get("volume_mwh")
 
-    service = PackageService(DATABASE)
-    package = await service.get_package(package_id)
+    package = await package_service.get_package(package_id)
     if not package:
         raise HTTPException(status_code=404, detail="Package not found")
 
@@ -419,170 +629,190 @@ public_router = APIRouter(prefix="/api/v1", tags=["v1-public"])
 # ##############################################################################
 
 @router.get("/market-analysis/dashboard", summary="获取市场价格总览（Market Dashboard）")
-def get_market_dashboard(date_str: str = Query(..., description="查询日期, 格式 YYYY-MM-DD")):
+def get_market_dashboard(request: Request, date_str: str = Query(..., description="查询日期, 格式 YYYY-MM-DD")):
     """
     获取指定日期的市场价格总览数据，包括：
     - 财务KPI：VWAP、TWAP、价差
     - 风险KPI：最大/最小价差、极值价格
     - 96点时序数据：价格、电量曲线
     - 时段汇总统计：按尖峰平谷分组
+
+    已结束业务日的响应带 ETag 并在进程内缓存（见 webapp/tools/http_cache.py）
     """
     try:
         start_date = datetime.strptime(date_str, "%Y-%m-%d")
+        cached = market_day_cache.lookup(request, date_str)
+        if cached is not None:
+            return cached
         
         # 获取尖峰平谷规则
         tou_rules = get_tou_rule_for_date(start_date)
 
-        # 使用 date_str 查询，精确获取业务日的所有96个数据点（00:15 到 24:00）
-        query = {"date_str": date_str}
-        da_docs = list(DA_PRICE_COLLECTION.find(query).sort("datetime", 1))
-        rt_docs = list(RT_PRICE_COLLECTION.find(query).sort("datetime", 1))
-
-        # 为了稳健合并，使用 time_str 作为key创建查找字典
-        da_map = {doc['time_str']: doc for doc in da_docs}
-        rt_map = {doc['time_str']: doc for doc in rt_docs}
-
-        # 初始化数据容器和KPI计算所需的变量
-        time_series = []
-        da_weighted_sum, da_volume_sum, rt_weighted_sum, rt_volume_sum = 0, 0, 0, 0
-        da_prices, rt_prices = [], []
-
-        max_positive_spread = {"value": float('-inf'), "time_str": "", "period": 0}
-        max_negative_spread = {"value": float('inf'), "time_str": "", "period": 0}
-        max_rt_price = {"value": float('-inf'), "time_str": "", "period": 0}
-        min_rt_price = {"value": float('inf'), "time_str": "", "period": 0}
-        
-        period_collector = {}
+        # 按业务日取 96 点数组（00:15 到 24:00）；KPI 优先读取日汇总，汇总缺失或过期时由向量化引擎计算
+        _, da_values = price_cube.span('day_ahead', date_str, date_str)
+        _, rt_values = price_cube.span('real_time', date_str, date_str)
+        da_day, rt_day = da_values[0], rt_values[0]
+        kpis = market_summary_service.day_kpis(date_str, da_day, rt_day)
+        has_data = not np.isnan(da_day).all() and not np.isnan(rt_day).all()
 
-        # 以日前数据为基础进行遍历，保证时间的完整性
-        for i, da_doc in enumerate(da_docs):
-            period = i + 1
-            time_str = da_doc.get("time_str")
-            if not time_str:
-                continue
-
-            rt_doc = rt_map.get(time_str, {}) # 从实时数据字典中查找对应时段的数据
-
-            # 提取价格和电量
-            da_price = da_doc.get('avg_clearing_price')
-            da_volume = da_doc.get('total_clearing_power', 0)
-            rt_price = rt_doc.get('avg_clearing_price')
-            rt_volume = rt_doc.get('total_clearing_power', 0)
-            rt_wind = rt_doc.get('wind_clearing_power', 0)
-            rt_solar = rt_doc.get('solar_clearing_power', 0)
-
-            spread = (rt_price - da_price) if (rt_price is not None and da_price is not None) else None
-            period_type = tou_rules.get(time_str, "平段")
-
-            # 组装时序数据，确保 time_str 字段存在
-            time_series.append({
-                "period": period,
-                "time": time_str, # 兼容旧版，或者用于调试
-                "time_str": time_str, # 前端需要此字段
-                "price_rt": rt_price,
-                "price_da": da_price,
-                "volume_rt": rt_volume,
-                "volume_da": da_volume,
-                "spread": spread,
-                "period_type": period_type
-            })
-
-            # 累加用于计算KPIs
-            if da_price is not None and da_volume > 0:
-                da_weighted_sum += da_price * da_volume
-                da_volume_sum += da_volume
-                da_prices.append(da_price)
-
-            if rt_price is not None and rt_volume > 0:
-                rt_weighted_sum += rt_price * rt_volume
-                rt_volume_sum += rt_volume
-                rt_prices.append(rt_price)
-
-            # 更新风险指标
-            if spread is not None:
-                if spread > max_positive_spread["value"]:
-                    max_positive_spread.update({"value": spread, "time_str": time_str, "period": period})
-                if spread < max_negative_spread["value"]:
-                    max_negative_spread.update({"value": spread, "time_str": time_str, "period": period})
-            if rt_price is not None:
-                if rt_price > max_rt_price["value"]:
-                    max_rt_price.update({"value": rt_price, "time_str": time_str, "period": period})
-                if rt_price < min_rt_price["value"]:
-                    min_rt_price.update({"value": rt_price, "time_str": time_str, "period": period})
-            
-            # 收集分时段数据
-            if period_type not in period_collector:
-                period_collector[period_type] = {
-                    "da_weighted_sum": 0, "da_volume_sum": 0,
-                    "rt_weighted_sum": 0, "rt_volume_sum": 0,
-                    "rt_wind_sum": 0, "rt_solar_sum": 0, "count": 0
-                }
-            
-            if da_price is not None and da_volume > 0:
-                period_collector[period_type]["da_weighted_sum"] += da_price * da_volume
-                period_collector[period_type]["da_volume_sum"] += da_volume
-            if rt_price is not None and rt_volume > 0:
-                period_collector[period_type]["rt_weighted_sum"] += rt_price * rt_volume
-                period_collector[period_type]["rt_volume_sum"] += rt_volume
-                period_collector[period_type]["rt_wind_sum"] += rt_wind
-                period_collector[period_type]["rt_solar_sum"] += rt_solar
-                period_collector[period_type]["count"] += 1
-
-        # --- 后续计算逻辑保持不变 ---
-        
-        # 计算财务KPI
-        vwap_da = da_weighted_sum / da_volume_sum if da_volume_sum > 0 else None
-        vwap_rt = rt_weighted_sum / rt_volume_sum if rt_volume_sum > 0 else None
-        vwap_spread = (vwap_rt - vwap_da) if (vwap_rt is not None and vwap_da is not None) else None
-        twap_da = statistics.mean(da_prices) if da_prices else None
-        twap_rt = statistics.mean(rt_prices) if rt_prices else None
-
-        financial_kpis = {"vwap_rt": vwap_rt, "vwap_da": vwap_da, "vwap_spread": vwap_spread, "twap_rt": twap_rt, "twap_da": twap_da}
-
-        # 风险KPI
-        risk_kpis = {
-            "max_positive_spread": max_positive_spread if max_positive_spread["value"] != float('-inf') else None,
-            "max_negative_spread": max_negative_spread if max_negative_spread["value"] != float('inf') else None,
-            "max_rt_price": max_rt_price if max_rt_price["value"] != float('-inf') else None,
-            "min_rt_price": min_rt_price if min_rt_price["value"] != float('inf') else None
-        }
+        return market_day_cache.respond(request, date_str, {
+            "date": date_str,
+            "financial_kpis": kpis["financial_kpis"],
+            "risk_kpis": kpis["risk_kpis"],
+            "time_series": market_kpi.day_time_series(da_day, rt_day, tou_rules),
+            "period_summary": kpis["period_summary"]
+        }, has_data=has_data)
 
-        # 计算时段汇总
-        period_summary = []
-        period_order = ["尖峰", "高峰", "平段", "低谷", "深谷"]
-        for period_name in period_order:
-            if period_name not in period_collector: continue
-
-            data = period_collector[period_name]
-            vwap_da_period = data["da_weighted_sum"] / data["da_volume_sum"] if data["da_volume_sum"] > 0 else None
-            vwap_rt_period = data["rt_weighted_sum"] / data["rt_volume_sum"] if data["rt_volume_sum"] > 0 else None
-            vwap_spread_period = (vwap_rt_period - vwap_da_period) if (vwap_rt_period and vwap_da_period) else None
-            avg_volume_rt = data["rt_volume_sum"] / data["count"] if data["count"] > 0 else None
-            
-            renewable_volume = data["rt_wind_sum"] + data["rt_solar_sum"]
-            renewable_ratio = renewable_volume / data["rt_volume_sum"] if data["rt_volume_sum"] > 0 else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="日期格式无效，请使用 YYYY-MM-DD 格式")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取市场总览数据时出错: {str(e)}")
 
-            period_summary.append({
-                "period_name": period_name, "vwap_da": vwap_da_period, "vwap_rt": vwap_rt_period,
-                "vwap_spread": vwap_spread_period, "avg_volume_rt": avg_volume_rt, "renewable_ratio": renewable_ratio
-            })
 
-        return {
-            "date": date_str,
-            "financial_kpis": financial_kpis,
-            "risk_kpis": risk_kpis,
-            "time_series": time_series,
-            "period_summary": period_summary
-        }
+@router.get("/market-analysis/dashboard/range", summary="获取日期区间的市场价格总览")
+def get_market_dashboard_range(request: Request,
+                               start: str = Query(..., description="开始日期, 格式 YYYY-MM-DD"),
+                               end: str = Query(..., description="结束日期(含), 格式 YYYY-MM-DD")):
+    """
+    获取日期区间（含首尾）的市场价格总览，口径与单日总览一致：
+    - summary：区间整体的财务KPI、风险KPI（极值点附带日期）、新能源占比和分时段汇总
+    - daily：逐日的 VWAP/TWAP、价差极值、实时价格极值和新能源占比（没有数据的日期省略）
+    """
+    _validate_date_range(start, end)
+    try:
+        cached = market_day_cache.lookup(request, end)
+        if cached is not None:
+            return cached
+
+        dates, da_values = price_cube.span('day_ahead', start, end)
+        _, rt_values = price_cube.span('real_time', start, end)
+        # 逐日 KPI 读取 market_daily_summary，缺失或过期的业务日当场计算
+        result = market_kpi.combine_summaries(market_summary_service.range_summaries(dates, da_values, rt_values))
+        return market_day_cache.respond(request, end, {"start": start, "end": end, **result},
+                                        has_data=bool(result["daily"]))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取区间市场总览数据时出错: {str(e)}")
+
+
+@router.get("/market-analysis/extremes", summary="按逐日极值查询前 N 天（价差、实时价格、价格爬坡）")
+def get_market_extremes(request: Request,
+                        metric: str = Query(..., description="指标: " + " / ".join(market_kpi.EXTREME_METRICS)),
+                        start: str = Query(..., description="开始日期, 格式 YYYY-MM-DD"),
+                        end: str = Query(..., description="结束日期(含), 格式 YYYY-MM-DD"),
+                        limit: int = Query(20, ge=1, le=1000, description="返回天数"),
+                        order: Optional[str] = Query(None, description="排序 desc / asc，默认按指标自然方向"),
+                        min_value: Optional[float] = Query(None, description="指标下限（含）"),
+                        max_value: Optional[float] = Query(None, description="指标上限（含）")):
+    """
+    跨任意日期区间的逐日极值排名和阈值筛选，例如“实时-日前价差最大的 20 天”、“价格爬坡最陡的日子”。
 
+    - **max_rt_price / min_rt_price**: 实时最高/最低价
+    - **max_positive_spread / max_negative_spread**: 最大正/负价差（实时 - 日前）
+    - **max_abs_ramp**: 最大实时价格爬坡绝对值（口径同现货市场复盘的 price_ramp，extremes.ramp 为带符号值）
+    - **返回**: [{date, value, time_str, extremes}]，time_str 为极值所在业务时刻
+    """
+    if metric not in market_kpi.EXTREME_METRICS:
+        raise HTTPException(status_code=400, detail=f"不支持的指标: {metric}")
+    if order not in (None, "desc", "asc"):
+        raise HTTPException(status_code=400, detail="order 只能为 desc 或 asc")
+    try:
+        first = datetime.strptime(start, "%Y-%m-%d")
+        last = datetime.strptime(end, "%Y-%m-%d")
     except ValueError:
         raise HTTPException(status_code=400, detail="日期格式无效，请使用 YYYY-MM-DD 格式")
+    if last < first:
+        raise HTTPException(status_code=400, detail="结束日期不能早于开始日期")
+    try:
+        cached = market_day_cache.lookup(request, end)
+        if cached is not None:
+            return cached
+
+        # 启用价格立方体时用内存数据校验汇总是否最新，汇总滞后的业务日当场计算；
+        # 区间不限长度，先裁剪到立方体已加载的业务日（范围外没有立方体数据，直接使用已存汇总）
+        da_values = rt_values = window = None
+        if price_cube.enabled:
+            window = price_cube.loaded_range(start, end)
+            if window is not None:
+                _, da_values = price_cube.span('day_ahead', *window)
+                _, rt_values = price_cube.span('real_time', *window)
+        days = market_summary_service.top_days(
+            metric, start, end, limit=limit, descending=None if order is None else order == "desc",
+            min_value=min_value, max_value=max_value, da=da_values, rt=rt_values,
+            window_start=window[0] if window else None)
+        return market_day_cache.respond(request, end, {"metric": metric, "start": start, "end": end, "days": days},
+                                        has_data=bool(days))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"获取市场总览数据时出错: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"获取逐日极值时出错: {str(e)}")
+
+
+_PRICE_EXPORT_TYPES = {'datetime': 'datetime', 'date_str': 'string', 'time_str': 'string',
+                      **{name: 'float' for name in PRICE_FIELDS}}
+_SETTLEMENT_EXPORT_FIELDS = (
+    'contract_volume', 'contract_avg_price', 'contract_fee', 'day_ahead_demand_volume', 'day_ahead_market_avg_price',
+    'day_ahead_deviation_fee', 'actual_consumption_volume', 'real_time_market_avg_price', 'real_time_deviation_fee',
+    'deviation_volume', 'deviation_rate', 'deviation_recovery_volume', 'deviation_assessment_price',
+    'deviation_recovery_fee', 'total_energy_fee', 'energy_settlement_avg_price')
+
+# 可导出的数据集：集合、业务日字段、排序（走已有索引）、字段类型
+EXPORT_DATASETS = {
+    'day_ahead': {'collection': DA_PRICE_COLLECTION, 'date_field': 'date_str',
+                  'sort': [('date_str', 1), ('time_str', 1)], 'types': _PRICE_EXPORT_TYPES},
+    'real_time': {'collection': RT_PRICE_COLLECTION, 'date_field': 'date_str',
+                  'sort': [('date_str', 1), ('time_str', 1)], 'types': _PRICE_EXPORT_TYPES},
+    'settlement': {'collection': SETTLEMENT_PERIOD_COLLECTION, 'date_field': 'operating_date',
+                   'sort': [('operating_date', 1), ('period', 1)],
+                   'types': {'operating_date': 'string', 'period': 'int', 'datetime': 'datetime',
+                             **{name: 'float' for name in _SETTLEMENT_EXPORT_FIELDS}}},
+}
+
+
+@router.get("/market-analysis/export", summary="流式导出现货价格 / 分时结算数据（CSV / Parquet）")
+def export_market_data(dataset: str = Query('day_ahead', description="数据集: day_ahead / real_time / settlement"),
+                       start: str = Query(..., description="开始业务日, 格式 YYYY-MM-DD"),
+                       end: str = Query(..., description="结束业务日(含), 格式 YYYY-MM-DD"),
+                       fields: Optional[List[str]] = Query(None, description="导出字段（可重复或逗号分隔），默认全部"),
+                       format: str = Query('csv', description="文件格式: csv / parquet")):
+    """
+    按业务日区间导出原始数据，游标逐批读取并编码后直接写入响应，区间大小不影响服务端内存占用。
+
+    - **day_ahead / real_time**: 日前 / 实时现货价格（按 date_str、time_str 排序）
+    - **settlement**: 分时结算明细 spot_settlement_period（按 operating_date、period 排序）
+    """
+    config = EXPORT_DATASETS.get(dataset)
+    if config is None:
+        raise HTTPException(status_code=400, detail=f"不支持的数据集: {dataset}")
+    if format not in ('csv', 'parquet'):
+        raise HTTPException(status_code=400, detail="format 只能为 csv 或 parquet")
+    if format == 'parquet' and not table_export.PARQUET_AVAILABLE:
+        raise HTTPException(status_code=400, detail="服务器未安装 pyarrow，无法导出 Parquet")
+    try:
+        if datetime.strptime(end, "%Y-%m-%d") < datetime.strptime(start, "%Y-%m-%d"):
+            raise HTTPException(status_code=400, detail="结束日期不能早于开始日期")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="日期格式无效，请使用 YYYY-MM-DD 格式")
+
+    types = config['types']
+    selected = [name.strip() for value in (fields or []) for name in value.split(',') if name.strip()] or list(types)
+    unknown = [name for name in selected if name not in types]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"不支持的字段: {', '.join(unknown)}")
+
+    cursor = config['collection'].find(
+        {config['date_field']: {'$gte': start, '$lte': end}}, {'_id': 0, **{name: 1 for name in selected}}
+    ).sort(config['sort']).batch_size(table_export.EXPORT_BATCH_ROWS)
+    if format == 'csv':
+        body, media_type = table_export.stream_csv(cursor, selected), "text/csv; charset=utf-8"
+    else:
+        body, media_type = table_export.stream_parquet(cursor, selected, types), "application/vnd.apache.parquet"
+
+    filename = quote(f"{config['collection'].name}_{start}_{end}.{format}")
+    # 同步生成器由 Starlette 在线程池中迭代，不阻塞事件循环
+    return StreamingResponse(body, media_type=media_type,
+                             headers={"Content-Disposition": f"attachment; filename*=UTF-8''{filename}"})
 
 
 @router.get("/market-analysis/day-ahead", summary="获取日前市场分析数据")
-def get_day_ahead_analysis(date: str = Query(..., description="查询日期, 格式 YYYY-MM-DD")):
+def get_day_ahead_analysis(request: Request, date: str = Query(..., description="查询日期, 格式 YYYY-MM-DD")):
     """
     获取指定日期的日前市场分析数据，包括价格、总电量及各类电源的出力。
     - **查询**: 从 `day_ahead_spot_price` 集合获取数据。
@@ -592,17 +822,17 @@ def get_day_ahead_analysis(date: str = Query(..., description="查询日期, 格
     try:
         # 验证日期格式
         datetime.strptime(date, "%Y-%m-%d")
+        cached = market_day_cache.lookup(request, date)
+        if cached is not None:
+            return cached
 
         # 直接使用 date_str 进行查询
         query = {"date_str": date}
         
         # 查询并排除 _id 字段，按 datetime 排序
         docs = list(DA_PRICE_COLLECTION.find(query, {'_id': 0}).sort("datetime", 1))
-        
-        if not docs:
-            return []
-            
-        return json.loads(json_util.dumps(docs))
+
+        return market_day_cache.respond(request, date, docs, has_data=bool(docs))
 
     except ValueError:
         raise HTTPException(status_code=400, detail="日期格式无效，请使用 YYYY-MM-DD 格式")
@@ -611,7 +841,7 @@ def get_day_ahead_analysis(date: str = Query(..., description="查询日期, 格
 
 
 @router.get("/market-analysis/real-time", summary="获取现货市场复盘数据")
-def get_real_time_analysis(date: str = Query(..., description="查询日期, 格式 YYYY-MM-DD")):
+def get_real_time_analysis(request: Request, date: str = Query(..., description="查询日期, 格式 YYYY-MM-DD")):
     """
     获取指定日期的现货市场复盘数据，包括价格、电量、电源出力以及价格波动。
     - **查询**: 从 `real_time_spot_price` 集合获取数据。
@@ -621,12 +851,15 @@ def get_real_time_analysis(date: str = Query(..., description="查询日期, 格
     try:
         # 验证日期格式
         datetime.strptime(date, "%Y-%m-%d")
+        cached = market_day_cache.lookup(request, date)
+        if cached is not None:
+            return cached
 
         query = {"date_str": date}
         docs = list(RT_PRICE_COLLECTION.find(query, {'_id': 0}).sort("datetime", 1))
 
         if not docs:
-            return []
+            return market_day_cache.respond(request, date, [], has_data=False)
 
         # 计算价格爬坡
         for i in range(len(docs)):
@@ -636,7 +869,7 @@ def get_real_time_analysis(date: str = Query(..., description="查询日期, 格
             else:
                 docs[i]['price_ramp'] = None # 第一个点或数据缺失时，波动为None
 
-        return json.loads(json_util.dumps(docs))
+        return market_day_cache.respond(request, date, docs)
 
     except ValueError:
         raise HTTPException(status_code=400, detail="日期格式无效，请使用 YYYY-MM-DD 格式")
@@ -644,18 +877,52 @@ def get_real_time_analysis(date: str = Query(..., description="查询日期, 格
         raise HTTPException(status_code=500, detail=f"获取现货市场复盘数据时出错: {str(e)}")
 
 
+@router.get("/market-analysis/price-bands", summary="获取逐时段滚动价格统计（分位带）")
+def get_price_bands(request: Request,
+                    date: str = Query(..., description="复盘日期, 格式 YYYY-MM-DD"),
+                    days: int = Query(30, ge=1, le=365, description="回看天数（不含复盘日期）")):
+    """
+    复盘日期之前 days 个业务日，日前/实时出清价格逐时段的 P10/P50/P90、均值和标准差，
+    用于叠加在现货市场复盘（/market-analysis/real-time）的价格曲线上。
+
+    - **slots**: 业务时刻 time_str（00:15..24:00），与复盘数据的 time_str 一一对应
+    - **day_ahead / real_time**: {count, mean, std, p10, p50, p90}，每项 96 个值，无数据为 null
+    """
+    try:
+        end_date = datetime.strptime(date, "%Y-%m-%d") - timedelta(days=1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="日期格式无效，请使用 YYYY-MM-DD 格式")
+    try:
+        cached = market_day_cache.lookup(request, date)
+        if cached is not None:
+            return cached
+
+        end = end_date.strftime("%Y-%m-%d")
+        bands = {market: price_cube.slot_bands(market, end, days) for market in ('day_ahead', 'real_time')}
+        return market_day_cache.respond(request, date, {
+            "date": date,
+            "window": [(end_date - timedelta(days=days - 1)).strftime("%Y-%m-%d"), end],
+            "slots": list(SLOT_TIME_STRS),
+            **bands,
+        }, has_data=bool(bands['real_time']['count'].any()))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取滚动价格统计时出错: {str(e)}")
+
+
 @router.get("/market-analysis/spread-attribution", summary="获取价差归因分析数据")
-def get_spread_attribution_analysis(date: str = Query(..., description="查询日期, 格式 YYYY-MM-DD")):
+def get_spread_attribution_analysis(request: Request, date: str = Query(..., description="查询日期, 格式 YYYY-MM-DD")):
     try:
         start_date = datetime.strptime(date, "%Y-%m-%d")
-        query = {"date_str": date}
+        cached = market_day_cache.lookup(request, date)
+        if cached is not None:
+            return cached
 
-        # 1. 并行获取数据
-        da_docs = list(DA_PRICE_COLLECTION.find(query, {'_id': 0}).sort("datetime", 1))
-        rt_docs = list(RT_PRICE_COLLECTION.find(query, {'_id': 0}).sort("datetime", 1))
+        # 1. 获取数据
+        da_docs = _price_day_docs('day_ahead', date)
+        rt_docs = _price_day_docs('real_time', date)
 
         if not da_docs or not rt_docs:
-            return {"time_series": [], "systematic_bias": []}
+            return market_day_cache.respond(request, date, {"time_series": [], "systematic_bias": []}, has_data=False)
 
         # 转换为字典以便快速查找
         rt_map = {doc['time_str']: doc for doc in rt_docs}
@@ -664,9 +931,8 @@ def get_spread_attribution_analysis(date: str = Query(..., description="查询
         tou_rules = get_tou_rule_for_date(start_date)
 
         time_series = []
-        period_collector = {}
 
-        # 3. 以日前数据为基准，计算96点偏差 & 初始化聚合器
+        # 3. 以日前数据为基准，计算96点偏差
         for da_point in da_docs:
             time_str = da_point.get("time_str")
             if not time_str:
@@ -701,29 +967,25 @@ def get_spread_attribution_analysis(date: str = Query(..., description="查询
             }
             time_series.append(point_data)
 
-            # 4. 聚合数据到分时段
-            period_type = tou_rules.get(time_str, "平段")
-            if period_type not in period_collector:
-                period_collector[period_type] = {key: [] for key in point_data if key != 'time_str'}
-            
-            for key, value in point_data.items():
-                if key != 'time_str' and value is not None:
-                    period_collector[period_type][key].append(value)
-
-        # 5. 计算系统性偏差
+        # 4. 按分时时段一次聚合各偏差（只统计非空值）
         systematic_bias = []
-        period_order = ["尖峰", "高峰", "平段", "低谷", "深谷"]
-        for period_name in period_order:
-            if period_name in period_collector:
-                agg_data = {"period_name": period_name}
-                for key, values in period_collector[period_name].items():
-                    if values:
-                        agg_data[f"avg_{key}"] = statistics.mean(values)
-                    else:
-                        agg_data[f"avg_{key}"] = None
-                systematic_bias.append(agg_data)
-
-        return {"time_series": time_series, "systematic_bias": systematic_bias}
+        if time_series:
+            keys = [key for key in time_series[0] if key != 'time_str']
+            values = np.array([[np.nan if point[key] is None else point[key] for point in time_series] for key in keys],
+                              dtype=float)
+            period_index = {name: i for i, name in enumerate(tou_aggregation.PERIOD_ORDER)}
+            periods = np.array([period_index.get(tou_rules.get(point['time_str'], "平段"), -1) for point in time_series])
+            stats = tou_aggregation.period_stats(values, periods)
+
+            # 5. 计算系统性偏差
+            for code, period_name in enumerate(tou_aggregation.PERIOD_ORDER):
+                if not (periods == code).any():
+                    continue
+                means = _nan_to_none(stats[period_name]['mean'].tolist())
+                systematic_bias.append({"period_name": period_name,
+                                        **{f"avg_{key}": mean for key, mean in zip(keys, means)}})
+
+        return market_day_cache.respond(request, date, {"time_series": time_series, "systematic_bias": systematic_bias})
 
     except ValueError:
         raise HTTPException(status_code=400, detail="日期格式无效，请使用 YYYY-MM-DD 格式")
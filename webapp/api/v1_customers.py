@@ -4,8 +4,7 @@ from webapp.models.customer import (
     Customer, CustomerCreate, CustomerUpdate, CustomerListResponse,
     MeterInfo, SyncUpdateRequest
 )
-from webapp.services.customer_service import CustomerService
-from webapp.tools.mongo import DATABASE
+from webapp.services.customer_service import customer_service
 from webapp.tools.security import get_current_active_user, User
 
 router = APIRouter(prefix="/customers", tags=["Customers"])
@@ -17,9 +16,8 @@ async def create_customer(
     current_user: User = Depends(get_current_active_user)
 ):
     """创建新客户"""
-    service = CustomerService(DATABASE)
     try:
-        result = service.create_customer(
+        result = await customer_service.create_customer(
             customer_data=customer.model_dump(exclude_unset=True),
             operator=current_user.username
         )
@@ -51,8 +49,7 @@ async def list_customers(
     current_user: User = Depends(get_current_active_user)
 ):
     """获取客户列表"""
-    service = CustomerService(DATABASE)
-    result = service.list_customers(
+    result = await customer_service.list_customers(
         filters={
             "keyword": keyword,
             "user_type": user_type,
@@ -73,9 +70,8 @@ async def get_customer(
     current_user: User = Depends(get_current_active_user)
 ):
     """获取客户详情"""
-    service = CustomerService(DATABASE)
     try:
-        result = service.get_customer_by_id(customer_id)
+        result = await customer_service.get_customer_by_id(customer_id)
         return result
     except ValueError as e:
         raise HTTPException(
@@ -91,9 +87,8 @@ async def update_customer(
     current_user: User = Depends(get_current_active_user)
 ):
     """更新客户信息"""
-    service = CustomerService(DATABASE)
     try:
-        result = service.update_customer(
+        result = await customer_service.update_customer(
             customer_id=customer_id,
             customer_data=customer.model_dump(exclude_unset=True),
             operator=current_user.username
@@ -124,9 +119,8 @@ async def delete_customer(
     current_user: User = Depends(get_current_active_user)
 ):
     """删除客户（软删除）"""
-    service = CustomerService(DATABASE)
     try:
-        service.delete_customer(customer_id)
+        await customer_service.delete_customer(customer_id)
         return None
     except ValueError as e:
         raise HTTPException(
@@ -143,9 +137,8 @@ async def add_utility_account(
     current_user: User = Depends(get_current_active_user)
 ):
     """为客户添加户号"""
-    service = CustomerService(DATABASE)
     try:
-        result = service.add_utility_account(
+        result = await customer_service.add_utility_account(
             customer_id=customer_id,
             account_data=account_data,
             operator=current_user.username
@@ -178,9 +171,8 @@ async def update_utility_account(
     current_user: User = Depends(get_current_active_user)
 ):
     """更新户号信息"""
-    service = CustomerService(DATABASE)
     try:
-        result = service.update_utility_account(
+        result = await customer_service.update_utility_account(
             customer_id=customer_id,
             account_id=account_id,
             account_data=account_data,
@@ -208,9 +200,8 @@ async def delete_utility_account(
     current_user: User = Depends(get_current_active_user)
 ):
     """删除户号"""
-    service = CustomerService(DATABASE)
     try:
-        result = service.delete_utility_account(
+        result = await customer_service.delete_utility_account(
             customer_id=customer_id,
             account_id=account_id,
             operator=current_user.username
@@ -232,9 +223,8 @@ async def add_metering_point(
     current_user: User = Depends(get_current_active_user)
 ):
     """为户号添加计量点"""
-    service = CustomerService(DATABASE)
     try:
-        result = service.add_metering_point(
+        result = await customer_service.add_metering_point(
             customer_id=customer_id,
             account_id=account_id,
             metering_point_data=metering_point_data,
@@ -269,9 +259,8 @@ async def update_metering_point(
     current_user: User = Depends(get_current_active_user)
 ):
     """更新计量点信息"""
-    service = CustomerService(DATABASE)
     try:
-        result = service.update_metering_point(
+        result = await customer_service.update_metering_point(
             customer_id=customer_id,
             account_id=account_id,
             metering_point_id=metering_point_id,
@@ -301,9 +290,8 @@ async def delete_metering_point(
     current_user: User = Depends(get_current_active_user)
 ):
     """删除计量点"""
-    service = CustomerService(DATABASE)
     try:
-        result = service.delete_metering_point(
+        result = await customer_service.delete_metering_point(
             customer_id=customer_id,
             account_id=account_id,
             metering_point_id=metering_point_id,
@@ -324,8 +312,7 @@ async def get_meter_info(
     current_user: User = Depends(get_current_active_user)
 ):
     """获取电表信息（用于自动填充）"""
-    service = CustomerService(DATABASE)
-    result = service.get_meter_info(meter_id)
+    result = await customer_service.get_meter_info(meter_id)
     if not result:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -341,10 +328,9 @@ async def sync_update_meter(
     current_user: User = Depends(get_current_active_user)
 ):
     """同步更新电表信息"""
-    service = CustomerService(DATABASE)
 
     # 检查电表是否存在
-    meter_info = service.get_meter_info(meter_id)
+    meter_info = await customer_service.get_meter_info(meter_id)
     if not meter_info:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -352,7 +338,7 @@ async def sync_update_meter(
         )
 
     # 执行同步更新
-    result = service.sync_update_meter(
+    result = await customer_service.sync_update_meter(
         meter_id=meter_id,
         update_data=update_data.model_dump(exclude_unset=True, exclude={"sync_all"}),
         sync_all=update_data.sync_all,
@@ -375,9 +361,8 @@ async def sign_contract(
 
     状态流转：prospect → pending
     """
-    service = CustomerService(DATABASE)
     try:
-        result = service.sign_contract(
+        result = await customer_service.sign_contract(
             customer_id=customer_id,
             operator=current_user.username,
             contract_id=contract_id
@@ -408,9 +393,8 @@ async def cancel_contract(
 
     状态流转：pending → terminated
     """
-    service = CustomerService(DATABASE)
     try:
-        result = service.cancel_contract(
+        result = await customer_service.cancel_contract(
             customer_id=customer_id,
             operator=current_user.username,
             reason=reason
@@ -440,9 +424,8 @@ async def activate(
 
     状态流转：pending → active
     """
-    service = CustomerService(DATABASE)
     try:
-        result = service.activate(
+        result = await customer_service.activate(
             customer_id=customer_id,
             operator=current_user.username
         )
@@ -472,9 +455,8 @@ async def suspend(
 
     状态流转：active → suspended
     """
-    service = CustomerService(DATABASE)
     try:
-        result = service.suspend(
+        result = await customer_service.suspend(
             customer_id=customer_id,
             operator=current_user.username,
             reason=reason
@@ -504,9 +486,8 @@ async def resume(
 
     状态流转：suspended → active
     """
-    service = CustomerService(DATABASE)
     try:
-        result = service.resume(
+        result = await customer_service.resume(
             customer_id=customer_id,
             operator=current_user.username
         )
@@ -536,9 +517,8 @@ async def terminate(
 
     状态流转：active/suspended → terminated
     """
-    service = CustomerService(DATABASE)
     try:
-        result = service.terminate(
+        result = await customer_service.terminate(
             customer_id=customer_id,
             operator=current_user.username,
             reason=reason
@@ -1,13 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from typing import Optional
 import pandas as pd
 import io
 from datetime import datetime
 from urllib.parse import quote
 from webapp.models.contract import Contract, ContractCreate, ContractListResponse, calculate_contract_status
-from webapp.services.contract_service import ContractService
-from webapp.tools.mongo import DATABASE
+from webapp.services.contract_service import contract_service
+from webapp.tools.mongo import ASYNC_DATABASE
 from webapp.tools.security import get_current_active_user, User
 from webapp.utils.excel_handler import ExcelReader, DataValidator, ContractDataTransformer
 
@@ -20,9 +21,8 @@ async def create_contract(
     current_user: User = Depends(get_current_active_user)
 ):
     """创建新合同"""
-    service = ContractService(DATABASE)
     try:
-        result = service.create_contract(
+        result = await contract_service.create_contract(
             contract_data=contract.model_dump(exclude_unset=True),
             operator=current_user.username
         )
@@ -66,8 +66,7 @@ async def list_contracts(
     - page: 页码（从1开始）
     - page_size: 每页数量
     """
-    service = ContractService(DATABASE)
-    result = service.list_contracts(
+    result = await contract_service.list_contracts(
         filters={
             "contract_name": contract_name,
             "package_name": package_name,
@@ -111,11 +110,11 @@ async def import_contracts(
 
         # 2. 初始化处理组件
         excel_reader = ExcelReader()
-        validator = DataValidator(DATABASE)
-        transformer = ContractDataTransformer(DATABASE)
+        validator = DataValidator(ASYNC_DATABASE)
+        transformer = ContractDataTransformer(ASYNC_DATABASE)
 
-        # 3. 读取并验证文件结构
-        df = excel_reader.read_excel_file(contents)
+        # 3. 读取并验证文件结构（Excel 解析为 CPU 密集操作，放入线程池避免阻塞事件循环）
+        df = await run_in_threadpool(excel_reader.read_excel_file, contents)
         excel_reader.validate_excel_structure(df)
 
         # 4. 逐行校验和导入
@@ -133,7 +132,7 @@ async def import_contracts(
                 # 执行多层校验
                 validation_errors = []
                 validation_errors.extend(validator.validate_required_fields(row_data))
-                validation_errors.extend(validator.validate_related_data(row_data))
+                validation_errors.extend(await validator.validate_related_data(row_data))
                 validation_errors.extend(validator.validate_business_rules(row_data))
 
                 if validation_errors:
@@ -142,10 +141,10 @@ async def import_contracts(
                     continue
 
                 # 转换数据格式
-                contract_data = transformer.transform_row_to_contract(row_data, current_user.username)
+                contract_data = await transformer.transform_row_to_contract(row_data, current_user.username)
 
                 # 检查合同唯一性
-                uniqueness_errors = validator.validate_contract_uniqueness(
+                uniqueness_errors = await validator.validate_contract_uniqueness(
                     contract_data['customer_id'],
                     contract_data['purchase_start_month'],
                     contract_data['purchase_end_month'],
@@ -158,7 +157,7 @@ async def import_contracts(
                     continue
 
                 # 插入数据库
-                DATABASE.retail_contracts.insert_one(contract_data)
+                await ASYNC_DATABASE.retail_contracts.insert_one(contract_data)
                 success_count += 1
 
             except Exception as e:
@@ -215,7 +214,7 @@ async def export_contracts(
             query["purchase_end_month"] = {"$lte": end_month}
 
         # 2. 查询数据
-        contracts = list(DATABASE.retail_contracts.find(query).sort("created_at", -1))
+        contracts = await ASYNC_DATABASE.retail_contracts.find(query).sort("created_at", -1).to_list()
 
         # 3. 计算虚拟状态并添加到数据中
         processed_contracts = []
@@ -246,8 +245,8 @@ async def export_contracts(
 
             processed_contracts.append(formatted_contract)
 
-        # 4. 生成Excel文件
-        excel_data = _generate_excel_file(processed_contracts, {
+        # 4. 生成Excel文件（放入线程池，避免阻塞事件循环）
+        excel_data = await run_in_threadpool(_generate_excel_file, processed_contracts, {
             'package_name': package_name,
             'customer_name': customer_name,
             'status': status,
@@ -276,9 +275,8 @@ async def get_contract(
     current_user: User = Depends(get_current_active_user)
 ):
     """获取合同详情"""
-    service = ContractService(DATABASE)
     try:
-        result = service.get_contract_by_id(contract_id)
+        result = await contract_service.get_contract_by_id(contract_id)
         return result
     except ValueError as e:
         raise HTTPException(
@@ -294,9 +292,8 @@ async def update_contract(
     current_user: User = Depends(get_current_active_user)
 ):
     """更新合同（仅待生效状态）"""
-    service = ContractService(DATABASE)
     try:
-        result = service.update_contract(
+        result = await contract_service.update_contract(
             contract_id=contract_id,
             contract_data=contract.model_dump(exclude_unset=True),
             operator=current_user.username
@@ -327,9 +324,8 @@ async def delete_contract(
     current_user: User = Depends(get_current_active_user)
 ):
     """删除合同（仅待生效状态）"""
-    service = ContractService(DATABASE)
     try:
-        service.delete_contract(contract_id)
+        await contract_service.delete_contract(contract_id)
         return None  # 204 No Content
     except ValueError as e:
         error_msg = str(e)
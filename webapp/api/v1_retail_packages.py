@@ -2,9 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, status, Body
 from typing import Optional
 
 from webapp.models.retail_package import RetailPackage, PackageListResponse
-from webapp.services.package_service import PackageService
+from webapp.services.package_service import package_service
 from webapp.services.pricing_engine import PricingEngine
-from webapp.tools.mongo import DATABASE
 # Corrected import path for the user dependency
 from webapp.tools.security import get_current_active_user, User
 
@@ -17,9 +16,8 @@ async def create_package(
     current_user: User = Depends(get_current_active_user)
 ):
     """创建新的零售套餐"""
-    service = PackageService(DATABASE)
     try:
-        result = service.create_package(
+        result = await package_service.create_package(
             package_data=package.dict(exclude_unset=True),
             status="draft" if save_as_draft else "active",
             operator=current_user.username
@@ -45,9 +43,8 @@ async def update_package(
     current_user: User = Depends(get_current_active_user)
 ):
     """更新套餐"""
-    service = PackageService(DATABASE)
     try:
-        result = service.update_package(
+        result = await package_service.update_package(
             package_id=package_id,
             package_data=package.dict(exclude_unset=True),
             operator=current_user.username
@@ -77,9 +74,8 @@ async def copy_package(
     current_user: User = Depends(get_current_active_user)
 ):
     """复制套餐"""
-    service = PackageService(DATABASE)
     try:
-        result = service.copy_package(
+        result = await package_service.copy_package(
             package_id=package_id,
             operator=current_user.username
         )
@@ -102,8 +98,7 @@ async def list_packages(
     current_user: User = Depends(get_current_active_user)
 ):
     """获取套餐列表"""
-    service = PackageService(DATABASE)
-    result = service.list_packages(
+    result = await package_service.list_packages(
         filters={
             "keyword": keyword,
             "package_type": package_type,
@@ -122,9 +117,8 @@ async def activate_package(
     current_user: User = Depends(get_current_active_user)
 ):
     """激活套餐"""
-    service = PackageService(DATABASE)
     try:
-        result = service.change_status(
+        result = await package_service.change_status(
             package_id=package_id,
             new_status="active",
             operator=current_user.username
@@ -149,9 +143,8 @@ async def archive_package(
     current_user: User = Depends(get_current_active_user)
 ):
     """归档套餐"""
-    service = PackageService(DATABASE)
     try:
-        result = service.change_status(
+        result = await package_service.change_status(
             package_id=package_id,
             new_status="archived",
             operator=current_user.username
@@ -176,9 +169,8 @@ async def get_package(
     current_user: User = Depends(get_current_active_user)
 ):
     """获取套餐详情"""
-    service = PackageService(DATABASE)
     try:
-        result = service.get_package_by_id(package_id)
+        result = await package_service.get_package_by_id(package_id)
         return result
     except ValueError as e:
         raise HTTPException(
@@ -192,9 +184,8 @@ async def delete_package(
     current_user: User = Depends(get_current_active_user)
 ):
     """删除套餐（仅草稿状态）"""
-    service = PackageService(DATABASE)
     try:
-        service.delete_package(package_id)
+        await package_service.delete_package(package_id)
         return None  # 204 No Content
     except ValueError as e:
         error_msg = str(e)
@@ -1,13 +1,21 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from datetime import timedelta
 
 from fastapi import Depends, FastAPI, HTTPException, Request, status
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 
-from webapp.tools.mongo import DATABASE as db
+from webapp.tools.mongo import ASYNC_DATABASE as db, MONGO_CLIENT
+from webapp.tools.indexes import ensure_indexes_async
+from webapp.tools.metrics import MetricsMiddleware, render_metrics
+from webapp.tools.responses import BSONResponse
 from webapp.api import v1
 
 # Import security functions and models from the new security tool
@@ -28,10 +36,47 @@ def get_real_ip(request: Request) -> str:
 
 limiter = Limiter(key_func=get_real_ip, default_limits=["1000 per minute"])
 
+logger = logging.getLogger(__name__)
+
+
+async def _reconcile_indexes():
+    """后台对账索引注册表；单个索引的失败由 ensure_indexes_async 记录，这里只兜底记录整体异常"""
+    try:
+        created = await ensure_indexes_async(db)
+        logger.info("启动时索引对账完成，新建 %d 个索引", sum(len(names) for names in created.values()))
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.exception("启动时索引对账失败")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用生命周期：启动时在后台对账一次索引注册表（webapp/tools/indexes.py），关闭时释放数据库连接池
+
+    大集合（user_load_data、meter_data、mp_load_curve 等）上的新索引可能需要较长时间构建，
+    因此不等待对账完成即开始服务；需要在上线前建好索引时执行 scripts/create_indexes.py
+    """
+    reconcile = asyncio.create_task(_reconcile_indexes())
+    yield
+    if not reconcile.done():
+        # 已提交到服务端的索引构建会继续完成，下次启动时对账跳过
+        reconcile.cancel()
+        try:
+            await reconcile
+        except asyncio.CancelledError:
+            pass
+    await MONGO_CLIENT.aclose()
+
+
 app = FastAPI(
     title="电力交易辅助分析系统API",
     description="为前端提供数据接口服务",
     version="1.0.0",
+    lifespan=lifespan,
+    # orjson 编码，原生支持 ObjectId / datetime / Decimal128（见 webapp/tools/responses.py）
+    default_response_class=BSONResponse,
 )
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
@@ -44,13 +89,17 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# 压缩较大的 JSON 响应；已设置 Content-Encoding 的响应（市场数据缓存的 br/gzip）会原样透传
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=6)
+# 按路由记录请求耗时，并为 Mongo 命令监听器提供请求上下文（指标见 GET /metrics）
+app.add_middleware(MetricsMiddleware)
 
 # --- API Routes ---
 
 @app.post("/api/v1/token", response_model=Token, tags=["Authentication"])
 @limiter.limit("5/minute")
 async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -70,3 +119,20 @@ app.include_router(v1.router, dependencies=[Depends(get_current_active_user)])
 @app.get("/", tags=["Root"], summary="应用根路径")
 def read_root():
     return {"message": "欢迎使用电力交易辅助分析系统API"}
+
+@app.get("/health", tags=["Root"], summary="健康检查（数据库连通性）")
+async def health_check():
+    ok, detail = await MONGO_CLIENT.ping_async()
+    if not ok:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "unavailable", "mongodb": {"ok": False, "error": detail}},
+        )
+    return {"status": "ok", "mongodb": {"ok": True, "latency_ms": detail}}
+
+# 指标包含路由耗时和 Mongo 集合/命令名，与数据接口一样要求登录（抓取方式见 nginx.conf.example）
+@app.get("/metrics", tags=["Root"], summary="Prometheus 指标（请求耗时、Mongo 命令统计）",
+         dependencies=[Depends(get_current_active_user)])
+def metrics():
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
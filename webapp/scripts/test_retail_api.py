@@ -1,6 +1,7 @@
 """
 测试零售套餐API
 """
+import asyncio
 import sys
 import os
 
@@ -8,7 +9,7 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 from webapp.services.package_service import PackageService
-from webapp.tools.mongo import DATABASE
+from webapp.tools.mongo import DATABASE, ASYNC_DATABASE
 
 def test_list_packages():
     """测试获取套餐列表"""
@@ -16,10 +17,10 @@ def test_list_packages():
     print("测试获取套餐列表")
     print("=" * 50)
 
-    service = PackageService(DATABASE)
+    service = PackageService(ASYNC_DATABASE)
 
     # 测试查询
-    result = service.list_packages(
+    result = asyncio.run(service.list_packages(
         filters={
             "keyword": None,
             "package_type": None,
@@ -27,7 +28,7 @@ def test_list_packages():
         },
         page=1,
         page_size=10
-    )
+    ))
 
     print(f"\n总数: {result['total']}")
     print(f"当前页: {result['page']}")
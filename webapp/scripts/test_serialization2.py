@@ -1,6 +1,7 @@
 """
 测试Pydantic模型序列化（无emoji版本）
 """
+import asyncio
 import sys
 import os
 import json
@@ -8,7 +9,7 @@ import json
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 from webapp.services.package_service import PackageService
-from webapp.tools.mongo import DATABASE
+from webapp.tools.mongo import ASYNC_DATABASE
 from webapp.models.retail_package import PackageListResponse
 
 def test_model_serialization():
@@ -17,14 +18,14 @@ def test_model_serialization():
     print("Testing Pydantic Model Serialization")
     print("=" * 50)
 
-    service = PackageService(DATABASE)
+    service = PackageService(ASYNC_DATABASE)
 
     # 获取数据
-    result = service.list_packages(
+    result = asyncio.run(service.list_packages(
         filters={"keyword": None, "package_type": None, "status": None},
         page=1,
         page_size=10
-    )
+    ))
 
     print(f"\nService result type: {type(result)}")
     print(f"items type: {type(result['items'])}")
@@ -1,6 +1,6 @@
 from bson import ObjectId
 from typing import Optional, Dict, Any, List
-from webapp.tools.mongo import DATABASE
+from webapp.tools.mongo import ASYNC_DATABASE
 from webapp.models.contract import (
     Contract, ContractCreate, ContractListItem, calculate_contract_status
 )
@@ -17,52 +17,8 @@ class ContractService:
     def __init__(self, db):
         self.db = db
         self.collection = self.db.retail_contracts
-        self._ensure_indexes()
-
-    def _ensure_indexes(self):
-        """确保数据库索引存在"""
-        try:
-            # 要创建的索引列表
-            indexes = [
-                # 1. 基础查询索引
-                ([('package_name', 1)], {'name': 'idx_package_name'}),
-                ([('customer_name', 1)], {'name': 'idx_customer_name'}),
-                ([('contract_name', 1)], {'name': 'idx_contract_name'}),
-                ([('purchase_start_month', 1)], {'name': 'idx_purchase_start_month'}),
-                ([('purchase_end_month', 1)], {'name': 'idx_purchase_end_month'}),
-
-                # 2. 关联查询索引
-                ([('package_id', 1)], {'name': 'idx_package_id'}),
-                ([('customer_id', 1)], {'name': 'idx_customer_id'}),
-
-                # 3. 组合查询索引（优化筛选查询）
-                ([('package_name', 1), ('purchase_start_month', -1)],
-                 {'name': 'idx_package_start'}),
-                ([('customer_name', 1), ('purchase_start_month', -1)],
-                 {'name': 'idx_customer_start'}),
-                ([('contract_name', 1), ('purchase_start_month', -1)],
-                 {'name': 'idx_contract_start'}),
-
-                # 4. 日期范围重叠检查索引
-                ([('customer_id', 1), ('purchase_start_month', 1), ('purchase_end_month', 1)],
-                 {'name': 'idx_customer_date_range'}),
-
-                # 5. 时间索引
-                ([('created_at', -1)], {'name': 'idx_created_at'}),
-                ([('updated_at', -1)], {'name': 'idx_updated_at'}),
-            ]
-
-            existing_indexes = {idx.get('name') for idx in self.collection.list_indexes()}
-
-            for keys, options in indexes:
-                if options['name'] not in existing_indexes:
-                    self.collection.create_index(keys, **options)
 
-        except Exception as e:
-            # 索引创建失败不应该阻止服务启动，记录错误即可
-            print(f"创建合同索引时出错: {str(e)}")
-
-    def create_contract(self, contract_data: dict, operator: str) -> dict:
+    async def create_contract(self, contract_data: dict, operator: str) -> dict:
         """
         创建新合同
 
@@ -81,7 +37,7 @@ class ContractService:
         if not ObjectId.is_valid(package_id):
             raise ValueError("无效的套餐ID")
 
-        package = self.db.retail_packages.find_one({
+        package = await self.db.retail_packages.find_one({
             "_id": ObjectId(package_id),
             "status": "active"
         })
@@ -93,7 +49,7 @@ class ContractService:
         if not ObjectId.is_valid(customer_id):
             raise ValueError("无效的客户ID")
 
-        customer = self.db.customers.find_one({
+        customer = await self.db.customers.find_one({
             "_id": ObjectId(customer_id),
             "status": "active"
         })
@@ -104,12 +60,12 @@ class ContractService:
         start_month = contract_data.get("purchase_start_month")
         end_month = contract_data.get("purchase_end_month")
 
-        if self._check_date_range_overlap(customer_id, start_month, end_month):
+        if await self._check_date_range_overlap(customer_id, start_month, end_month):
             raise ValueError("该客户在指定日期范围内已存在合同，请检查日期设置")
 
         # 4. 自动生成合同名称（如果没有提供）
         if "contract_name" not in contract_data or not contract_data["contract_name"]:
-            contract_name = self._generate_contract_name(customer_id, start_month)
+            contract_name = await self._generate_contract_name(customer_id, start_month)
             contract_data["contract_name"] = contract_name
 
         # 5. 创建合同对象
@@ -125,13 +81,13 @@ class ContractService:
         doc_to_insert['_id'] = contract.id
 
         # 7. 插入数据库
-        result = self.collection.insert_one(doc_to_insert)
+        result = await self.collection.insert_one(doc_to_insert)
 
         # 8. 返回创建的合同信息（包含虚拟状态字段）
-        created_contract = self.collection.find_one({"_id": result.inserted_id})
+        created_contract = await self.collection.find_one({"_id": result.inserted_id})
         return self._convert_to_dict_with_status(created_contract)
 
-    def get_contract_by_id(self, contract_id: str) -> dict:
+    async def get_contract_by_id(self, contract_id: str) -> dict:
         """
         根据ID获取合同详情
 
@@ -147,14 +103,14 @@ class ContractService:
         if not ObjectId.is_valid(contract_id):
             raise ValueError("无效的合同ID")
 
-        contract = self.collection.find_one({"_id": ObjectId(contract_id)})
+        contract = await self.collection.find_one({"_id": ObjectId(contract_id)})
 
         if not contract:
             raise ValueError("合同不存在")
 
         return self._convert_to_dict_with_status(contract)
 
-    def list_contracts(self, filters: dict, page: int = 1, page_size: int = 20) -> dict:
+    async def list_contracts(self, filters: dict, page: int = 1, page_size: int = 20) -> dict:
         """
         获取合同列表
 
@@ -189,7 +145,7 @@ class ContractService:
         status_filter = filters.get("status")
 
         # 计算总数（状态筛选前）
-        total_before_status = self.collection.count_documents(query)
+        total_before_status = await self.collection.count_documents(query)
 
         # 分页查询
         skip = (page - 1) * page_size
@@ -202,7 +158,7 @@ class ContractService:
 
         # 转换为列表项格式（计算虚拟状态）
         items = []
-        for doc in cursor:
+        async for doc in cursor:
             # 计算虚拟状态
             status = calculate_contract_status(
                 doc.get("purchase_start_month"),
@@ -241,7 +197,7 @@ class ContractService:
             "items": items
         }
 
-    def update_contract(self, contract_id: str, contract_data: dict, operator: str) -> dict:
+    async def update_contract(self, contract_id: str, contract_data: dict, operator: str) -> dict:
         """
         更新合同（仅待生效状态）
 
@@ -260,7 +216,7 @@ class ContractService:
             raise ValueError("无效的合同ID")
 
         # 1. 查询现有合同
-        existing_contract = self.collection.find_one({"_id": ObjectId(contract_id)})
+        existing_contract = await self.collection.find_one({"_id": ObjectId(contract_id)})
         if not existing_contract:
             raise ValueError("合同不存在")
 
@@ -281,7 +237,7 @@ class ContractService:
             if not ObjectId.is_valid(package_id):
                 raise ValueError("无效的套餐ID")
 
-            package = self.db.retail_packages.find_one({
+            package = await self.db.retail_packages.find_one({
                 "_id": ObjectId(package_id),
                 "status": "active"
             })
@@ -293,7 +249,7 @@ class ContractService:
             if not ObjectId.is_valid(customer_id):
                 raise ValueError("无效的客户ID")
 
-            customer = self.db.customers.find_one({
+            customer = await self.db.customers.find_one({
                 "_id": ObjectId(customer_id),
                 "status": "active"
             })
@@ -309,7 +265,7 @@ class ContractService:
             contract_data.get("purchase_start_month") or
             contract_data.get("purchase_end_month")):
 
-            if self._check_date_range_overlap(customer_id_for_check, start_month_for_check, end_month_for_check, exclude_contract_id=contract_id):
+            if await self._check_date_range_overlap(customer_id_for_check, start_month_for_check, end_month_for_check, exclude_contract_id=contract_id):
                 raise ValueError("该客户在指定日期范围内已存在其他合同，请检查日期设置")
 
         # 6. 自动生成合同名称（如果更新了客户或日期）
@@ -319,7 +275,7 @@ class ContractService:
             # 确定要使用的客户ID
             customer_id_for_name = contract_data.get("customer_id") or existing_contract.get("customer_id")
 
-            contract_name = self._generate_contract_name(customer_id_for_name, start_month_for_check)
+            contract_name = await self._generate_contract_name(customer_id_for_name, start_month_for_check)
             contract_data["contract_name"] = contract_name
 
         # 7. 更新审计字段
@@ -328,7 +284,7 @@ class ContractService:
         update_data["updated_by"] = operator
 
         # 8. 执行更新
-        result = self.collection.update_one(
+        result = await self.collection.update_one(
             {"_id": ObjectId(contract_id)},
             {"$set": update_data}
         )
@@ -337,10 +293,10 @@ class ContractService:
             raise ValueError("合同不存在")
 
         # 9. 返回更新后的合同
-        updated_contract = self.collection.find_one({"_id": ObjectId(contract_id)})
+        updated_contract = await self.collection.find_one({"_id": ObjectId(contract_id)})
         return self._convert_to_dict_with_status(updated_contract)
 
-    def delete_contract(self, contract_id: str) -> None:
+    async def delete_contract(self, contract_id: str) -> None:
         """
         删除合同（仅待生效状态）
 
@@ -354,7 +310,7 @@ class ContractService:
             raise ValueError("无效的合同ID")
 
         # 1. 查询现有合同
-        existing_contract = self.collection.find_one({"_id": ObjectId(contract_id)})
+        existing_contract = await self.collection.find_one({"_id": ObjectId(contract_id)})
         if not existing_contract:
             raise ValueError("合同不存在")
 
@@ -369,7 +325,7 @@ class ContractService:
             raise ValueError(f"只能删除待生效状态的合同，当前状态为：{current_status}")
 
         # 4. 执行删除（硬删除）
-        result = self.collection.delete_one({"_id": ObjectId(contract_id)})
+        result = await self.collection.delete_one({"_id": ObjectId(contract_id)})
 
         if result.deleted_count == 0:
             raise ValueError("合同不存在")
@@ -407,7 +363,7 @@ class ContractService:
 
         return result
 
-    def _generate_contract_name(self, customer_id: str, purchase_start_month: datetime) -> str:
+    async def _generate_contract_name(self, customer_id: str, purchase_start_month: datetime) -> str:
         """
         生成合同名称（客户简称 + 购电开始年月）
 
@@ -419,7 +375,7 @@ class ContractService:
             合同名称，如"供服中心202509"
         """
         # 从客户档案获取客户简称
-        customer = self.db.customers.find_one({
+        customer = await self.db.customers.find_one({
             "_id": ObjectId(customer_id),
             "status": "active"
         })
@@ -435,7 +391,7 @@ class ContractService:
 
         return f"{short_name}{year_month_str}"
 
-    def _check_date_range_overlap(self, customer_id: str, start_month: datetime, end_month: datetime, exclude_contract_id: Optional[str] = None) -> bool:
+    async def _check_date_range_overlap(self, customer_id: str, start_month: datetime, end_month: datetime, exclude_contract_id: Optional[str] = None) -> bool:
         """
         检查同一客户的日期范围是否重叠
 
@@ -478,7 +434,11 @@ class ContractService:
         if exclude_contract_id and ObjectId.is_valid(exclude_contract_id):
             query["_id"] = {"$ne": ObjectId(exclude_contract_id)}
 
-        # 查找重叠的合同
-        overlapping_contracts = list(self.collection.find(query))
+        # 查找重叠的合同（只需确认是否存在一条即可）
+        overlapping_contract = await self.collection.find_one(query, {"_id": 1})
+
+        return overlapping_contract is not None
+
 
-        return len(overlapping_contracts) > 0
+# 全局服务实例
+contract_service = ContractService(ASYNC_DATABASE)
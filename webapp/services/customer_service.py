@@ -1,7 +1,7 @@
 from bson import ObjectId
 from pymongo.errors import DuplicateKeyError
 from typing import Optional, List, Dict, Any
-from webapp.tools.mongo import DATABASE
+from webapp.tools.mongo import ASYNC_DATABASE
 from webapp.models.customer import Customer, CustomerCreate, CustomerUpdate, CustomerListItem
 from datetime import datetime
 
@@ -15,45 +15,8 @@ class CustomerService:
     def __init__(self, db):
         self.db = db
         self.collection = self.db.customers
-        self._ensure_indexes()
-
-    def _ensure_indexes(self):
-        """确保数据库索引存在"""
-        try:
-            # 要创建的索引列表
-            indexes = [
-                # 1. 基础查询索引
-                ([('user_name', 1)], {'name': 'idx_user_name'}),
-                ([('short_name', 1)], {'name': 'idx_short_name'}),
-                ([('status', 1)], {'name': 'idx_status'}),
-
-                # 2. 组合查询索引（用于列表筛选）
-                ([('status', 1), ('created_at', -1)], {'name': 'idx_status_created_at'}),
-                ([('status', 1), ('user_type', 1), ('created_at', -1)], {'name': 'idx_status_user_type'}),
-                ([('status', 1), ('industry', 1), ('created_at', -1)], {'name': 'idx_status_industry'}),
-                ([('status', 1), ('region', 1), ('created_at', -1)], {'name': 'idx_status_region'}),
-
-                # 3. 嵌套数据索引（用于户号和计量点查询）
-                ([('utility_accounts.account_id', 1)], {'name': 'idx_account_id'}),
-                ([('utility_accounts.metering_points.metering_point_id', 1)], {'name': 'idx_metering_point_id'}),
-                ([('utility_accounts.metering_points.meter.meter_id', 1)], {'name': 'idx_meter_id'}),
-
-                # 4. 时间索引
-                ([('created_at', -1)], {'name': 'idx_created_at'}),
-                ([('updated_at', -1)], {'name': 'idx_updated_at'}),
-            ]
-
-            existing_indexes = {idx.get('name') for idx in self.collection.list_indexes()}
-
-            for keys, options in indexes:
-                if options['name'] not in existing_indexes:
-                    self.collection.create_index(keys, **options)
 
-        except Exception as e:
-            # 索引创建失败不应该阻止服务启动，记录错误即可
-            print(f"创建客户索引时出错: {str(e)}")
-
-    def create_customer(self, customer_data: dict, operator: str) -> dict:
+    async def create_customer(self, customer_data: dict, operator: str) -> dict:
         """
         创建新客户
 
@@ -68,7 +31,7 @@ class CustomerService:
             ValueError: 客户名称已存在
         """
         # 检查客户名称是否已存在（所有状态）
-        existing_customer = self.collection.find_one({
+        existing_customer = await self.collection.find_one({
             "user_name": customer_data.get("user_name")
         })
         if existing_customer:
@@ -97,13 +60,13 @@ class CustomerService:
         doc_to_insert['_id'] = customer.id
 
         # 插入数据库
-        result = self.collection.insert_one(doc_to_insert)
+        result = await self.collection.insert_one(doc_to_insert)
 
         # 返回创建的客户信息
-        created_customer = self.collection.find_one({"_id": result.inserted_id})
+        created_customer = await self.collection.find_one({"_id": result.inserted_id})
         return self._convert_to_dict(created_customer)
 
-    def get_customer_by_id(self, customer_id: str) -> dict:
+    async def get_customer_by_id(self, customer_id: str) -> dict:
         """
         根据ID获取客户详情
 
@@ -119,14 +82,14 @@ class CustomerService:
         if not ObjectId.is_valid(customer_id):
             raise ValueError("无效的客户ID")
 
-        customer = self.collection.find_one({"_id": ObjectId(customer_id)})
+        customer = await self.collection.find_one({"_id": ObjectId(customer_id)})
 
         if not customer:
             raise ValueError("客户不存在")
 
         return self._convert_to_dict(customer)
 
-    def list_customers(self, filters: dict, page: int = 1, page_size: int = 20) -> dict:
+    async def list_customers(self, filters: dict, page: int = 1, page_size: int = 20) -> dict:
         """
         获取客户列表
 
@@ -165,7 +128,7 @@ class CustomerService:
             query["status"] = filters["status"]
 
         # 计算总数
-        total = self.collection.count_documents(query)
+        total = await self.collection.count_documents(query)
 
         # 分页查询
         skip = (page - 1) * page_size
@@ -173,7 +136,7 @@ class CustomerService:
 
         # 转换为列表项格式
         items = []
-        customer_docs = list(cursor)
+        customer_docs = await cursor.to_list()
 
         # 批量查询合同数据以获取签约电量
         customer_ids = [str(doc["_id"]) for doc in customer_docs]
@@ -199,7 +162,8 @@ class CustomerService:
             }
         ]
 
-        contract_results = list(contracts_collection.aggregate(contract_agg_pipeline))
+        contract_cursor = await contracts_collection.aggregate(contract_agg_pipeline)
+        contract_results = await contract_cursor.to_list()
         # 构建客户ID到签约电量的映射
         contracted_capacity_map = {
             result["_id"]: result["total_contracted"]
@@ -237,7 +201,7 @@ class CustomerService:
             "items": items
         }
 
-    def update_customer(self, customer_id: str, customer_data: dict, operator: str) -> dict:
+    async def update_customer(self, customer_id: str, customer_data: dict, operator: str) -> dict:
         """
         更新客户信息
 
@@ -256,7 +220,7 @@ class CustomerService:
             raise ValueError("无效的客户ID")
 
         # 检查客户是否存在
-        existing_customer = self.collection.find_one({"_id": ObjectId(customer_id)})
+        existing_customer = await self.collection.find_one({"_id": ObjectId(customer_id)})
         if not existing_customer:
             raise ValueError("客户不存在")
 
@@ -273,7 +237,7 @@ class CustomerService:
         # 检查客户名称是否与其他客户重复
         new_user_name = customer_data.get("user_name")
         if new_user_name and new_user_name != existing_customer.get("user_name"):
-            duplicate_customer = self.collection.find_one({
+            duplicate_customer = await self.collection.find_one({
                 "user_name": new_user_name,
                 "_id": {"$ne": ObjectId(customer_id)}
             })
@@ -298,7 +262,7 @@ class CustomerService:
         update_data["updated_at"] = datetime.utcnow()
         update_data["updated_by"] = operator
 
-        result = self.collection.update_one(
+        result = await self.collection.update_one(
             {"_id": ObjectId(customer_id)},
             {"$set": update_data}
         )
@@ -307,10 +271,10 @@ class CustomerService:
             raise ValueError("客户不存在")
 
         # 返回更新后的客户信息
-        updated_customer = self.collection.find_one({"_id": ObjectId(customer_id)})
+        updated_customer = await self.collection.find_one({"_id": ObjectId(customer_id)})
         return self._convert_to_dict(updated_customer)
 
-    def delete_customer(self, customer_id: str) -> None:
+    async def delete_customer(self, customer_id: str) -> None:
         """
         删除客户（物理删除，仅限意向客户）
 
@@ -327,7 +291,7 @@ class CustomerService:
             raise ValueError("无效的客户ID")
 
         # 查找客户并检查状态
-        customer = self.collection.find_one({"_id": ObjectId(customer_id)})
+        customer = await self.collection.find_one({"_id": ObjectId(customer_id)})
 
         if not customer:
             raise ValueError("客户不存在")
@@ -337,12 +301,12 @@ class CustomerService:
             raise ValueError("只有意向客户可以删除，其他状态的客户请使用状态转换操作")
 
         # 物理删除
-        result = self.collection.delete_one({"_id": ObjectId(customer_id)})
+        result = await self.collection.delete_one({"_id": ObjectId(customer_id)})
 
         if result.deleted_count == 0:
             raise ValueError("删除失败")
 
-    def add_utility_account(self, customer_id: str, account_data: dict, operator: str) -> dict:
+    async def add_utility_account(self, customer_id: str, account_data: dict, operator: str) -> dict:
         """
         为客户添加户号
 
@@ -360,7 +324,7 @@ class CustomerService:
         if not ObjectId.is_valid(customer_id):
             raise ValueError("无效的客户ID")
 
-        customer = self.collection.find_one({
+        customer = await self.collection.find_one({
             "_id": ObjectId(customer_id),
             "status": {"$ne": "deleted"}
         })
@@ -375,7 +339,7 @@ class CustomerService:
                 raise ValueError(f"户号 '{account_id}' 已存在")
 
         # 添加新户号
-        result = self.collection.update_one(
+        result = await self.collection.update_one(
             {"_id": ObjectId(customer_id)},
             {
                 "$push": {"utility_accounts": account_data},
@@ -387,10 +351,10 @@ class CustomerService:
             raise ValueError("客户不存在")
 
         # 返回更新后的客户信息
-        updated_customer = self.collection.find_one({"_id": ObjectId(customer_id)})
+        updated_customer = await self.collection.find_one({"_id": ObjectId(customer_id)})
         return self._convert_to_dict(updated_customer)
 
-    def update_utility_account(self, customer_id: str, account_id: str, account_data: dict, operator: str) -> dict:
+    async def update_utility_account(self, customer_id: str, account_id: str, account_data: dict, operator: str) -> dict:
         """
         更新户号信息
 
@@ -409,7 +373,7 @@ class CustomerService:
         if not ObjectId.is_valid(customer_id):
             raise ValueError("无效的客户ID")
 
-        customer = self.collection.find_one({
+        customer = await self.collection.find_one({
             "_id": ObjectId(customer_id),
             "status": {"$ne": "deleted"}
         })
@@ -432,7 +396,7 @@ class CustomerService:
             raise ValueError(f"户号 '{account_id}' 不存在")
 
         # 更新数据库
-        result = self.collection.update_one(
+        result = await self.collection.update_one(
             {"_id": ObjectId(customer_id)},
             {
                 "$set": {
@@ -447,10 +411,10 @@ class CustomerService:
             raise ValueError("客户不存在")
 
         # 返回更新后的客户信息
-        updated_customer = self.collection.find_one({"_id": ObjectId(customer_id)})
+        updated_customer = await self.collection.find_one({"_id": ObjectId(customer_id)})
         return self._convert_to_dict(updated_customer)
 
-    def delete_utility_account(self, customer_id: str, account_id: str, operator: str) -> dict:
+    async def delete_utility_account(self, customer_id: str, account_id: str, operator: str) -> dict:
         """
         删除户号
 
@@ -468,7 +432,7 @@ class CustomerService:
         if not ObjectId.is_valid(customer_id):
             raise ValueError("无效的客户ID")
 
-        customer = self.collection.find_one({
+        customer = await self.collection.find_one({
             "_id": ObjectId(customer_id),
             "status": {"$ne": "deleted"}
         })
@@ -476,7 +440,7 @@ class CustomerService:
             raise ValueError("客户不存在")
 
         # 删除户号
-        result = self.collection.update_one(
+        result = await self.collection.update_one(
             {"_id": ObjectId(customer_id)},
             {
                 "$pull": {"utility_accounts": {"account_id": account_id}},
@@ -488,10 +452,10 @@ class CustomerService:
             raise ValueError("客户不存在")
 
         # 返回更新后的客户信息
-        updated_customer = self.collection.find_one({"_id": ObjectId(customer_id)})
+        updated_customer = await self.collection.find_one({"_id": ObjectId(customer_id)})
         return self._convert_to_dict(updated_customer)
 
-    def add_metering_point(self, customer_id: str, account_id: str, metering_point_data: dict, operator: str) -> dict:
+    async def add_metering_point(self, customer_id: str, account_id: str, metering_point_data: dict, operator: str) -> dict:
         """
         为户号添加计量点
 
@@ -510,7 +474,7 @@ class CustomerService:
         if not ObjectId.is_valid(customer_id):
             raise ValueError("无效的客户ID")
 
-        customer = self.collection.find_one({
+        customer = await self.collection.find_one({
             "_id": ObjectId(customer_id),
             "status": {"$ne": "deleted"}
         })
@@ -539,14 +503,14 @@ class CustomerService:
         target_account["metering_points"].append(metering_point_data)
 
         # 更新客户信息
-        result = self.update_customer(
+        result = await self.update_customer(
             customer_id=customer_id,
             customer_data={"utility_accounts": accounts},
             operator=operator
         )
         return result
 
-    def update_metering_point(self, customer_id: str, account_id: str, metering_point_id: str, metering_point_data: dict, operator: str) -> dict:
+    async def update_metering_point(self, customer_id: str, account_id: str, metering_point_id: str, metering_point_data: dict, operator: str) -> dict:
         """
         更新计量点信息
 
@@ -566,7 +530,7 @@ class CustomerService:
         if not ObjectId.is_valid(customer_id):
             raise ValueError("无效的客户ID")
 
-        customer = self.collection.find_one({
+        customer = await self.collection.find_one({
             "_id": ObjectId(customer_id),
             "status": {"$ne": "deleted"}
         })
@@ -600,14 +564,14 @@ class CustomerService:
             raise ValueError(f"计量点ID '{metering_point_id}' 不存在")
 
         # 更新客户信息
-        result = self.update_customer(
+        result = await self.update_customer(
             customer_id=customer_id,
             customer_data={"utility_accounts": accounts},
             operator=operator
         )
         return result
 
-    def delete_metering_point(self, customer_id: str, account_id: str, metering_point_id: str, operator: str) -> dict:
+    async def delete_metering_point(self, customer_id: str, account_id: str, metering_point_id: str, operator: str) -> dict:
         """
         删除计量点
 
@@ -626,7 +590,7 @@ class CustomerService:
         if not ObjectId.is_valid(customer_id):
             raise ValueError("无效的客户ID")
 
-        customer = self.collection.find_one({
+        customer = await self.collection.find_one({
             "_id": ObjectId(customer_id),
             "status": {"$ne": "deleted"}
         })
@@ -659,14 +623,14 @@ class CustomerService:
                 break
 
         # 更新客户信息
-        result = self.update_customer(
+        result = await self.update_customer(
             customer_id=customer_id,
             customer_data={"utility_accounts": accounts},
             operator=operator
         )
         return result
 
-    def get_meter_info(self, meter_id: str) -> dict:
+    async def get_meter_info(self, meter_id: str) -> dict:
         """
         获取电表信息（用于自动填充）
 
@@ -690,7 +654,8 @@ class CustomerService:
             }}
         ]
 
-        result = list(self.collection.aggregate(pipeline))
+        cursor = await self.collection.aggregate(pipeline)
+        result = await cursor.to_list()
 
         if result:
             return {
@@ -703,7 +668,7 @@ class CustomerService:
 
         return {}
 
-    def sync_update_meter(self, meter_id: str, update_data: dict, sync_all: bool = True, operator: str = None) -> dict:
+    async def sync_update_meter(self, meter_id: str, update_data: dict, sync_all: bool = True, operator: str = None) -> dict:
         """
         同步更新电表信息
 
@@ -728,7 +693,7 @@ class CustomerService:
             for key, value in update_data.items():
                 update_fields[f"utility_accounts.$[].metering_points.$[elem].meter.{key}"] = value
 
-            result = self.collection.update_many(
+            result = await self.collection.update_many(
                 match_condition,
                 {
                     "$set": {
@@ -748,11 +713,11 @@ class CustomerService:
         else:
             # 这里可以根据需要实现单个更新的逻辑
             # 目前先返回全部更新的结果
-            return self.sync_update_meter(meter_id, update_data, True, operator)
+            return await self.sync_update_meter(meter_id, update_data, True, operator)
 
     # ==================== 状态转换方法 ====================
 
-    def sign_contract(self, customer_id: str, operator: str, contract_id: Optional[str] = None) -> dict:
+    async def sign_contract(self, customer_id: str, operator: str, contract_id: Optional[str] = None) -> dict:
         """
         签约操作：将意向客户转换为待生效状态
 
@@ -772,7 +737,7 @@ class CustomerService:
         if not ObjectId.is_valid(customer_id):
             raise ValueError("无效的客户ID")
 
-        customer = self.collection.find_one({"_id": ObjectId(customer_id)})
+        customer = await self.collection.find_one({"_id": ObjectId(customer_id)})
         if not customer:
             raise ValueError("客户不存在")
 
@@ -791,7 +756,7 @@ class CustomerService:
         if contract_id:
             update_data["contract_id"] = contract_id
 
-        result = self.collection.update_one(
+        result = await self.collection.update_one(
             {"_id": ObjectId(customer_id)},
             {"$set": update_data}
         )
@@ -799,10 +764,10 @@ class CustomerService:
         if result.matched_count == 0:
             raise ValueError("更新失败")
 
-        updated_customer = self.collection.find_one({"_id": ObjectId(customer_id)})
+        updated_customer = await self.collection.find_one({"_id": ObjectId(customer_id)})
         return self._convert_to_dict(updated_customer)
 
-    def cancel_contract(self, customer_id: str, operator: str, reason: Optional[str] = None) -> dict:
+    async def cancel_contract(self, customer_id: str, operator: str, reason: Optional[str] = None) -> dict:
         """
         撤销操作：将待生效客户转换为已终止状态
 
@@ -822,7 +787,7 @@ class CustomerService:
         if not ObjectId.is_valid(customer_id):
             raise ValueError("无效的客户ID")
 
-        customer = self.collection.find_one({"_id": ObjectId(customer_id)})
+        customer = await self.collection.find_one({"_id": ObjectId(customer_id)})
         if not customer:
             raise ValueError("客户不存在")
 
@@ -840,7 +805,7 @@ class CustomerService:
         if reason:
             update_data["termination_reason"] = reason
 
-        result = self.collection.update_one(
+        result = await self.collection.update_one(
             {"_id": ObjectId(customer_id)},
             {"$set": update_data}
         )
@@ -848,10 +813,10 @@ class CustomerService:
         if result.matched_count == 0:
             raise ValueError("更新失败")
 
-        updated_customer = self.collection.find_one({"_id": ObjectId(customer_id)})
+        updated_customer = await self.collection.find_one({"_id": ObjectId(customer_id)})
         return self._convert_to_dict(updated_customer)
 
-    def activate(self, customer_id: str, operator: str) -> dict:
+    async def activate(self, customer_id: str, operator: str) -> dict:
         """
         生效操作：将待生效客户转换为执行中状态
 
@@ -870,7 +835,7 @@ class CustomerService:
         if not ObjectId.is_valid(customer_id):
             raise ValueError("无效的客户ID")
 
-        customer = self.collection.find_one({"_id": ObjectId(customer_id)})
+        customer = await self.collection.find_one({"_id": ObjectId(customer_id)})
         if not customer:
             raise ValueError("客户不存在")
 
@@ -879,7 +844,7 @@ class CustomerService:
             raise ValueError(f"只有待生效客户可以执行生效操作，当前状态: {current_status}")
 
         # 更新状态为执行中
-        result = self.collection.update_one(
+        result = await self.collection.update_one(
             {"_id": ObjectId(customer_id)},
             {"$set": {
                 "status": "active",
@@ -891,10 +856,10 @@ class CustomerService:
         if result.matched_count == 0:
             raise ValueError("更新失败")
 
-        updated_customer = self.collection.find_one({"_id": ObjectId(customer_id)})
+        updated_customer = await self.collection.find_one({"_id": ObjectId(customer_id)})
         return self._convert_to_dict(updated_customer)
 
-    def suspend(self, customer_id: str, operator: str, reason: Optional[str] = None) -> dict:
+    async def suspend(self, customer_id: str, operator: str, reason: Optional[str] = None) -> dict:
         """
         暂停操作：将执行中客户转换为已暂停状态
 
@@ -914,7 +879,7 @@ class CustomerService:
         if not ObjectId.is_valid(customer_id):
             raise ValueError("无效的客户ID")
 
-        customer = self.collection.find_one({"_id": ObjectId(customer_id)})
+        customer = await self.collection.find_one({"_id": ObjectId(customer_id)})
         if not customer:
             raise ValueError("客户不存在")
 
@@ -932,7 +897,7 @@ class CustomerService:
         if reason:
             update_data["suspension_reason"] = reason
 
-        result = self.collection.update_one(
+        result = await self.collection.update_one(
             {"_id": ObjectId(customer_id)},
             {"$set": update_data}
         )
@@ -940,10 +905,10 @@ class CustomerService:
         if result.matched_count == 0:
             raise ValueError("更新失败")
 
-        updated_customer = self.collection.find_one({"_id": ObjectId(customer_id)})
+        updated_customer = await self.collection.find_one({"_id": ObjectId(customer_id)})
         return self._convert_to_dict(updated_customer)
 
-    def resume(self, customer_id: str, operator: str) -> dict:
+    async def resume(self, customer_id: str, operator: str) -> dict:
         """
         恢复操作：将已暂停客户转换为执行中状态
 
@@ -962,7 +927,7 @@ class CustomerService:
         if not ObjectId.is_valid(customer_id):
             raise ValueError("无效的客户ID")
 
-        customer = self.collection.find_one({"_id": ObjectId(customer_id)})
+        customer = await self.collection.find_one({"_id": ObjectId(customer_id)})
         if not customer:
             raise ValueError("客户不存在")
 
@@ -971,7 +936,7 @@ class CustomerService:
             raise ValueError(f"只有已暂停客户可以执行恢复操作，当前状态: {current_status}")
 
         # 更新状态为执行中，清除暂停原因
-        result = self.collection.update_one(
+        result = await self.collection.update_one(
             {"_id": ObjectId(customer_id)},
             {
                 "$set": {
@@ -986,10 +951,10 @@ class CustomerService:
         if result.matched_count == 0:
             raise ValueError("更新失败")
 
-        updated_customer = self.collection.find_one({"_id": ObjectId(customer_id)})
+        updated_customer = await self.collection.find_one({"_id": ObjectId(customer_id)})
         return self._convert_to_dict(updated_customer)
 
-    def terminate(self, customer_id: str, operator: str, reason: Optional[str] = None) -> dict:
+    async def terminate(self, customer_id: str, operator: str, reason: Optional[str] = None) -> dict:
         """
         终止操作：将执行中或已暂停客户转换为已终止状态
 
@@ -1009,7 +974,7 @@ class CustomerService:
         if not ObjectId.is_valid(customer_id):
             raise ValueError("无效的客户ID")
 
-        customer = self.collection.find_one({"_id": ObjectId(customer_id)})
+        customer = await self.collection.find_one({"_id": ObjectId(customer_id)})
         if not customer:
             raise ValueError("客户不存在")
 
@@ -1027,7 +992,7 @@ class CustomerService:
         if reason:
             update_data["termination_reason"] = reason
 
-        result = self.collection.update_one(
+        result = await self.collection.update_one(
             {"_id": ObjectId(customer_id)},
             {"$set": update_data}
         )
@@ -1035,7 +1000,7 @@ class CustomerService:
         if result.matched_count == 0:
             raise ValueError("更新失败")
 
-        updated_customer = self.collection.find_one({"_id": ObjectId(customer_id)})
+        updated_customer = await self.collection.find_one({"_id": ObjectId(customer_id)})
         return self._convert_to_dict(updated_customer)
 
     # ==================== 辅助方法 ====================
@@ -1058,4 +1023,7 @@ class CustomerService:
             else:
                 result[key] = value
 
-        return result
\ No newline at end of file
+        return result
+
+# 全局服务实例
+customer_service = CustomerService(ASYNC_DATABASE)
@@ -0,0 +1,213 @@
+"""
+数据日期目录（data_catalog）
+
+记录各时序集合中存在数据的日期和月份，替代每次对整个集合做 $dateToString + $group：
+- 现货价格（day_ahead_spot_price / real_time_spot_price）：每个集合一条目录
+- 负荷数据（user_load_data）：每个电表一条目录
+
+目录文档：{dataset, key, dates, months, first, last, day_basis, updated_at}
+- dates / months：日期 YYYY-MM-DD / 月份 YYYY-MM
+  - 现货价格：时间戳的日历日期，与原聚合一致
+  - 负荷数据：业务日，与负荷曲线、日电量汇总、可用性位图一致（业务日 D 的数据落在 (D 00:00, D+1 00:00]，
+    D+1 00:00 的点归入 D 的 24:00）
+- first / last：已收录数据的最早/最晚时间戳
+- day_basis：日期口径（calendar / business），与 DATASETS 不一致的旧目录在读取时不使用，当场从源数据聚合
+
+维护方式：
+- 写入数据时调用 record() 追加日期（$addToSet，幂等）；目录只由 record() / rebuild() 写入
+- 读取（get_dates / get_months）不写库：用索引取集合当前最早/最晚时间戳与目录比对，只对超出目录范围的
+  新数据做聚合并在内存中合并，因此未经 record() 的外部导入也不会返回过期结果
+- 外部导入、口径变更或区间内的删除/补录后执行 scripts/build_data_catalog.py 重建，
+  避免每次读取重复聚合目录之外的数据
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, DESCENDING
+
+from webapp.tools.mongo import ANALYTICS_DATABASE, DATABASE
+
+CATALOG_COLLECTION = 'data_catalog'
+
+# 数据集 -> (时间戳字段, 目录分组字段)；分组字段为 None 时整个集合一条目录
+DATASETS: Dict[str, tuple] = {
+    'day_ahead_spot_price': ('datetime', None),
+    'real_time_spot_price': ('datetime', None),
+    'user_load_data': ('timestamp', 'meter_id'),
+}
+
+# 按业务日归档的数据集（时间戳先减 1 毫秒再取日期，D+1 00:00 归入 D）
+BUSINESS_DAY_DATASETS = {'user_load_data'}
+
+
+def _day_basis(dataset: str) -> str:
+    return 'business' if dataset in BUSINESS_DAY_DATASETS else 'calendar'
+
+
+def _date_str(dataset: str, timestamp: datetime) -> str:
+    if dataset in BUSINESS_DAY_DATASETS:
+        timestamp = timestamp - timedelta(milliseconds=1)
+    return timestamp.strftime('%Y-%m-%d')
+
+
+def _months(dates: Iterable[str]) -> List[str]:
+    return sorted({day[:7] for day in dates})
+
+
+class DataCatalog:
+    """数据日期目录的维护与查询"""
+
+    def __init__(self, db, read_db=None):
+        self.db = db
+        self.read_db = read_db if read_db is not None else db
+        self.collection = self.db[CATALOG_COLLECTION]
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def record(self, dataset: str, timestamps: Iterable[datetime], key: str = '') -> None:
+        """
+        写入数据后登记其日期（可重复调用）
+
+        Args:
+            dataset: 数据集（集合名），见 DATASETS
+            timestamps: 本次写入的时间戳
+            key: 分组键（如电表ID），整个集合一条目录时为空字符串
+        """
+        timestamps = list(timestamps)
+        if not timestamps:
+            return
+        dates = sorted({_date_str(dataset, ts) for ts in timestamps})
+        self.collection.update_one(
+            {'dataset': dataset, 'key': key},
+            {'$addToSet': {'dates': {'$each': dates}, 'months': {'$each': _months(dates)}},
+             '$min': {'first': min(timestamps)}, '$max': {'last': max(timestamps)},
+             '$set': {'updated_at': datetime.utcnow()},
+             # 已有的旧口径目录保持原 day_basis，读取时不使用，直到 rebuild()
+             '$setOnInsert': {'day_basis': _day_basis(dataset)}},
+            upsert=True)
+
+    def clear(self, dataset: str) -> None:
+        """删除数据集的全部目录（清空源集合时调用）"""
+        self.collection.delete_many({'dataset': dataset})
+
+    @staticmethod
+    def _aggregate(source, dataset: str, match: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        按分组键聚合数据集中的日期和首尾时间戳，{key: {'dates', 'first', 'last'}}
+
+        Args:
+            source: 读取源数据的数据库（重建目录时为主库，读取时当场聚合为分析读偏好）
+        """
+        ts_field, key_field = DATASETS[dataset]
+        day_of = f'${ts_field}'
+        if dataset in BUSINESS_DAY_DATASETS:
+            day_of = {'$subtract': [day_of, 1]}
+        pipeline = [
+            {'$match': match},
+            {'$group': {
+                '_id': {'key': f'${key_field}' if key_field else '',
+                        'date': {'$dateToString': {'format': '%Y-%m-%d', 'date': day_of}}},
+                'first': {'$min': f'${ts_field}'}, 'last': {'$max': f'${ts_field}'}}},
+            {'$group': {'_id': '$_id.key', 'dates': {'$push': '$_id.date'},
+                        'first': {'$min': '$first'}, 'last': {'$max': '$last'}}},
+        ]
+        result = {}
+        for doc in source[dataset].aggregate(pipeline, allowDiskUse=True):
+            if doc['_id'] is None or doc['last'] is None:
+                continue
+            result[doc['_id']] = {'dates': sorted(d for d in doc['dates'] if d), 'first': doc['first'], 'last': doc['last']}
+        return result
+
+    def rebuild(self, dataset: str, key: Optional[str] = None) -> int:
+        """
+        全量重建数据集的目录（数据删除或区间内补录后使用）
+
+        Args:
+            dataset: 数据集
+            key: 只重建指定分组键，默认重建全部
+
+        Returns:
+            写入的目录条数
+        """
+        _, key_field = DATASETS[dataset]
+        match = {key_field: key} if key_field and key is not None else {}
+        # 从主库读取，避免把从库复制延迟造成的残缺日期保存为目录
+        entries = self._aggregate(self.db, dataset, match)
+
+        # 已无数据的分组删除目录
+        if key is None:
+            self.collection.delete_many({'dataset': dataset, 'key': {'$nin': list(entries)}})
+        elif key not in entries:
+            self.collection.delete_one({'dataset': dataset, 'key': key})
+        now = datetime.utcnow()
+        for entry_key, entry in entries.items():
+            self.collection.replace_one(
+                {'dataset': dataset, 'key': entry_key},
+                {'dataset': dataset, 'key': entry_key, 'dates': entry['dates'], 'months': _months(entry['dates']),
+                 'first': entry['first'], 'last': entry['last'], 'day_basis': _day_basis(dataset), 'updated_at': now},
+                upsert=True)
+        return len(entries)
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def _bounds(self, dataset: str, key: str):
+        """用索引取数据集（分组）当前的最早/最晚时间戳"""
+        ts_field, key_field = DATASETS[dataset]
+        query = {key_field: key} if key_field else {}
+        bounds = []
+        for direction in (ASCENDING, DESCENDING):
+            doc = self.read_db[dataset].find_one(query, {ts_field: 1, '_id': 0}, sort=[(ts_field, direction)])
+            bounds.append(doc.get(ts_field) if doc else None)
+        return bounds
+
+    def _entry(self, dataset: str, key: str) -> Optional[Dict[str, Any]]:
+        """
+        读取目录（只读）：目录范围之外新增的数据在内存中补入后返回，不写回目录
+
+        与 meter_energy.daily 相同，目录只由 record() / rebuild() 写入；没有目录或仍是旧日期口径时
+        按分组键从源数据当场聚合
+        """
+        entry = self.collection.find_one({'dataset': dataset, 'key': key}, {'_id': 0})
+        first, last = self._bounds(dataset, key)
+        if last is None:
+            return None
+        ts_field, key_field = DATASETS[dataset]
+        scope = {key_field: key} if key_field else {}
+        if entry is None or entry.get('day_basis', 'calendar') != _day_basis(dataset):
+            # 尚未建立目录（外部导入），或目录仍是旧的日期口径
+            computed = self._aggregate(self.read_db, dataset, scope).get(key)
+            return {'dates': computed['dates'], 'months': _months(computed['dates'])} if computed else None
+
+        outside = []
+        if entry.get('first') is None or first < entry['first']:
+            outside.append({ts_field: {'$lt': entry['first']}} if entry.get('first') else {})
+        if entry.get('last') is None or last > entry['last']:
+            outside.append({ts_field: {'$gt': entry['last']}} if entry.get('last') else {})
+        if not outside:
+            return entry
+
+        match = {**scope, **({'$or': outside} if len(outside) > 1 else outside[0])}
+        added = self._aggregate(self.read_db, dataset, match).get(key)
+        if added:
+            entry['dates'] = sorted(set(entry.get('dates', [])) | set(added['dates']))
+            entry['months'] = _months(entry['dates'])
+        return entry
+
+    def get_dates(self, dataset: str, key: str = '') -> List[str]:
+        """存在数据的日期列表（升序）"""
+        entry = self._entry(dataset, key)
+        return sorted(entry.get('dates', [])) if entry else []
+
+    def get_months(self, dataset: str, key: str = '') -> List[str]:
+        """存在数据的月份列表（升序）"""
+        entry = self._entry(dataset, key)
+        return sorted(entry.get('months', [])) if entry else []
+
+
+# 全局服务实例：目录写入及重建时的源数据读取走主库，读取时当场聚合走分析读偏好
+data_catalog = DataCatalog(DATABASE, ANALYTICS_DATABASE)
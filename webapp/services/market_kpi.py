@@ -0,0 +1,360 @@
+"""
+市场价格 KPI 计算引擎（向量化）
+
+输入为价格立方体格式的数组（见 webapp/services/price_cube.py）：
+    da / rt: 形状 (天数, 96, 字段数)，缺失为 NaN
+    periods: 形状 (天数, 96) 的分时时段编号（PERIOD_ORDER 下标，其他时段为 -1）
+
+计算口径与单日市场总览接口一致：
+- 只统计日前数据存在的时段
+- VWAP/TWAP 只统计价格非空且出清电量 > 0 的时段
+- 价差 = 实时价格 - 日前价格；极值取首次出现的位置
+- 新能源占比 = 实时风电+光伏出力 / 实时总出清电量（同 VWAP 口径）
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from webapp.services.price_cube import FIELD_INDEX, SLOT_TIME_STRS
+from webapp.services.tou_aggregation import PERIOD_ORDER, period_stats
+
+_PRICE = FIELD_INDEX['avg_clearing_price']
+_VOLUME = FIELD_INDEX['total_clearing_power']
+_WIND = FIELD_INDEX['wind_clearing_power']
+_SOLAR = FIELD_INDEX['solar_clearing_power']
+
+# 全天汇总在 totals 中的键
+ALL_DAY = "全天"
+# 可累加的汇总量：区间 KPI 由逐日汇总量相加后计算，与在原始数据上直接计算等价
+TOTAL_KEYS = ("da_weighted", "da_volume", "da_price_sum", "da_count",
+              "rt_weighted", "rt_volume", "rt_price_sum", "rt_count", "renewable")
+RISK_KEYS = ("max_positive_spread", "max_negative_spread", "max_rt_price", "min_rt_price")
+# 逐日极值索引（market_daily_summary.extremes）的指标及默认排序方向（True 为从大到小）
+EXTREME_METRICS = {
+    "max_rt_price": True,
+    "min_rt_price": False,
+    "max_positive_spread": True,
+    "max_negative_spread": False,
+    "max_abs_ramp": True,
+}
+
+
+def period_codes(tou_map: Dict[str, str]) -> np.ndarray:
+    """
+    把 {time_str: 时段名称} 映射转换为 96 个时段的编号数组
+
+    Args:
+        tou_map: get_tou_rule_for_date 返回的映射，缺失的时刻（如 "24:00"）按平段处理
+
+    Returns:
+        形状 (96,) 的 int 数组，值为 PERIOD_ORDER 下标，不在 PERIOD_ORDER 中的时段为 -1
+    """
+    index = {name: i for i, name in enumerate(PERIOD_ORDER)}
+    return np.array([index.get(tou_map.get(time_str, "平段"), -1) for time_str in SLOT_TIME_STRS], dtype=np.int8)
+
+
+def _or_none(values: np.ndarray) -> List[Optional[float]]:
+    """NaN -> None 的列表"""
+    return [None if value != value else value for value in values.tolist()]
+
+
+class _Columns:
+    """把 (天数, 96, 字段) 数组拆成 KPI 计算需要的 (组数, 组内点数) 二维列"""
+
+    def __init__(self, da: np.ndarray, rt: np.ndarray, periods: np.ndarray, groups: int):
+        shape = (groups, -1)
+        # 日前文档存在（任一字段非空）的时段才参与统计
+        self.exists = (~np.isnan(da).all(axis=-1)).reshape(shape)
+        self.da_price = np.where(self.exists, da[..., _PRICE].reshape(shape), np.nan)
+        self.rt_price = np.where(self.exists, rt[..., _PRICE].reshape(shape), np.nan)
+        self.da_volume = np.nan_to_num(da[..., _VOLUME].reshape(shape))
+        self.rt_volume = np.nan_to_num(rt[..., _VOLUME].reshape(shape))
+        self.rt_renewable = np.nan_to_num(rt[..., _WIND].reshape(shape)) + np.nan_to_num(rt[..., _SOLAR].reshape(shape))
+        self.periods = periods.reshape(shape)
+        self.spread = self.rt_price - self.da_price
+        self.da_valid = ~np.isnan(self.da_price) & (self.da_volume > 0)
+        self.rt_valid = ~np.isnan(self.rt_price) & (self.rt_volume > 0)
+
+
+def _extreme(values: np.ndarray, largest: bool):
+    """每组的极值及其组内位置（首次出现）；全为 NaN 的组值为 NaN"""
+    filled = np.where(np.isnan(values), -np.inf if largest else np.inf, values)
+    position = filled.argmax(axis=1) if largest else filled.argmin(axis=1)
+    value = np.take_along_axis(values, position[:, None], axis=1)[:, 0]
+    return value, position
+
+
+def _price_ramp(rt: np.ndarray) -> np.ndarray:
+    """
+    实时价格爬坡（与现货市场复盘接口的 price_ramp 一致）：
+    当前时段价格 - 前一个存在实时数据的时段价格，第一个点或任一价格缺失时为 NaN
+
+    Args:
+        rt: 形状 (天数, 96, 字段数)
+
+    Returns:
+        形状 (天数, 96)
+    """
+    exists = ~np.isnan(rt).all(axis=-1)
+    price = rt[..., _PRICE]
+    last_seen = np.maximum.accumulate(np.where(exists, np.arange(exists.shape[1]), -1), axis=1)
+    previous = np.concatenate([np.full((len(rt), 1), -1), last_seen[:, :-1]], axis=1)
+    previous_price = np.take_along_axis(price, np.clip(previous, 0, None), axis=1)
+    return np.where(exists & (previous >= 0), price - previous_price, np.nan)
+
+
+def _totals(cols: _Columns) -> Dict[str, Dict[str, np.ndarray]]:
+    """按组计算全天及各分时时段可累加的汇总量，{ALL_DAY 或时段名称: {汇总量: 每组的值}}"""
+    da = period_stats(cols.da_price, cols.periods, cols.da_volume, cols.da_valid, ALL_DAY)
+    rt = period_stats(cols.rt_price, cols.periods, cols.rt_volume, cols.rt_valid, ALL_DAY)
+    renewable = period_stats(cols.rt_renewable, cols.periods, valid=cols.rt_valid, total=ALL_DAY)
+    return {name: {
+        "da_weighted": da[name]["weighted"],
+        "da_volume": da[name]["weight"],
+        "da_price_sum": da[name]["sum"],
+        "da_count": da[name]["count"],
+        "rt_weighted": rt[name]["weighted"],
+        "rt_volume": rt[name]["weight"],
+        "rt_price_sum": rt[name]["sum"],
+        "rt_count": rt[name]["count"],
+        "renewable": renewable[name]["sum"],
+    } for name in (ALL_DAY,) + PERIOD_ORDER}
+
+
+def _div(numerator: float, denominator: float) -> Optional[float]:
+    return numerator / denominator if denominator > 0 else None
+
+
+def _kpis_from_totals(totals: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+    """
+    由汇总量计算财务 KPI、新能源占比和分时段汇总
+
+    Args:
+        totals: {ALL_DAY: 汇总量, 时段名称: 汇总量, ...}
+    """
+    t = totals[ALL_DAY]
+    vwap_da = _div(t["da_weighted"], t["da_volume"])
+    vwap_rt = _div(t["rt_weighted"], t["rt_volume"])
+    financial_kpis = {
+        "vwap_rt": vwap_rt,
+        "vwap_da": vwap_da,
+        "vwap_spread": (vwap_rt - vwap_da) if (vwap_rt is not None and vwap_da is not None) else None,
+        "twap_rt": _div(t["rt_price_sum"], t["rt_count"]),
+        "twap_da": _div(t["da_price_sum"], t["da_count"]),
+    }
+
+    period_summary = []
+    for name in PERIOD_ORDER:
+        p = totals.get(name)
+        if p is None:
+            continue
+        vwap_da_period = _div(p["da_weighted"], p["da_volume"])
+        vwap_rt_period = _div(p["rt_weighted"], p["rt_volume"])
+        period_summary.append({
+            "period_name": name,
+            "vwap_da": vwap_da_period,
+            "vwap_rt": vwap_rt_period,
+            # 与单日接口一致：任一 VWAP 为 0 或缺失时价差为空
+            "vwap_spread": (vwap_rt_period - vwap_da_period) if (vwap_rt_period and vwap_da_period) else None,
+            "avg_volume_rt": _div(p["rt_volume"], p["rt_count"]),
+            "renewable_ratio": _div(p["renewable"], p["rt_volume"]),
+        })
+    return {
+        "financial_kpis": financial_kpis,
+        "renewable_ratio": _div(t["renewable"], t["rt_volume"]),
+        "period_summary": period_summary,
+    }
+
+
+def _point(value: float, slot: int, number: int) -> Optional[Dict[str, Any]]:
+    """极值点描述：{'value', 'time_str', 'period'}"""
+    if value != value:
+        return None
+    return {"value": float(value), "time_str": SLOT_TIME_STRS[slot], "period": int(number)}
+
+
+def empty_kpis() -> Dict[str, Any]:
+    """没有数据的业务日的 KPI 结构"""
+    return {
+        "financial_kpis": {key: None for key in ("vwap_rt", "vwap_da", "vwap_spread", "twap_rt", "twap_da")},
+        "risk_kpis": {key: None for key in RISK_KEYS},
+        "renewable_ratio": None,
+        "period_summary": [],
+    }
+
+
+def daily_summaries(dates: Sequence[str], da: np.ndarray, rt: np.ndarray, periods: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    逐日计算 KPI（一次向量化计算全部日期）
+
+    Args:
+        dates: 日期字符串列表，长度与数组第一维一致
+        da / rt: 形状 (天数, 96, 字段数)
+        periods: 形状 (天数, 96) 的时段编号
+
+    Returns:
+        [{'date_str', 'financial_kpis', 'risk_kpis', 'renewable_ratio', 'period_summary', 'totals',
+          'extremes', 'extreme_times'}]，没有日前数据的日期省略；
+        totals 为可累加的汇总量，用于合并区间 KPI；extremes 为 EXTREME_METRICS 各指标的数值（另含带符号的 ramp），
+        extreme_times 为对应的业务时刻
+    """
+    cols = _Columns(da, rt, periods, len(dates))
+    # 风险 KPI 中的 period 为当日日前数据点序号（与时序数据的 period 字段一致）
+    numbers = np.cumsum(cols.exists, axis=1)
+    extremes = {
+        "max_positive_spread": _extreme(cols.spread, True),
+        "max_negative_spread": _extreme(cols.spread, False),
+        "max_rt_price": _extreme(cols.rt_price, True),
+        "min_rt_price": _extreme(cols.rt_price, False),
+    }
+    ramp = _price_ramp(rt)
+    ramp_value, ramp_position = _extreme(np.abs(ramp), True)
+    signed_ramp = np.take_along_axis(ramp, ramp_position[:, None], axis=1)[:, 0]
+    extremes_index = {**{key: extremes[key] for key in RISK_KEYS}, "max_abs_ramp": (ramp_value, ramp_position)}
+    extremes_index = {key: (_or_none(values), positions.tolist()) for key, (values, positions) in extremes_index.items()}
+    signed_ramp = _or_none(signed_ramp)
+    totals_by_group = _totals(cols)
+    groups = [(ALL_DAY, np.ones(len(dates), dtype=bool), totals_by_group[ALL_DAY])]
+    for code, name in enumerate(PERIOD_ORDER):
+        present = (cols.exists & (cols.periods == code)).any(axis=1)
+        groups.append((name, present, totals_by_group[name]))
+    # 一次性转换为 Python 标量，避免逐元素访问 NumPy 数组
+    groups = [(name, present.tolist(), {key: values.tolist() for key, values in totals.items()})
+              for name, present, totals in groups]
+    extremes = {key: (values.tolist(), positions.tolist()) for key, (values, positions) in extremes.items()}
+
+    results = []
+    for i, (date_str, has_data) in enumerate(zip(dates, cols.exists.any(axis=1).tolist())):
+        if not has_data:
+            continue
+        totals = {name: {key: values[i] for key, values in group.items()}
+                  for name, present, group in groups if present[i]}
+        risk_kpis = {}
+        for key, (values, positions) in extremes.items():
+            slot = positions[i]
+            risk_kpis[key] = _point(values[i], slot, numbers[i, slot])
+        day_extremes = {key: values[i] for key, (values, _) in extremes_index.items()}
+        extreme_times = {key: (SLOT_TIME_STRS[positions[i]] if values[i] is not None else None)
+                         for key, (values, positions) in extremes_index.items()}
+        results.append({"date_str": date_str, **_kpis_from_totals(totals), "risk_kpis": risk_kpis, "totals": totals,
+                        "extremes": {**day_extremes, "ramp": signed_ramp[i]}, "extreme_times": extreme_times})
+    return results
+
+
+def day_time_series(da: np.ndarray, rt: np.ndarray, tou_map: Dict[str, str]) -> List[Dict[str, Any]]:
+    """
+    单个业务日的 96 点时序（仅日前数据存在的时段）
+
+    Args:
+        da / rt: 形状 (96, 字段数)
+        tou_map: {time_str: 时段名称}
+    """
+    exists = ~np.isnan(da).all(axis=-1)
+    da_price, rt_price = _or_none(da[:, _PRICE]), _or_none(rt[:, _PRICE])
+    da_volume = np.nan_to_num(da[:, _VOLUME]).tolist()
+    rt_volume = np.nan_to_num(rt[:, _VOLUME]).tolist()
+    spread = _or_none(rt[:, _PRICE] - da[:, _PRICE])
+    series = []
+    for number, slot in enumerate(np.flatnonzero(exists).tolist(), start=1):
+        time_str = SLOT_TIME_STRS[slot]
+        series.append({
+            "period": number,
+            "time": time_str,
+            "time_str": time_str,
+            "price_rt": rt_price[slot],
+            "price_da": da_price[slot],
+            "volume_rt": rt_volume[slot],
+            "volume_da": da_volume[slot],
+            "spread": spread[slot],
+            "period_type": tou_map.get(time_str, "平段"),
+        })
+    return series
+
+
+def day_kpis(da: np.ndarray, rt: np.ndarray, periods: np.ndarray) -> Dict[str, Any]:
+    """
+    单个业务日的财务 / 风险 KPI 和分时段汇总
+
+    Args:
+        da / rt: 形状 (96, 字段数)
+        periods: 形状 (96,) 的时段编号
+
+    Returns:
+        {'financial_kpis', 'risk_kpis', 'renewable_ratio', 'period_summary'}
+    """
+    summaries = daily_summaries([""], da[None], rt[None], periods[None])
+    return summaries[0] if summaries else empty_kpis()
+
+
+def combine_summaries(summaries: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    把逐日 KPI 合并为区间 KPI
+
+    Args:
+        summaries: daily_summaries 的结果或 market_daily_summary 中的文档，按日期升序
+
+    Returns:
+        {'summary': 区间 KPI（极值点附带日期）, 'daily': [逐日 KPI 扁平结构]}
+    """
+    totals: Dict[str, Dict[str, float]] = {ALL_DAY: dict.fromkeys(TOTAL_KEYS, 0)}
+    risk_kpis: Dict[str, Optional[Dict[str, Any]]] = {key: None for key in RISK_KEYS}
+    daily = []
+    for item in summaries:
+        for name, values in item["totals"].items():
+            group = totals.setdefault(name, dict.fromkeys(TOTAL_KEYS, 0))
+            for key in TOTAL_KEYS:
+                group[key] += values.get(key, 0)
+        for key in RISK_KEYS:
+            point = item["risk_kpis"].get(key)
+            if point is None:
+                continue
+            best = risk_kpis[key]
+            # 极值取首次出现的位置
+            larger = key in ("max_positive_spread", "max_rt_price")
+            if best is None or (point["value"] > best["value"] if larger else point["value"] < best["value"]):
+                risk_kpis[key] = {**point, "date": item["date_str"]}
+        daily.append({
+            "date": item["date_str"],
+            **item["financial_kpis"],
+            "renewable_ratio": item["renewable_ratio"],
+            **{key: (point["value"] if point else None) for key, point in item["risk_kpis"].items()},
+        })
+
+    if not daily:
+        return {"summary": empty_kpis(), "daily": []}
+    return {"summary": {**_kpis_from_totals(totals), "risk_kpis": risk_kpis}, "daily": daily}
+
+
+def range_kpis(dates: Sequence[str], da: np.ndarray, rt: np.ndarray, periods: np.ndarray) -> Dict[str, Any]:
+    """
+    业务日区间的逐日 KPI 和区间整体 KPI
+
+    Args:
+        dates: 日期字符串列表，长度与数组第一维一致
+        da / rt: 形状 (天数, 96, 字段数)
+        periods: 形状 (天数, 96) 的时段编号
+
+    Returns:
+        {'summary': 区间 KPI（含分时段汇总）, 'daily': [逐日 KPI]}，没有日前数据的日期不出现在 daily 中
+    """
+    return combine_summaries(daily_summaries(dates, da, rt, periods))
+
+
+def fingerprints(values: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    逐日的源数据指纹（点数、价格之和、总出清电量之和），用于判断汇总是否需要重算
+
+    Args:
+        values: 形状 (天数, 96, 字段数)
+    """
+    count = (~np.isnan(values).all(axis=-1)).sum(axis=1).tolist()
+    sum_price = np.nansum(values[..., _PRICE], axis=1).tolist()
+    sum_power = np.nansum(values[..., _VOLUME], axis=1).tolist()
+    return [make_fingerprint(c, p, w) for c, p, w in zip(count, sum_price, sum_power)]
+
+
+def make_fingerprint(count: int, sum_price: Optional[float], sum_power: Optional[float]) -> Dict[str, Any]:
+    """统一指纹格式（求和结果保留 4 位小数，消除求和顺序带来的浮点误差）"""
+    return {"count": int(count), "sum_price": round(float(sum_price or 0), 4),
+            "sum_power": round(float(sum_power or 0), 4)}
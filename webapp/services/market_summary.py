@@ -0,0 +1,271 @@
+"""
+现货市场日汇总（market_daily_summary）
+
+每个业务日一条文档，保存市场总览所需的 KPI：
+- financial_kpis：日前/实时 VWAP、TWAP 及 VWAP 价差
+- risk_kpis：最大正/负价差、实时价格极值（含时刻）
+- renewable_ratio / period_summary：新能源占比和按尖峰平谷分组的汇总
+- totals：可累加的汇总量（全天及各时段），区间 KPI 直接由逐日 totals 相加得到
+- extremes / extreme_times：逐日极值索引（实时价格极值、最大正/负价差、最大实时价格爬坡），
+  各指标建有索引，用于跨年的“前 N 天”和阈值查询（top_days）
+- source_fingerprint：生成时日前/实时源数据的指纹（点数、价格之和、电量之和）及当日生效分时时段表的摘要，
+  分时规则调整（新增规则版本）后受影响的业务日自动按过期处理
+- version：汇总结构版本，结构变化后旧版本的汇总按过期处理并在下次构建时重算
+
+增量构建：按 date_str 聚合两个价格集合的当前指纹，只重算指纹变化（新到、补齐或订正）的业务日，
+源数据已删除的业务日同时删除汇总。由 scripts/build_market_summary.py 定时执行。
+
+读取时（市场总览接口）用价格立方体中的数据计算指纹与汇总比对，指纹不一致或汇总缺失的业务日
+当场计算，因此汇总任务滞后时也不会返回过期结果。
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from pymongo import ReplaceOne
+
+from webapp.services import market_kpi
+from webapp.services.price_cube import MARKET_COLLECTIONS, load_span
+from webapp.services.tou_service import TouService, tou_service
+from webapp.tools.mongo import ANALYTICS_DATABASE, DATABASE
+
+SUMMARY_COLLECTION = 'market_daily_summary'
+# 每批重算的业务日数
+BUILD_BATCH_DAYS = 62
+# 汇总结构版本（2：增加 extremes 极值索引）
+SUMMARY_VERSION = 2
+
+
+def _is_current(doc: Optional[Dict[str, Any]], fingerprint: Dict[str, Any]) -> bool:
+    """汇总文档是否与源数据指纹一致且为当前结构版本"""
+    return doc is not None and doc.get('version') == SUMMARY_VERSION and doc.get('source_fingerprint') == fingerprint
+
+
+class MarketSummaryService:
+    """市场日汇总的构建与读取"""
+
+    def __init__(self, db, read_db=None, tou: Optional[TouService] = None):
+        self.db = db
+        self.read_db = read_db if read_db is not None else db
+        self.collection = self.db[SUMMARY_COLLECTION]
+        self.read_collection = self.read_db[SUMMARY_COLLECTION]
+        self.tou = tou if tou is not None else TouService(self.read_db)
+
+    # ------------------------------------------------------------------
+    # 构建
+    # ------------------------------------------------------------------
+
+    def source_fingerprints(self, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        按业务日聚合两个价格集合的当前指纹，并附上当日生效分时时段表的摘要
+
+        Returns:
+            {date_str: {'day_ahead': 指纹, 'real_time': 指纹, 'tou': 时段表摘要}}，缺少某个市场数据时对应指纹的 count 为 0
+        """
+        match: Dict[str, Any] = {}
+        if start or end:
+            match['date_str'] = {**({'$gte': start} if start else {}), **({'$lte': end} if end else {})}
+        pipeline = [
+            {'$match': match},
+            {'$group': {'_id': '$date_str', 'count': {'$sum': 1},
+                        'sum_price': {'$sum': '$avg_clearing_price'},
+                        'sum_power': {'$sum': '$total_clearing_power'}}},
+        ]
+        result: Dict[str, Dict[str, Any]] = {}
+        for market, collection_name in MARKET_COLLECTIONS.items():
+            for doc in self.db[collection_name].aggregate(pipeline):
+                if not doc['_id']:
+                    continue
+                fingerprint = market_kpi.make_fingerprint(doc['count'], doc['sum_price'], doc['sum_power'])
+                result.setdefault(doc['_id'], {})[market] = fingerprint
+        empty = market_kpi.make_fingerprint(0, 0, 0)
+        for fingerprints in result.values():
+            for market in MARKET_COLLECTIONS:
+                fingerprints.setdefault(market, empty)
+        days = sorted(result)
+        for day, signature in zip(days, self.tou.signatures(days)):
+            result[day]['tou'] = signature
+        return result
+
+    def _load_days(self, dates: Sequence[str]):
+        """从 Mongo 加载指定业务日的数组（不经过进程内立方体），返回 (da, rt)"""
+        first = datetime.strptime(dates[0], '%Y-%m-%d').date()
+        last = datetime.strptime(dates[-1], '%Y-%m-%d').date()
+        offsets = [(datetime.strptime(day, '%Y-%m-%d').date() - first).days for day in dates]
+        return tuple(load_span(self.db[name], first, last)[offsets] for name in MARKET_COLLECTIONS.values())
+
+    def build(self, start: Optional[str] = None, end: Optional[str] = None, full: bool = False,
+              dry_run: bool = False) -> Dict[str, int]:
+        """
+        增量构建日汇总
+
+        Args:
+            start / end: 只处理该业务日区间（含首尾），默认全部
+            full: 忽略指纹，全部重算（KPI 口径调整后使用；分时规则调整已由指纹覆盖）
+            dry_run: 只统计需要处理的业务日，不写入
+
+        Returns:
+            {'checked', 'changed', 'written', 'deleted'}
+        """
+        current = self.source_fingerprints(start, end)
+        query: Dict[str, Any] = {}
+        if start or end:
+            query['date_str'] = {**({'$gte': start} if start else {}), **({'$lte': end} if end else {})}
+        stored = {doc['date_str']: doc
+                  for doc in self.collection.find(query, {'date_str': 1, 'source_fingerprint': 1, 'version': 1})}
+
+        changed = sorted(day for day, fingerprint in current.items()
+                         if full or not _is_current(stored.get(day), fingerprint))
+        removed = sorted(day for day in stored if day not in current)
+        stats = {'checked': len(current), 'changed': len(changed), 'written': 0, 'deleted': len(removed)}
+        if dry_run:
+            return stats
+
+        if removed:
+            self.collection.delete_many({'date_str': {'$in': removed}})
+        for begin in range(0, len(changed), BUILD_BATCH_DAYS):
+            batch = changed[begin:begin + BUILD_BATCH_DAYS]
+            da, rt = self._load_days(batch)
+            periods = self.tou.period_matrix(batch)
+            now = datetime.utcnow()
+            operations = []
+            summaries = {item['date_str']: item for item in market_kpi.daily_summaries(batch, da, rt, periods)}
+            for day in batch:
+                item = summaries.get(day)
+                if item is None:
+                    # 只有实时数据、没有日前数据的业务日不生成汇总（与总览接口口径一致）
+                    operations.append(ReplaceOne({'date_str': day}, {
+                        'date_str': day, 'month': day[:7], **market_kpi.empty_kpis(), 'totals': {},
+                        'source_fingerprint': current[day], 'version': SUMMARY_VERSION, 'updated_at': now},
+                        upsert=True))
+                    continue
+                operations.append(ReplaceOne({'date_str': day}, {
+                    **item, 'month': day[:7], 'source_fingerprint': current[day], 'version': SUMMARY_VERSION,
+                    'updated_at': now}, upsert=True))
+            if operations:
+                self.collection.bulk_write(operations, ordered=False)
+                stats['written'] += len(operations)
+        return stats
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def get_summaries(self, start: str, end: str) -> Dict[str, Dict[str, Any]]:
+        """读取业务日区间（含首尾）的汇总，{date_str: 文档}"""
+        cursor = self.read_collection.find({'date_str': {'$gte': start, '$lte': end}}, {'_id': 0, 'updated_at': 0})
+        return {doc['date_str']: doc for doc in cursor}
+
+    def range_summaries(self, dates: Sequence[str], da: np.ndarray, rt: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        区间内逐日 KPI：优先使用指纹一致的已存汇总，其余业务日用 KPI 引擎当场计算
+
+        Args:
+            dates: 连续的日期字符串列表
+            da / rt: 价格立方体中对应区间的数组，形状 (天数, 96, 字段数)
+
+        Returns:
+            按日期升序、只包含有日前数据的业务日的逐日 KPI
+        """
+        stored = self.get_summaries(dates[0], dates[-1]) if dates else {}
+        da_fingerprints = market_kpi.fingerprints(da)
+        rt_fingerprints = market_kpi.fingerprints(rt)
+        signatures = self.tou.signatures(dates)
+
+        reuse, stale = {}, []
+        for i, day in enumerate(dates):
+            doc = stored.get(day)
+            expected = {'day_ahead': da_fingerprints[i], 'real_time': rt_fingerprints[i], 'tou': signatures[i]}
+            if _is_current(doc, expected):
+                reuse[day] = doc
+            elif da_fingerprints[i]['count'] > 0:
+                stale.append(i)
+
+        if stale:
+            stale_dates = [dates[i] for i in stale]
+            computed = market_kpi.daily_summaries(stale_dates, da[stale], rt[stale],
+                                                  self.tou.period_matrix(stale_dates))
+            reuse.update((item['date_str'], item) for item in computed)
+        return [reuse[day] for day in dates if day in reuse and reuse[day].get('totals')]
+
+    def top_days(self, metric: str, start: str, end: str, limit: int = 20, descending: Optional[bool] = None,
+                 min_value: Optional[float] = None, max_value: Optional[float] = None,
+                 da: Optional[np.ndarray] = None, rt: Optional[np.ndarray] = None,
+                 window_start: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        按逐日极值指标排序的“前 N 天” / 阈值查询
+
+        已存汇总走 extremes.<metric> 索引排序；传入价格立方体数组时，数组覆盖的业务日中指纹不一致或缺失汇总的
+        当场计算后参与排序，因此汇总任务滞后时结果也是最新的。数组之外的业务日直接使用已存汇总。
+
+        Args:
+            metric: EXTREME_METRICS 中的指标
+            start / end: 业务日区间（含首尾）
+            limit: 返回天数
+            descending: 排序方向，默认使用指标的自然方向（极大值从大到小，极小值从小到大）
+            min_value / max_value: 指标取值范围（含）
+            da / rt: 价格立方体中 [window_start, ...] 区间的数组，形状 (天数, 96, 字段数)，须落在 [start, end] 内
+            window_start: da / rt 的首个业务日，默认 start
+
+        Returns:
+            [{'date', 'value', 'time_str', 'extremes'}]
+        """
+        if descending is None:
+            descending = market_kpi.EXTREME_METRICS[metric]
+        field = f'extremes.{metric}'
+        value_filter: Dict[str, Any] = {'$ne': None}
+        if min_value is not None:
+            value_filter['$gte'] = min_value
+        if max_value is not None:
+            value_filter['$lte'] = max_value
+
+        computed = []
+        stale = []
+        if da is not None and rt is not None and len(da):
+            first = datetime.strptime(window_start or start, '%Y-%m-%d')
+            dates = [(first + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(len(da))]
+            stored = {doc['date_str']: doc for doc in self.read_collection.find(
+                {'date_str': {'$gte': dates[0], '$lte': dates[-1]}},
+                {'_id': 0, 'date_str': 1, 'source_fingerprint': 1, 'version': 1})}
+            da_fingerprints = market_kpi.fingerprints(da)
+            rt_fingerprints = market_kpi.fingerprints(rt)
+            signatures = self.tou.signatures(dates)
+            positions = [i for i, day in enumerate(dates)
+                         if (da_fingerprints[i]['count'] > 0 or day in stored)
+                         and not _is_current(stored.get(day), {'day_ahead': da_fingerprints[i],
+                                                               'real_time': rt_fingerprints[i],
+                                                               'tou': signatures[i]})]
+            stale = [dates[i] for i in positions]
+            if positions:
+                computed = market_kpi.daily_summaries(stale, da[positions], rt[positions],
+                                                      self.tou.period_matrix(stale))
+
+        query: Dict[str, Any] = {'date_str': {'$gte': start, '$lte': end}, field: value_filter}
+        if stale:
+            query['date_str']['$nin'] = stale
+        cursor = self.read_collection.find(
+            query, {'_id': 0, 'date_str': 1, 'extremes': 1, 'extreme_times': 1}
+        ).sort([(field, -1 if descending else 1), ('date_str', 1)]).limit(limit)
+        candidates = list(cursor)
+        for item in computed:
+            value = item['extremes'].get(metric)
+            if value is None or (min_value is not None and value < min_value) or \
+                    (max_value is not None and value > max_value):
+                continue
+            candidates.append(item)
+
+        candidates.sort(key=lambda doc: doc['date_str'])
+        candidates.sort(key=lambda doc: doc['extremes'][metric], reverse=descending)
+        return [{'date': doc['date_str'], 'value': doc['extremes'][metric],
+                 'time_str': doc.get('extreme_times', {}).get(metric), 'extremes': doc['extremes']}
+                for doc in candidates[:limit]]
+
+    def day_kpis(self, date_str: str, da: np.ndarray, rt: np.ndarray) -> Dict[str, Any]:
+        """单个业务日的 KPI（汇总优先，见 range_summaries）"""
+        summaries = self.range_summaries([date_str], da[None], rt[None])
+        return summaries[0] if summaries else market_kpi.empty_kpis()
+
+
+# 全局服务实例：写入走主库，读取走分析读偏好；分时时段表与接口共用同一缓存
+market_summary_service = MarketSummaryService(DATABASE, ANALYTICS_DATABASE, tou=tou_service)
@@ -0,0 +1,217 @@
+"""
+电表数据可用性位图（meter_availability）
+
+每个电表每年一条文档，用位图记录哪些业务日、哪些时段存在负荷数据，供可用性日历和数据完整性视图
+一次查询成千上万个电表，而不必扫描原始 15 分钟数据：
+- days：每个业务日 1 位（当年第 N 天为第 N-1 位），DAY_WORDS 个 64 位整数
+- slots：每个业务日 96 位（第 d 天第 s 个时段为第 d*96+s 位），SLOT_WORDS 个 64 位整数
+
+位按从低到高排列在 int64 数组中，写入时用 $bit 按字做按位或：不同进程并发登记同一电表也不会丢位。
+业务日口径与负荷曲线一致：业务日 D 的数据落在 (D 00:00, D+1 00:00] 区间内，时段按结束时刻向上取整到 15 分钟。
+
+维护方式：
+- 写入负荷数据后调用 record() 登记（只置位，不读取原始数据）
+- 删除负荷数据后执行 scripts/build_meter_availability.py 重建
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from bson import Int64
+from pymongo import ASCENDING
+
+from webapp.tools.mongo import ANALYTICS_DATABASE, DATABASE
+
+AVAILABILITY_COLLECTION = 'meter_availability'
+LOAD_COLLECTION = 'user_load_data'
+SLOTS_PER_DAY = 96
+DAY_BITS = 366
+DAY_WORDS = (DAY_BITS + 63) // 64
+SLOT_WORDS = (DAY_BITS * SLOTS_PER_DAY + 63) // 64
+
+_SLOT_SECONDS = 15 * 60
+
+
+def _to_int64(word: int) -> Int64:
+    """无符号 64 位字 -> Mongo 的有符号 int64"""
+    return Int64(word - (1 << 64) if word >= (1 << 63) else word)
+
+
+def _bits(words: Sequence[int], size: int) -> np.ndarray:
+    """int64 数组 -> 长度 size 的 0/1 数组（低位在前）"""
+    raw = np.asarray(words, dtype='<i8').view(np.uint8)
+    return np.unpackbits(raw, bitorder='little')[:size]
+
+
+def slot_position(timestamp: datetime):
+    """时间戳 -> (业务日, 时段下标)，D+1 00:00 属于业务日 D 的最后一个时段"""
+    day = (timestamp - timedelta(microseconds=1)).date()
+    seconds = (timestamp - datetime.combine(day, datetime.min.time())).total_seconds()
+    return day, min(int(-(-seconds // _SLOT_SECONDS)) - 1, SLOTS_PER_DAY - 1)
+
+
+def _words(timestamps: Iterable[datetime]) -> Dict[int, Dict[str, Dict[int, int]]]:
+    """按年份汇总需要置位的字：{year: {'days': {字下标: 位}, 'slots': {字下标: 位}}}"""
+    result: Dict[int, Dict[str, Dict[int, int]]] = defaultdict(lambda: {'days': defaultdict(int),
+                                                                          'slots': defaultdict(int)})
+    for timestamp in timestamps:
+        day, slot = slot_position(timestamp)
+        words = result[day.year]
+        day_bit = day.timetuple().tm_yday - 1
+        slot_bit = day_bit * SLOTS_PER_DAY + slot
+        words['days'][day_bit // 64] |= 1 << (day_bit % 64)
+        words['slots'][slot_bit // 64] |= 1 << (slot_bit % 64)
+    return result
+
+
+class MeterAvailability:
+    """电表数据可用性位图的维护与批量查询"""
+
+    def __init__(self, db, read_db=None):
+        self.db = db
+        self.read_db = read_db if read_db is not None else db
+        self.collection = self.db[AVAILABILITY_COLLECTION]
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def _ensure_doc(self, meter_id: str, year: int) -> None:
+        self.collection.update_one(
+            {'meter_id': meter_id, 'year': year},
+            {'$setOnInsert': {'days': [Int64(0)] * DAY_WORDS, 'slots': [Int64(0)] * SLOT_WORDS}},
+            upsert=True)
+
+    def record(self, meter_id: str, timestamps: Iterable[datetime]) -> None:
+        """
+        写入负荷数据后登记（可重复调用）
+
+        Args:
+            meter_id: 电表ID
+            timestamps: 本次写入的时间戳
+        """
+        for year, words in _words(timestamps).items():
+            self._ensure_doc(meter_id, year)
+            bits = {f'{field}.{index}': {'or': _to_int64(word)}
+                    for field in ('days', 'slots') for index, word in words[field].items()}
+            self.collection.update_one({'meter_id': meter_id, 'year': year},
+                                       {'$bit': bits, '$set': {'updated_at': datetime.utcnow()}})
+
+    def rebuild(self, meter_ids: Optional[Sequence[str]] = None) -> int:
+        """
+        由原始负荷数据全量重建位图（删除数据后使用）
+
+        Args:
+            meter_ids: 只重建指定电表，默认全部
+
+        Returns:
+            写入的文档数
+        """
+        query = {'meter_id': {'$in': list(meter_ids)}} if meter_ids else {}
+        # 从主库读取：replace_one 覆盖整张位图，从库复制延迟造成的缺位不会再被 $bit 补上
+        cursor = self.db[LOAD_COLLECTION].find(query, {'_id': 0, 'meter_id': 1, 'timestamp': 1}).sort(
+            [('meter_id', ASCENDING), ('timestamp', ASCENDING)])
+
+        written = 0
+        current, timestamps = None, []
+
+        def flush(meter_id, points):
+            docs = []
+            for year, words in _words(points).items():
+                days, slots = [0] * DAY_WORDS, [0] * SLOT_WORDS
+                for index, word in words['days'].items():
+                    days[index] = word
+                for index, word in words['slots'].items():
+                    slots[index] = word
+                docs.append({'meter_id': meter_id, 'year': year, 'days': [_to_int64(w) for w in days],
+                             'slots': [_to_int64(w) for w in slots], 'updated_at': datetime.utcnow()})
+            self.collection.delete_many({'meter_id': meter_id, 'year': {'$nin': [doc['year'] for doc in docs]}})
+            for doc in docs:
+                self.collection.replace_one({'meter_id': meter_id, 'year': doc['year']}, doc, upsert=True)
+            return len(docs)
+
+        seen = set()
+        for doc in cursor:
+            if doc['meter_id'] != current:
+                if current is not None:
+                    written += flush(current, timestamps)
+                    seen.add(current)
+                current, timestamps = doc['meter_id'], []
+            timestamps.append(doc['timestamp'])
+        if current is not None:
+            written += flush(current, timestamps)
+            seen.add(current)
+
+        # 已无负荷数据的电表删除位图
+        stale = {'meter_id': {'$nin': list(seen)}}
+        if meter_ids:
+            stale = {'meter_id': {'$in': [meter_id for meter_id in meter_ids if meter_id not in seen]}}
+        self.collection.delete_many(stale)
+        return written
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def slot_count(self, meter_id: str) -> int:
+        """电表全部年份已登记的时段数（位图 popcount），写入后读取，因此走主库"""
+        total = 0
+        for doc in self.collection.find({'meter_id': meter_id}, {'_id': 0, 'slots': 1}):
+            total += int(_bits(doc['slots'], DAY_BITS * SLOTS_PER_DAY).sum())
+        return total
+
+    def query(self, meter_ids: Sequence[str], start: date, end: date, slots: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        批量查询电表在业务日区间（含首尾）内的数据可用性（一次查询）
+
+        Args:
+            meter_ids: 电表ID列表
+            start / end: 业务日
+            slots: 是否返回每天存在数据的时段数（数据完整性）
+
+        Returns:
+            {meter_id: {'days': '0/1 字符串，每个业务日一位', 'count': 有数据的天数[, 'slot_counts': [每天时段数]]}}
+        """
+        total_days = (end - start).days + 1
+        years = list(range(start.year, end.year + 1))
+        projection = {'_id': 0, 'meter_id': 1, 'year': 1, 'days': 1, **({'slots': 1} if slots else {})}
+        stored: Dict[str, Dict[int, Dict[str, Any]]] = defaultdict(dict)
+        for doc in self.read_db[AVAILABILITY_COLLECTION].find(
+                {'meter_id': {'$in': list(meter_ids)}, 'year': {'$in': years}}, projection):
+            stored[doc['meter_id']][doc['year']] = doc
+
+        # 区间按年份切分：(年份, 当年第一天下标, 天数)
+        pieces = []
+        cursor = start
+        while cursor <= end:
+            year_end = min(end, date(cursor.year, 12, 31))
+            pieces.append((cursor.year, cursor.timetuple().tm_yday - 1, (year_end - cursor).days + 1))
+            cursor = year_end + timedelta(days=1)
+
+        result = {}
+        for meter_id in meter_ids:
+            day_bits: List[np.ndarray] = []
+            slot_counts: List[np.ndarray] = []
+            for year, offset, length in pieces:
+                doc = stored.get(meter_id, {}).get(year)
+                if doc is None:
+                    day_bits.append(np.zeros(length, dtype=np.uint8))
+                    if slots:
+                        slot_counts.append(np.zeros(length, dtype=np.int64))
+                    continue
+                day_bits.append(_bits(doc['days'], DAY_BITS)[offset:offset + length])
+                if slots:
+                    counts = _bits(doc['slots'], DAY_BITS * SLOTS_PER_DAY).reshape(DAY_BITS, SLOTS_PER_DAY).sum(axis=1)
+                    slot_counts.append(counts[offset:offset + length])
+            bits = np.concatenate(day_bits) if day_bits else np.zeros(total_days, dtype=np.uint8)
+            entry = {'days': ''.join(map(str, bits.tolist())), 'count': int(bits.sum())}
+            if slots:
+                entry['slot_counts'] = np.concatenate(slot_counts).tolist()
+            result[meter_id] = entry
+        return result
+
+
+# 全局服务实例：位图写入及重建时的原始负荷读取走主库，批量查询走分析读偏好
+meter_availability = MeterAvailability(DATABASE, ANALYTICS_DATABASE)
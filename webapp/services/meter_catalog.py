@@ -0,0 +1,175 @@
+"""
+用户/电表目录（meter_catalog）
+
+每个电表一条文档，记录所属用户及负荷数据概况，替代用户列表、电表列表接口对整个 user_load_data
+做 $group / distinct（耗时随负荷数据年限线性增长）：
+    {meter_id, user_id, user_name, first, last, count, updated_at}
+- first / last：负荷数据的最早/最晚时间戳（$min / $max 登记，重复写入同一批数据不影响结果）
+- count：负荷数据点数（写入时取可用性位图中已置位的时段数，重建时按原始记录计数，
+  每个 15 分钟时段一条数据时两者一致；均为重新计算的结果，重复登记不会累加）
+
+维护方式：
+- 写入负荷数据后调用 record()（可重复调用）
+- 首次使用前执行 scripts/build_meter_catalog.py 建立目录；目录为空而负荷数据存在时，用户列表直接报错，
+  不在请求中重建
+- 查询只读：用户列表用索引（DISTINCT_SCAN）补上目录之外的新用户，电表列表用索引补上新电表、
+  并按索引首尾时间戳修正 first / last（与 meter_energy 的汇总范围检查相同），这些条目的 count 为 None，
+  执行 scripts/build_meter_catalog.py 后补齐
+- 删除负荷数据后查询结果同样按原始数据过滤，执行 scripts/build_meter_catalog.py 清理目录
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, ReplaceOne
+
+from webapp.tools.mongo import ANALYTICS_DATABASE, DATABASE
+
+METER_CATALOG_COLLECTION = 'meter_catalog'
+LOAD_COLLECTION = 'user_load_data'
+
+
+class MeterCatalogNotBuilt(RuntimeError):
+    """目录为空但负荷数据存在（需执行 scripts/build_meter_catalog.py）"""
+
+
+class MeterCatalog:
+    """用户/电表目录的维护与查询"""
+
+    def __init__(self, db, read_db=None):
+        self.db = db
+        self.read_db = read_db if read_db is not None else db
+        self.collection = self.db[METER_CATALOG_COLLECTION]
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def record(self, meter_id: str, user_id: str, user_name: str, timestamps: Iterable[datetime],
+               count: Optional[int] = None) -> None:
+        """
+        写入一批负荷数据后登记（可重复调用）
+
+        Args:
+            meter_id: 电表ID
+            user_id / user_name: 所属用户
+            timestamps: 本批写入的时间戳
+            count: 电表当前的负荷数据点数（如 meter_availability.slot_count()），直接覆盖
+        """
+        timestamps = list(timestamps)
+        if not timestamps:
+            return
+        fields: Dict[str, Any] = {'user_id': user_id, 'user_name': user_name, 'updated_at': datetime.utcnow()}
+        if count is not None:
+            fields['count'] = int(count)
+        self.collection.update_one(
+            {'meter_id': meter_id},
+            {'$set': fields, '$min': {'first': min(timestamps)}, '$max': {'last': max(timestamps)}},
+            upsert=True)
+
+    def rebuild(self, user_id: Optional[str] = None) -> int:
+        """
+        从原始负荷数据重建目录
+
+        Args:
+            user_id: 只重建指定用户的电表，默认全部
+
+        Returns:
+            写入的目录条数
+        """
+        match = {'user_id': user_id} if user_id is not None else {}
+        pipeline = [
+            {'$match': match},
+            {'$group': {'_id': '$meter_id', 'user_id': {'$first': '$user_id'}, 'user_name': {'$first': '$user_name'},
+                        'first': {'$min': '$timestamp'}, 'last': {'$max': '$timestamp'}, 'count': {'$sum': 1}}},
+        ]
+        now = datetime.utcnow()
+        operations, meter_ids = [], []
+        # 从主库读取，避免把从库复制延迟造成的残缺首尾时间戳保存为目录
+        for doc in self.db[LOAD_COLLECTION].aggregate(pipeline, allowDiskUse=True):
+            if doc['_id'] is None:
+                continue
+            meter_ids.append(doc['_id'])
+            operations.append(ReplaceOne({'meter_id': doc['_id']}, {
+                'meter_id': doc['_id'], 'user_id': doc['user_id'], 'user_name': doc['user_name'],
+                'first': doc['first'], 'last': doc['last'], 'count': doc['count'], 'updated_at': now}, upsert=True))
+
+        # 已无数据的电表删除目录
+        stale: Dict[str, Any] = {'meter_id': {'$nin': meter_ids}}
+        if user_id is not None:
+            stale['user_id'] = user_id
+        self.collection.delete_many(stale)
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    def clear(self) -> None:
+        """删除全部目录（清空负荷数据时调用）"""
+        self.collection.delete_many({})
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def get_users(self) -> List[Dict[str, Any]]:
+        """用户列表 [{'user_id', 'user_name'}]，按用户名排序"""
+        cursor = self.collection.find({}, {'_id': 0, 'user_id': 1, 'user_name': 1}).sort(
+            [('user_name', ASCENDING), ('user_id', ASCENDING)])
+        users, seen = [], set()
+        for doc in cursor:
+            if doc.get('user_id') in seen:
+                continue
+            seen.add(doc.get('user_id'))
+            users.append({'user_id': doc.get('user_id'), 'user_name': doc.get('user_name')})
+
+        raw = self.read_db[LOAD_COLLECTION]
+        if not users:
+            if raw.find_one({}, {'_id': 1}) is not None:
+                raise MeterCatalogNotBuilt('用户/电表目录尚未建立，请先执行 python scripts/build_meter_catalog.py')
+            return users
+
+        # 与原始数据对齐：idx_user_meter 上的 DISTINCT_SCAN，补上目录之外的新用户（外部导入）、
+        # 去掉负荷数据已删除的用户，只读不写回
+        present = {user_id for user_id in raw.distinct('user_id') if user_id is not None}
+        users = [user for user in users if user['user_id'] in present]
+        missing = sorted(present - seen)
+        if missing:
+            for user_id in missing:
+                doc = raw.find_one({'user_id': user_id}, {'_id': 0, 'user_name': 1})
+                users.append({'user_id': user_id, 'user_name': (doc or {}).get('user_name')})
+            users.sort(key=lambda user: (user['user_name'] is not None, user['user_name'] or '', user['user_id']))
+        return users
+
+    def get_meters(self, user_id: str) -> List[Dict[str, Any]]:
+        """用户的电表列表 [{'meter_id', 'first', 'last', 'count'}]，按电表ID排序"""
+        projection = {'_id': 0, 'meter_id': 1, 'first': 1, 'last': 1, 'count': 1}
+        meters = {doc['meter_id']: doc for doc in self.collection.find({'user_id': user_id}, projection)}
+
+        # 新电表和目录登记之后追加的数据：按索引取首尾时间戳在内存中修正，只读不写回
+        raw = self.read_db[LOAD_COLLECTION]
+        meter_ids = set(meters) | {meter_id for meter_id in raw.distinct('meter_id', {'user_id': user_id})
+                                   if meter_id is not None}
+        result = []
+        for meter_id in sorted(meter_ids):
+            first, last = self._raw_bounds(raw, meter_id)
+            entry = meters.get(meter_id)
+            if first is None:
+                # 原始数据已删除但尚未重建目录
+                continue
+            if entry is None or entry.get('first') != first or entry.get('last') != last:
+                entry = {'meter_id': meter_id, 'first': first, 'last': last, 'count': None}
+            result.append(entry)
+        return result
+
+    @staticmethod
+    def _raw_bounds(source, meter_id: str):
+        """用索引取电表原始负荷数据的最早/最晚时间戳"""
+        bounds = []
+        for direction in (ASCENDING, DESCENDING):
+            doc = source.find_one({'meter_id': meter_id}, {'timestamp': 1, '_id': 0}, sort=[('timestamp', direction)])
+            bounds.append(doc.get('timestamp') if doc else None)
+        return bounds
+
+
+# 全局服务实例：目录写入及重建时的原始数据读取走主库，请求中的索引检查走分析读偏好
+meter_catalog = MeterCatalog(DATABASE, ANALYTICS_DATABASE)
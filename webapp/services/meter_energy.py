@@ -0,0 +1,353 @@
+"""
+电表日电量汇总（meter_daily_energy）
+
+每个电表每个业务日一条文档，替代日电量接口每次对整月 15 分钟负荷做 $group：
+- energy / count：日电量（load_value 之和，kWh）和点数
+- peak / peak_time、min / min_time：15 分钟电量的最大/最小值及其时刻（"00:15".."24:00"）
+- periods：按当日生效分时规则拆分的尖峰/高峰/平段/低谷/深谷电量
+- first / last：参与汇总的最早/最晚时间戳；tou：分时时段表摘要；version：汇总结构版本
+
+业务日口径与负荷曲线一致：业务日 D 的数据落在 (D 00:00, D+1 00:00] 区间内。
+
+维护方式：
+- 写入负荷数据后调用 record()，重算涉及的业务日；汇总只由 record() / sync() / rebuild() 写入，
+  计算时从主库读取原始数据，避免把从库复制延迟造成的残缺业务日保存为汇总
+- 读取（daily / monthly）不写库：与 market_summary.range_summaries 相同，用索引取电表原始数据的首尾时间戳
+  与汇总比对，超出汇总范围的新数据、结构版本或分时时段表摘要不一致的业务日当场计算后返回
+- 外部导入、分时规则调整后执行 scripts/build_meter_energy.py --sync 增量保存；
+  区间内补录或删除数据后执行 scripts/build_meter_energy.py 重建
+"""
+
+import calendar
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from pymongo import ASCENDING, DESCENDING, ReplaceOne
+
+from webapp.services.price_cube import SLOT_TIME_STRS
+from webapp.services.tou_aggregation import PERIOD_ORDER, period_stats
+from webapp.services.tou_service import TouService, tou_service
+from webapp.tools.mongo import ANALYTICS_DATABASE, DATABASE
+
+ROLLUP_COLLECTION = 'meter_daily_energy'
+LOAD_COLLECTION = 'user_load_data'
+# 每次从原始数据加载的最大业务日数
+BUILD_BATCH_DAYS = 366
+# 汇总结构版本
+ROLLUP_VERSION = 1
+
+_SLOT_SECONDS = 15 * 60
+
+
+def _day_start(day: str) -> datetime:
+    return datetime.strptime(day, '%Y-%m-%d')
+
+
+def business_day(timestamp: datetime) -> str:
+    """时间戳所属业务日（D+1 00:00 属于 D）"""
+    return (timestamp - timedelta(microseconds=1)).strftime('%Y-%m-%d')
+
+
+def _month_range(month: str) -> tuple:
+    """月份 YYYY-MM -> (首日, 末日)"""
+    year, mon = map(int, month.split('-'))
+    return f'{month}-01', f'{month}-{calendar.monthrange(year, mon)[1]:02d}'
+
+
+def _day_range(first: str, last: str) -> List[str]:
+    start = _day_start(first)
+    return [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range((_day_start(last) - start).days + 1)]
+
+
+class MeterEnergyService:
+    """电表日电量汇总的构建与读取"""
+
+    def __init__(self, db, read_db=None, tou: Optional[TouService] = None):
+        self.db = db
+        self.read_db = read_db if read_db is not None else db
+        self.collection = self.db[ROLLUP_COLLECTION]
+        self.tou = tou if tou is not None else TouService(self.read_db)
+
+    # ------------------------------------------------------------------
+    # 构建
+    # ------------------------------------------------------------------
+
+    def _load(self, source, meter_id: str, dates: Sequence[str]):
+        """
+        加载电表连续业务日的原始负荷
+
+        Args:
+            source: 读取原始数据的数据库（保存汇总时为主库，读取时当场计算为分析读偏好）
+
+        Returns:
+            (energy, count, first, last)：energy / count 形状 (天数, 96)，无数据的时段 energy 为 NaN；
+            first / last 为每天最早/最晚时间戳的列表
+        """
+        origin = _day_start(dates[0])
+        cursor = source[LOAD_COLLECTION].find(
+            {'meter_id': meter_id, 'timestamp': {'$gt': origin, '$lte': _day_start(dates[-1]) + timedelta(days=1)}},
+            {'_id': 0, 'timestamp': 1, 'load_value': 1})
+        timestamps, values = [], []
+        for doc in cursor:
+            timestamps.append(doc['timestamp'])
+            values.append(doc.get('load_value'))
+
+        energy = np.zeros(len(dates) * 96)
+        count = np.zeros(len(dates) * 96, dtype=np.int64)
+        first: List[Optional[datetime]] = [None] * len(dates)
+        last: List[Optional[datetime]] = [None] * len(dates)
+        if timestamps:
+            # 时段结束时刻向上取整到 15 分钟，(D 00:00, D 00:15] 为业务日 D 的第 0 个时段
+            seconds = np.array([(ts - origin).total_seconds() for ts in timestamps])
+            slots = np.ceil(seconds / _SLOT_SECONDS).astype(np.int64) - 1
+            loads = np.array([np.nan if value is None else value for value in values], dtype=float)
+            valid = ~np.isnan(loads)
+            np.add.at(energy, slots[valid], loads[valid])
+            np.add.at(count, slots[valid], 1)
+            for ts, slot in zip(timestamps, (slots // 96).tolist()):
+                if first[slot] is None or ts < first[slot]:
+                    first[slot] = ts
+                if last[slot] is None or ts > last[slot]:
+                    last[slot] = ts
+        energy = np.where(count > 0, energy, np.nan).reshape(len(dates), 96)
+        return energy, count.reshape(len(dates), 96), first, last
+
+    def _rollups(self, source, meter_id: str, dates: Sequence[str]) -> List[Dict[str, Any]]:
+        """计算连续业务日的汇总文档（没有数据的业务日省略）"""
+        energy, count, first, last = self._load(source, meter_id, dates)
+        by_period = period_stats(energy, self.tou.period_matrix(dates))
+        signatures = self.tou.signatures(dates)
+        daily = np.nansum(energy, axis=1).tolist()
+        points = count.sum(axis=1).tolist()
+        present = ~np.isnan(energy)
+        peak_slots = np.where(present, energy, -np.inf).argmax(axis=1).tolist()
+        min_slots = np.where(present, energy, np.inf).argmin(axis=1).tolist()
+        rows = energy.tolist()
+        period_energy = {name: np.where(stats['count'] > 0, stats['sum'], np.nan).tolist()
+                         for name, stats in by_period.items()}
+
+        now = datetime.utcnow()
+        docs = []
+        for i, day in enumerate(dates):
+            if not points[i]:
+                continue
+            peak_slot, min_slot = peak_slots[i], min_slots[i]
+            docs.append({
+                'meter_id': meter_id, 'date_str': day, 'month': day[:7],
+                'energy': daily[i], 'count': points[i],
+                'peak': rows[i][peak_slot], 'peak_time': SLOT_TIME_STRS[peak_slot],
+                'min': rows[i][min_slot], 'min_time': SLOT_TIME_STRS[min_slot],
+                # 排除当日没有数据的时段（NaN）
+                'periods': {name: period_energy[name][i] for name in PERIOD_ORDER
+                            if period_energy[name][i] == period_energy[name][i]},
+                'first': first[i], 'last': last[i],
+                'tou': signatures[i], 'version': ROLLUP_VERSION, 'updated_at': now,
+            })
+        return docs
+
+    def refresh(self, meter_id: str, first: str, last: str) -> int:
+        """
+        重算电表业务日区间（含首尾）的汇总，区间内已无数据的业务日删除汇总
+
+        Returns:
+            写入的汇总条数
+        """
+        written = 0
+        dates = _day_range(first, last)
+        for begin in range(0, len(dates), BUILD_BATCH_DAYS):
+            batch = dates[begin:begin + BUILD_BATCH_DAYS]
+            docs = self._rollups(self.db, meter_id, batch)
+            self.collection.delete_many({'meter_id': meter_id, 'date_str': {
+                '$gte': batch[0], '$lte': batch[-1], '$nin': [doc['date_str'] for doc in docs]}})
+            if docs:
+                self.collection.bulk_write([ReplaceOne({'meter_id': meter_id, 'date_str': doc['date_str']}, doc,
+                                                       upsert=True) for doc in docs], ordered=False)
+                written += len(docs)
+        return written
+
+    def record(self, meter_id: str, timestamps: Iterable[datetime]) -> int:
+        """
+        写入负荷数据后重算涉及的业务日（可重复调用）
+
+        Args:
+            meter_id: 电表ID
+            timestamps: 本次写入的时间戳
+        """
+        days = sorted({business_day(ts) for ts in timestamps})
+        if not days:
+            return 0
+        return self.refresh(meter_id, days[0], days[-1])
+
+    def rebuild(self, meter_id: str, start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """
+        全量重建电表的汇总（区间内补录或删除数据后使用）
+
+        Args:
+            meter_id: 电表ID
+            start / end: 只重建该业务日区间（含首尾），默认按原始数据的首尾
+        """
+        raw_first, raw_last = self._raw_bounds(self.db, meter_id)
+        if raw_first is None:
+            query: Dict[str, Any] = {'meter_id': meter_id}
+            if start or end:
+                query['date_str'] = {**({'$gte': start} if start else {}), **({'$lte': end} if end else {})}
+            self.collection.delete_many(query)
+            return 0
+        # 已有汇总超出原始数据范围的部分一并重算（即删除）
+        head, tail = self._rollup_edge(meter_id, ASCENDING), self._rollup_edge(meter_id, DESCENDING)
+        first = start or min([business_day(raw_first)] + ([head['date_str']] if head else []))
+        last = end or max([business_day(raw_last)] + ([tail['date_str']] if tail else []))
+        return self.refresh(meter_id, first, last)
+
+    def sync(self, meter_id: str) -> int:
+        """
+        增量保存：补入汇总范围之外新增的原始数据，重算结构版本或分时时段表变化的业务日
+
+        Returns:
+            写入的汇总条数
+        """
+        written = 0
+        for first, last in self._pending(self.db, meter_id):
+            written += self.refresh(meter_id, first, last)
+        stale = self._stale(list(self.collection.find({'meter_id': meter_id}, {'_id': 0, 'date_str': 1, 'version': 1,
+                                                                                'tou': 1}).sort('date_str', 1)))
+        for begin in range(0, len(stale), BUILD_BATCH_DAYS):
+            batch = stale[begin:begin + BUILD_BATCH_DAYS]
+            written += self.refresh(meter_id, batch[0], batch[-1])
+        return written
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _raw_bounds(source, meter_id: str):
+        """用索引取电表原始负荷数据的最早/最晚时间戳"""
+        bounds = []
+        for direction in (ASCENDING, DESCENDING):
+            doc = source[LOAD_COLLECTION].find_one({'meter_id': meter_id}, {'timestamp': 1, '_id': 0},
+                                                   sort=[('timestamp', direction)])
+            bounds.append(doc.get('timestamp') if doc else None)
+        return bounds
+
+    def _rollup_edge(self, meter_id: str, direction: int) -> Optional[Dict[str, Any]]:
+        return self.collection.find_one({'meter_id': meter_id}, {'_id': 0, 'date_str': 1, 'first': 1, 'last': 1},
+                                        sort=[('date_str', direction)])
+
+    def _pending(self, source, meter_id: str) -> List[tuple]:
+        """汇总范围之外新增原始数据所在的业务日区间 [(first, last)]（含首尾）"""
+        raw_first, raw_last = self._raw_bounds(source, meter_id)
+        if raw_last is None:
+            return []
+        head = self._rollup_edge(meter_id, ASCENDING)
+        tail = self._rollup_edge(meter_id, DESCENDING)
+        if head is None or tail is None:
+            return [(business_day(raw_first), business_day(raw_last))]
+        ranges = []
+        if raw_first < head['first']:
+            ranges.append((business_day(raw_first), head['date_str']))
+        if raw_last > tail['last']:
+            ranges.append((tail['date_str'], business_day(raw_last)))
+        return ranges
+
+    def _stale(self, docs: Sequence[Dict[str, Any]]) -> List[str]:
+        """结构版本或分时时段表摘要与当前不一致的业务日"""
+        signatures = self.tou.signatures([doc['date_str'] for doc in docs])
+        return [doc['date_str'] for doc, signature in zip(docs, signatures)
+                if doc.get('version') != ROLLUP_VERSION or doc.get('tou') != signature]
+
+    def daily(self, meter_id: str, start: str, end: str) -> List[Dict[str, Any]]:
+        """
+        电表业务日区间（含首尾）的日汇总（只读：汇总缺失或过期的业务日当场计算，不保存）
+
+        Args:
+            meter_id: 电表ID
+            start / end: 业务日 YYYY-MM-DD
+
+        Returns:
+            按日期升序的汇总文档（没有数据的业务日省略）
+        """
+        return self.daily_ranges(meter_id, [(start, end)])
+
+    def daily_ranges(self, meter_id: str, ranges: Sequence[tuple]) -> List[Dict[str, Any]]:
+        """
+        电表多个业务日区间的日汇总，一次查询；不相邻的区间之间的业务日不读取也不计算
+
+        Args:
+            meter_id: 电表ID
+            ranges: [(start, end)] 业务日区间（含首尾），可重叠、无序
+
+        Returns:
+            按日期升序的汇总文档（没有数据的业务日省略）
+        """
+        merged: List[List[str]] = []
+        for first, last in sorted(ranges):
+            if merged and _day_start(first) <= _day_start(merged[-1][1]) + timedelta(days=1):
+                merged[-1][1] = max(merged[-1][1], last)
+            else:
+                merged.append([first, last])
+        if not merged:
+            return []
+        windows = [{'date_str': {'$gte': first, '$lte': last}} for first, last in merged]
+        query = {'meter_id': meter_id, **(windows[0] if len(windows) == 1 else {'$or': windows})}
+        docs = {doc['date_str']: doc for doc in self.collection.find(query, {'_id': 0, 'updated_at': 0})}
+
+        # 需要当场计算的业务日：汇总范围之外的新数据 + 过期汇总，只计算查询区间内的部分
+        recompute = set(self._stale(sorted(docs.values(), key=lambda doc: doc['date_str'])))
+        for pending_first, pending_last in self._pending(self.read_db, meter_id):
+            for first, last in merged:
+                first, last = max(first, pending_first), min(last, pending_last)
+                if first <= last:
+                    recompute.update(_day_range(first, last))
+        if recompute:
+            computed = {}
+            # 按连续的业务日分段加载原始数据
+            runs: List[List[str]] = []
+            for day in sorted(recompute):
+                if runs and _day_start(day) == _day_start(runs[-1][-1]) + timedelta(days=1):
+                    runs[-1].append(day)
+                else:
+                    runs.append([day])
+            for run in runs:
+                for begin in range(0, len(run), BUILD_BATCH_DAYS):
+                    for doc in self._rollups(self.read_db, meter_id, run[begin:begin + BUILD_BATCH_DAYS]):
+                        doc.pop('updated_at')
+                        computed[doc['date_str']] = doc
+            for day in recompute:
+                if day in computed:
+                    docs[day] = computed[day]
+                else:
+                    docs.pop(day, None)
+        return [docs[day] for day in sorted(docs)]
+
+    def monthly(self, meter_id: str, months: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        电表月度电量（由日汇总相加）
+
+        Args:
+            meter_id: 电表ID
+            months: 月份列表 YYYY-MM
+
+        Returns:
+            {month: {'energy', 'days', 'peak', 'peak_date', 'peak_time', 'periods'}}，没有数据的月份为 None
+        """
+        result: Dict[str, Optional[Dict[str, Any]]] = {month: None for month in months}
+        for doc in self.daily_ranges(meter_id, [_month_range(month) for month in result]):
+            if doc['month'] not in result:
+                continue
+            total = result[doc['month']]
+            if total is None:
+                total = result[doc['month']] = {'energy': 0.0, 'days': 0, 'peak': None, 'peak_date': None,
+                                                'peak_time': None, 'periods': {}}
+            total['energy'] += doc['energy']
+            total['days'] += 1
+            if total['peak'] is None or doc['peak'] > total['peak']:
+                total.update(peak=doc['peak'], peak_date=doc['date_str'], peak_time=doc['peak_time'])
+            for name, value in doc.get('periods', {}).items():
+                total['periods'][name] = total['periods'].get(name, 0.0) + value
+        return result
+
+
+# 全局服务实例：汇总及保存汇总时的原始负荷读取走主库，读取时当场计算走分析读偏好
+meter_energy_service = MeterEnergyService(DATABASE, ANALYTICS_DATABASE, tou=tou_service)
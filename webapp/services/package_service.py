@@ -1,6 +1,6 @@
 from bson import ObjectId
 from pymongo.errors import DuplicateKeyError
-from webapp.tools.mongo import DATABASE
+from webapp.tools.mongo import ASYNC_DATABASE
 from webapp.models.retail_package import RetailPackage, RetailPackageListItem, ValidationResult
 from datetime import datetime
 
@@ -22,7 +22,7 @@ class PackageService:
         self.db = db
         self.collection = self.db.retail_packages
 
-    def create_package(self, package_data: dict, operator: str, status: str = "draft") -> dict:
+    async def create_package(self, package_data: dict, operator: str, status: str = "draft") -> dict:
         """
         创建新的零售套餐
 
@@ -46,7 +46,9 @@ class PackageService:
         if package.model_code and package.pricing_config:
             from webapp.services.pricing_model_service import pricing_model_service
 
-            validation_result = pricing_model_service.validate_pricing_config(
+            model = await self.db.pricing_models.find_one({"model_code": package.model_code})
+            validation_result = pricing_model_service.validate_config_for_model(
+                model=model,
                 model_code=package.model_code,
                 config=package.pricing_config
             )
@@ -70,7 +72,7 @@ class PackageService:
 
         # 尝试插入，捕获名称重复错误
         try:
-            insert_result = self.collection.insert_one(doc_to_insert)
+            insert_result = await self.collection.insert_one(doc_to_insert)
         except DuplicateKeyError:
             raise ValueError(f"套餐名称已存在: {package.package_name}")
 
@@ -81,7 +83,7 @@ class PackageService:
             "created_at": package.created_at.isoformat()
         }
 
-    def list_packages(self, filters: dict, page: int, page_size: int) -> dict:
+    async def list_packages(self, filters: dict, page: int, page_size: int) -> dict:
         """
         Retrieves a paginated list of retail packages.
         """
@@ -102,14 +104,14 @@ class PackageService:
         if filters.get("status"):
             query["status"] = filters["status"]
 
-        total = self.collection.count_documents(query)
+        total = await self.collection.count_documents(query)
 
         cursor = self.collection.find(query).skip((page - 1) * page_size).limit(page_size)
 
         items = []
-        for doc in cursor:
+        async for doc in cursor:
             # 统计该套餐的合同数
-            contract_count = self.db.retail_contracts.count_documents({
+            contract_count = await self.db.retail_contracts.count_documents({
                 "package_id": str(doc["_id"])
             })
 
@@ -140,7 +142,7 @@ class PackageService:
             "items": items
         }
 
-    def change_status(self, package_id: str, new_status: str, operator: str) -> dict:
+    async def change_status(self, package_id: str, new_status: str, operator: str) -> dict:
         """
         变更套餐状态
 
@@ -157,7 +159,7 @@ class PackageService:
         """
         # 1. 获取当前套餐
         try:
-            existing_doc = self.collection.find_one({"_id": ObjectId(package_id)})
+            existing_doc = await self.collection.find_one({"_id": ObjectId(package_id)})
         except Exception as e:
             raise ValueError(f"无效的套餐ID: {package_id}")
 
@@ -188,7 +190,7 @@ class PackageService:
             update_fields["archived_at"] = datetime.utcnow()
 
         # 4. 执行更新
-        result = self.collection.update_one(
+        result = await self.collection.update_one(
             {"_id": ObjectId(package_id)},
             {"$set": update_fields}
         )
@@ -207,7 +209,7 @@ class PackageService:
             ).isoformat()
         }
 
-    def get_package_by_id(self, package_id: str) -> dict:
+    async def get_package_by_id(self, package_id: str) -> dict:
         """
         根据ID获取套餐详情
 
@@ -221,7 +223,7 @@ class PackageService:
             ValueError: 套餐不存在或ID无效
         """
         try:
-            doc = self.collection.find_one({"_id": ObjectId(package_id)})
+            doc = await self.collection.find_one({"_id": ObjectId(package_id)})
         except Exception as e:
             raise ValueError(f"无效的套餐ID: {package_id}")
 
@@ -229,7 +231,7 @@ class PackageService:
             raise ValueError(f"套餐不存在: {package_id}")
 
         # 统计该套餐的合同数
-        contract_count = self.db.retail_contracts.count_documents({
+        contract_count = await self.db.retail_contracts.count_documents({
             "package_id": package_id
         })
 
@@ -239,7 +241,7 @@ class PackageService:
         doc["contract_count"] = contract_count
         return doc
 
-    def update_package(self, package_id: str, package_data: dict, operator: str) -> dict:
+    async def update_package(self, package_id: str, package_data: dict, operator: str) -> dict:
         """
         更新套餐
 
@@ -256,7 +258,7 @@ class PackageService:
         """
         # 1. 检查套餐是否存在
         try:
-            existing_doc = self.collection.find_one({"_id": ObjectId(package_id)})
+            existing_doc = await self.collection.find_one({"_id": ObjectId(package_id)})
         except Exception as e:
             raise ValueError(f"无效的套餐ID: {package_id}")
 
@@ -270,7 +272,7 @@ class PackageService:
         # 3. 检查名称冲突（如果修改了名称）
         new_name = package_data.get("package_name")
         if new_name and new_name != existing_doc.get("package_name"):
-            existing_name = self.collection.find_one({
+            existing_name = await self.collection.find_one({
                 "package_name": new_name,
                 "_id": {"$ne": ObjectId(package_id)}
             })
@@ -288,7 +290,9 @@ class PackageService:
         if model_code and pricing_config:
             from webapp.services.pricing_model_service import pricing_model_service
 
-            validation_result = pricing_model_service.validate_pricing_config(
+            model = await self.db.pricing_models.find_one({"model_code": model_code})
+            validation_result = pricing_model_service.validate_config_for_model(
+                model=model,
                 model_code=model_code,
                 config=pricing_config
             )
@@ -310,7 +314,7 @@ class PackageService:
 
         # 6. 执行更新
         try:
-            result = self.collection.update_one(
+            result = await self.collection.update_one(
                 {"_id": ObjectId(package_id)},
                 {"$set": package_data}
             )
@@ -321,9 +325,9 @@ class PackageService:
             raise ValueError(f"更新失败: {package_id}")
 
         # 7. 返回更新后的数据
-        return self.get_package_by_id(package_id)
+        return await self.get_package_by_id(package_id)
 
-    def delete_package(self, package_id: str) -> None:
+    async def delete_package(self, package_id: str) -> None:
         """
         删除套餐（仅草稿状态）
 
@@ -335,7 +339,7 @@ class PackageService:
         """
         # 1. 检查套餐是否存在
         try:
-            existing_doc = self.collection.find_one({"_id": ObjectId(package_id)})
+            existing_doc = await self.collection.find_one({"_id": ObjectId(package_id)})
         except Exception as e:
             raise ValueError(f"无效的套餐ID: {package_id}")
 
@@ -347,12 +351,12 @@ class PackageService:
             raise ValueError("只有草稿状态的套餐才能被删除")
 
         # 3. 执行删除
-        result = self.collection.delete_one({"_id": ObjectId(package_id)})
+        result = await self.collection.delete_one({"_id": ObjectId(package_id)})
 
         if result.deleted_count == 0:
             raise ValueError(f"删除失败: {package_id}")
 
-    def copy_package(self, package_id: str, operator: str) -> dict:
+    async def copy_package(self, package_id: str, operator: str) -> dict:
         """
         复制套餐
 
@@ -368,7 +372,7 @@ class PackageService:
         """
         # 1. 获取原套餐
         try:
-            original_doc = self.collection.find_one({"_id": ObjectId(package_id)})
+            original_doc = await self.collection.find_one({"_id": ObjectId(package_id)})
         except Exception as e:
             raise ValueError(f"无效的套餐ID: {package_id}")
 
@@ -392,7 +396,7 @@ class PackageService:
 
         # 如果新名称也存在，追加数字后缀
         counter = 1
-        while self.collection.find_one({"package_name": new_name}):
+        while await self.collection.find_one({"package_name": new_name}):
             counter += 1
             new_name = f"{original_name}_副本{counter}"
 
@@ -402,8 +406,11 @@ class PackageService:
         new_package_data["status"] = "draft"
 
         # 5. 使用create_package方法创建新套餐
-        return self.create_package(
+        return await self.create_package(
             package_data=new_package_data,
             operator=operator,
             status="draft"
-        )
\ No newline at end of file
+        )
+
+# 全局服务实例
+package_service = PackageService(ASYNC_DATABASE)
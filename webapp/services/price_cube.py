@@ -0,0 +1,454 @@
+"""
+现货价格立方体（进程内列式缓存）
+
+把 day_ahead_spot_price / real_time_spot_price 两个集合加载为 NumPy 数组：
+    values[业务日, 时段(0..95), 字段]
+业务日按日历连续排列（缺失日、缺失时段为 NaN），因此日期区间查询就是数组切片，
+市场分析接口无需每次查询 Mongo 并逐点构造字典。
+
+- 懒加载：首次访问时全量加载
+- 增量刷新：距上次刷新超过 price_cube_refresh_seconds 秒时，重新拉取最近 price_cube_refresh_days 天
+  （覆盖新到的业务日以及实时数据的次日补齐/订正）
+- 更早历史数据被订正后调用 price_cube.invalidate() 触发全量重载
+
+逐时段滚动统计（slot_bands）：出清价格按业务日维护前缀和（点数、价格和、价格平方和），
+任意 N 天窗口的均值/标准差为两行相减，新业务日到达或最近几天订正时只需重算变化日之后的前缀；
+P10/P50/P90 分位数按窗口计算后缓存，窗口内数据未变化时直接复用。
+
+时段约定与原始数据一致：datetime 为时段结束时刻，time_str 为 "00:15".."24:00"，
+业务日 D 的 24:00 存为 D+1 00:00，对应时段下标 95。
+
+配置（~/.exds/config.ini 的 [MARKET] 节）：
+- price_cube: 是否启用，默认 true；关闭后相关接口回退到直接查询 Mongo
+- price_cube_refresh_seconds: 增量刷新间隔（秒），默认 60
+- price_cube_refresh_days: 增量刷新回看天数，默认 3
+"""
+
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from webapp.tools.mongo import ANALYTICS_DATABASE, get_config
+
+SLOTS_PER_DAY = 96
+SLOT_MINUTES = 15
+
+# 立方体的字段维度（顺序即最后一维的下标）
+PRICE_FIELDS = (
+    'avg_clearing_price',
+    'total_clearing_power',
+    'thermal_clearing_power',
+    'hydro_clearing_power',
+    'wind_clearing_power',
+    'solar_clearing_power',
+    'pumped_storage_clearing_power',
+    'battery_storage_clearing_power',
+)
+FIELD_INDEX = {name: i for i, name in enumerate(PRICE_FIELDS)}
+
+# 市场名称 -> 集合名称
+MARKET_COLLECTIONS = {
+    'day_ahead': 'day_ahead_spot_price',
+    'real_time': 'real_time_spot_price',
+}
+
+# 每个时段的业务时刻字符串，下标 0 为 "00:15"，下标 95 为 "24:00"
+SLOT_TIME_STRS = tuple(f"{m // 60:02d}:{m % 60:02d}" for m in range(SLOT_MINUTES, 1441, SLOT_MINUTES))
+_SLOT_BY_TIME_STR = {time_str: i for i, time_str in enumerate(SLOT_TIME_STRS)}
+
+# 滚动统计的分位数与缓存条数
+BAND_PERCENTILES = (10, 50, 90)
+BAND_CACHE_SIZE = 64
+
+_PROJECTION = {'_id': 0, 'datetime': 1, 'date_str': 1, 'time_str': 1, **{name: 1 for name in PRICE_FIELDS}}
+
+
+def slot_index(time_str: str) -> int:
+    """
+    业务时刻字符串对应的时段下标
+
+    Args:
+        time_str: "00:15".."24:00"
+
+    Returns:
+        0..95，无效时返回 -1
+    """
+    return _SLOT_BY_TIME_STR.get(time_str, -1)
+
+
+def _locate(doc: Dict[str, Any]) -> Optional[Tuple[date, int]]:
+    """文档所属的 (业务日, 时段下标)；优先使用 date_str/time_str，缺失时由 datetime（时段结束时刻）推算"""
+    date_str, time_str = doc.get('date_str'), doc.get('time_str')
+    if date_str and time_str in _SLOT_BY_TIME_STR:
+        try:
+            return datetime.strptime(date_str, '%Y-%m-%d').date(), _SLOT_BY_TIME_STR[time_str]
+        except ValueError:
+            pass
+    end_time = doc.get('datetime')
+    if not isinstance(end_time, datetime):
+        return None
+    slot_start = end_time - timedelta(minutes=SLOT_MINUTES)
+    return slot_start.date(), (slot_start.hour * 60 + slot_start.minute) // SLOT_MINUTES
+
+
+class _MarketCube:
+    """单个市场（日前或实时）的价格立方体"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.origin: Optional[date] = None
+        self.num_days = 0
+        self.values = np.full((0, SLOTS_PER_DAY, len(PRICE_FIELDS)), np.nan)
+        self.loaded = False
+        self.last_refresh = 0.0
+        # 滚动统计：prefix[k] 为前 k 个业务日出清价格的 (点数, 和, 平方和)，形状 (容量+1, 3, 96)
+        self.prefix: Optional[np.ndarray] = None
+        self.prefix_valid = 0
+        # 数据变更记录 [(版本号, 首个变化的业务日)]，用于判断缓存的窗口统计是否过期
+        self.revision = 0
+        self.changes: List[Tuple[int, date]] = []
+
+    def _day_offset(self, day: date) -> int:
+        return (day - self.origin).days
+
+    def _reserve(self, first: date, last: date):
+        """保证 [first, last] 业务日都落在数组范围内，必要时扩容（容量按倍数增长）"""
+        if self.origin is None:
+            self.origin = first
+        if first < self.origin:
+            shift = (self.origin - first).days
+            padding = np.full((shift,) + self.values.shape[1:], np.nan)
+            self.values = np.concatenate([padding, self.values])
+            self.origin = first
+            self.num_days += shift
+            self.prefix = None
+        needed = self._day_offset(last) + 1
+        if needed > len(self.values):
+            capacity = max(needed, len(self.values) * 2, 32)
+            grown = np.full((capacity,) + self.values.shape[1:], np.nan)
+            grown[:len(self.values)] = self.values
+            self.values = grown
+        self.num_days = max(self.num_days, needed)
+
+    def _load(self, query: Dict[str, Any], clear_from: Optional[date] = None) -> int:
+        """拉取文档写入立方体；clear_from 不为空时先清空该日及之后的数据（用于增量刷新时覆盖订正）"""
+        located, rows = [], []
+        for doc in self.collection.find(query, _PROJECTION):
+            position = _locate(doc)
+            if position is None:
+                continue
+            located.append(position)
+            rows.append([doc.get(name) for name in PRICE_FIELDS])
+
+        days = [day for day, _ in located]
+        touched = [day for day in (clear_from, min(days) if days else None) if day is not None]
+        before = None
+        if touched and self.origin is not None and self.num_days:
+            touched_from = min(touched)
+            before = self.span(touched_from, self.origin + timedelta(days=self.num_days - 1))
+
+        if clear_from is not None and self.origin is not None:
+            self.values[max(self._day_offset(clear_from), 0):] = np.nan
+        if located:
+            self._reserve(min(days), max(days))
+            day_offsets = np.fromiter((self._day_offset(day) for day in days), dtype=np.int64, count=len(days))
+            slots = np.fromiter((slot for _, slot in located), dtype=np.int64, count=len(located))
+            # None（字段缺失）转换为 NaN
+            self.values[day_offsets, slots] = np.array(rows, dtype=np.float64)
+
+        if before is not None:
+            self._record_change(touched_from, before)
+        elif located:
+            self._mark_changed(min(days))
+        return len(rows)
+
+    def _mark_changed(self, day: date):
+        self.revision += 1
+        self.changes = self.changes[-255:] + [(self.revision, day)]
+        if self.origin is not None:
+            self.prefix_valid = min(self.prefix_valid, max(self._day_offset(day), 0))
+
+    def _record_change(self, first: date, before: np.ndarray):
+        """比较 first 之后的数据与刷新前的快照，有变化时记录首个变化的业务日"""
+        after = self.span(first, self.origin + timedelta(days=self.num_days - 1))
+        if len(before) < len(after):
+            before = np.concatenate([before, np.full((len(after) - len(before),) + before.shape[1:], np.nan)])
+        same = (before[:len(after)] == after) | (np.isnan(before[:len(after)]) & np.isnan(after))
+        changed = np.flatnonzero(~same.all(axis=(1, 2)))
+        if len(changed):
+            self._mark_changed(first + timedelta(days=int(changed[0])))
+
+    def changed_since(self, revision: int, last: date) -> bool:
+        """版本 revision 之后，是否有业务日 last 及之前的数据发生变化"""
+        if revision >= self.revision:
+            return False
+        if not self.changes or self.changes[0][0] > revision + 1:
+            # 变更记录已被截断，无法判断
+            return True
+        return any(rev > revision and day <= last for rev, day in self.changes)
+
+    def _ensure_prefix(self):
+        """补齐滚动统计前缀和（只重算 prefix_valid 之后的业务日）"""
+        if self.prefix is None or len(self.prefix) < self.num_days + 1:
+            self.prefix = np.zeros((len(self.values) + 1, 3, SLOTS_PER_DAY))
+            self.prefix_valid = 0
+        if self.prefix_valid >= self.num_days:
+            return
+        block = self.values[self.prefix_valid:self.num_days, :, FIELD_INDEX['avg_clearing_price']]
+        valid = ~np.isnan(block)
+        prices = np.where(valid, block, 0.0)
+        increments = np.stack([valid.astype(np.float64), prices, prices * prices], axis=1)
+        self.prefix[self.prefix_valid + 1:self.num_days + 1] = (
+            self.prefix[self.prefix_valid] + np.cumsum(increments, axis=0))
+        self.prefix_valid = self.num_days
+
+    def window_moments(self, first: date, last: date) -> np.ndarray:
+        """[first, last] 业务日出清价格逐时段的 (点数, 和, 平方和)，形状 (3, 96)"""
+        if self.origin is None:
+            return np.zeros((3, SLOTS_PER_DAY))
+        self._ensure_prefix()
+        begin = min(max(self._day_offset(first), 0), self.num_days)
+        end = min(max(self._day_offset(last) + 1, 0), self.num_days)
+        if end <= begin:
+            return np.zeros((3, SLOTS_PER_DAY))
+        return self.prefix[end] - self.prefix[begin]
+
+    def ensure_fresh(self, refresh_seconds: float, refresh_days: int):
+        now = time.monotonic()
+        if not self.loaded:
+            self._load({})
+            self.loaded = True
+            self.last_refresh = now
+            return
+        if now - self.last_refresh < refresh_seconds:
+            return
+        self.last_refresh = now
+        if self.origin is None:
+            since = date.today() - timedelta(days=refresh_days)
+        else:
+            since = self.origin + timedelta(days=max(self.num_days - refresh_days, 0))
+        try:
+            # datetime 为时段结束时刻，业务日 since 的数据在 (since 00:00, ...] 区间
+            self._load({'datetime': {'$gt': datetime.combine(since, datetime.min.time())}}, clear_from=since)
+        except Exception as e:
+            # 刷新失败时继续使用已加载的数据，下个周期重试
+            print(f"价格立方体增量刷新失败（{self.collection.name}）: {e}")
+
+    def day(self, day: date) -> Optional[np.ndarray]:
+        if self.origin is None:
+            return None
+        offset = self._day_offset(day)
+        if offset < 0 or offset >= self.num_days:
+            return None
+        values = self.values[offset]
+        if np.isnan(values).all():
+            return None
+        return values.copy()
+
+    def span(self, first: date, last: date) -> np.ndarray:
+        """[first, last] 业务日的数据，形状 (天数, 96, 字段数)，范围外填 NaN"""
+        result = np.full(((last - first).days + 1, SLOTS_PER_DAY, len(PRICE_FIELDS)), np.nan)
+        if self.origin is None or last < first:
+            return result
+        begin = max(self._day_offset(first), 0)
+        end = min(self._day_offset(last) + 1, self.num_days)
+        if begin < end:
+            target = begin - self._day_offset(first)
+            result[target:target + end - begin] = self.values[begin:end]
+        return result
+
+
+def load_span(collection, first: date, last: date) -> np.ndarray:
+    """
+    直接从 Mongo 加载 [first, last] 业务日的数组（不经过进程内立方体，供离线任务或未启用立方体时使用）
+
+    Returns:
+        形状 (天数, 96, 字段数) 的数组
+    """
+    cube = _MarketCube(collection)
+    cube._load({'date_str': {'$gte': first.strftime('%Y-%m-%d'), '$lte': last.strftime('%Y-%m-%d')}})
+    return cube.span(first, last)
+
+
+def _docs_from_values(day: date, values: np.ndarray, slots: Sequence[int]) -> List[Dict[str, Any]]:
+    """把立方体中一天的若干时段还原为与 Mongo 文档同结构的字典（NaN 字段省略，与字段缺失一致）"""
+    day_start = datetime.combine(day, datetime.min.time())
+    date_str = day.strftime('%Y-%m-%d')
+    docs = []
+    for slot in slots:
+        row = values[slot]
+        if np.isnan(row).all():
+            continue
+        doc = {
+            'datetime': day_start + timedelta(minutes=SLOT_MINUTES * (slot + 1)),
+            'date_str': date_str,
+            'time_str': SLOT_TIME_STRS[slot],
+        }
+        for name, value in zip(PRICE_FIELDS, row.tolist()):
+            if value == value:  # 排除 NaN
+                doc[name] = value
+        docs.append(doc)
+    return docs
+
+
+def _band_result(moments: np.ndarray, prices: np.ndarray) -> Dict[str, np.ndarray]:
+    """由窗口 (点数, 和, 平方和) 与窗口价格计算逐时段统计（标准差为样本标准差）"""
+    count, total, squares = moments
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(count > 0, total / count, np.nan)
+        variance = np.where(count > 1, (squares - total * mean) / (count - 1), np.nan)
+    with warnings.catch_warnings():
+        # 整列无数据的时段返回 NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        p10, p50, p90 = np.nanpercentile(prices, BAND_PERCENTILES, axis=0) if len(prices) else \
+            np.full((3, SLOTS_PER_DAY), np.nan)
+    return {
+        'count': count.astype(np.int64),
+        'mean': mean,
+        'std': np.sqrt(np.clip(variance, 0, None)),
+        'p10': np.ascontiguousarray(p10),
+        'p50': np.ascontiguousarray(p50),
+        'p90': np.ascontiguousarray(p90),
+    }
+
+
+class PriceCube:
+    """日前/实时现货价格立方体"""
+
+    def __init__(self, db=None):
+        self.db = db if db is not None else ANALYTICS_DATABASE
+        self._markets = {market: _MarketCube(self.db[name]) for market, name in MARKET_COLLECTIONS.items()}
+        self._lock = threading.RLock()
+        self._enabled: Optional[bool] = None
+        self.refresh_seconds = float(get_config('MARKET', 'price_cube_refresh_seconds', 60))
+        self.refresh_days = int(get_config('MARKET', 'price_cube_refresh_days', 3))
+        # 滚动分位数缓存 {(market, 结束业务日, 天数): (版本号, 结果)}
+        self._bands: 'OrderedDict[Tuple[str, str, int], Tuple[int, Dict[str, np.ndarray]]]' = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        if self._enabled is None:
+            self._enabled = str(get_config('MARKET', 'price_cube', 'true')).lower() in ('1', 'true', 'yes', 'on')
+        return self._enabled
+
+    def _cube(self, market: str) -> _MarketCube:
+        cube = self._markets.get(market)
+        if cube is None:
+            raise ValueError(f"未知的市场类型: {market}")
+        cube.ensure_fresh(self.refresh_seconds, self.refresh_days)
+        return cube
+
+    def invalidate(self):
+        """丢弃已加载的数据，下次访问时全量重载（历史数据订正后调用）"""
+        with self._lock:
+            self._markets = {market: _MarketCube(self.db[name]) for market, name in MARKET_COLLECTIONS.items()}
+            self._bands.clear()
+
+    def day(self, market: str, date_str: str) -> Optional[np.ndarray]:
+        """
+        单个业务日的数据
+
+        Args:
+            market: 'day_ahead' 或 'real_time'
+            date_str: 业务日期 YYYY-MM-DD
+
+        Returns:
+            形状 (96, 字段数) 的数组（字段顺序见 PRICE_FIELDS，缺失为 NaN），当天没有数据时返回 None
+        """
+        day = datetime.strptime(date_str, '%Y-%m-%d').date()
+        with self._lock:
+            return self._cube(market).day(day)
+
+    def loaded_range(self, start_date: str, end_date: str) -> Optional[Tuple[str, str]]:
+        """
+        [start_date, end_date] 与立方体已加载业务日（日前、实时任一市场）的交集，没有交集时返回 None
+
+        区间不受长度限制的接口先用它裁剪再调用 span()，范围外的业务日立方体中没有数据
+        """
+        first = datetime.strptime(start_date, '%Y-%m-%d').date()
+        last = datetime.strptime(end_date, '%Y-%m-%d').date()
+        with self._lock:
+            ranges = [(cube.origin, cube.origin + timedelta(days=cube.num_days - 1))
+                      for cube in (self._cube(market) for market in MARKET_COLLECTIONS)
+                      if cube.origin is not None and cube.num_days]
+        if not ranges:
+            return None
+        first = max(first, min(begin for begin, _ in ranges))
+        last = min(last, max(end for _, end in ranges))
+        if last < first:
+            return None
+        return first.strftime('%Y-%m-%d'), last.strftime('%Y-%m-%d')
+
+    def span(self, market: str, start_date: str, end_date: str) -> Tuple[List[str], np.ndarray]:
+        """
+        业务日区间 [start_date, end_date] 的数据；未启用立方体时直接查询 Mongo
+
+        Returns:
+            (日期字符串列表, 形状 (天数, 96, 字段数) 的数组)
+        """
+        first = datetime.strptime(start_date, '%Y-%m-%d').date()
+        last = datetime.strptime(end_date, '%Y-%m-%d').date()
+        if self.enabled:
+            with self._lock:
+                values = self._cube(market).span(first, last)
+        else:
+            # 未启用时临时从 Mongo 加载该区间，保持调用方式一致
+            values = load_span(self.db[MARKET_COLLECTIONS[market]], first, last)
+        dates = [(first + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(len(values))]
+        return dates, values
+
+    def slot_bands(self, market: str, end_date: str, days: int) -> Dict[str, np.ndarray]:
+        """
+        截至 end_date（含）最近 days 个业务日出清价格的逐时段统计
+
+        均值/标准差由前缀和直接相减得到；分位数按窗口计算，窗口内数据未变化时复用缓存结果。
+
+        Args:
+            market: 'day_ahead' 或 'real_time'
+            end_date: 窗口最后一个业务日 YYYY-MM-DD
+            days: 窗口天数
+
+        Returns:
+            {'count', 'mean', 'std', 'p10', 'p50', 'p90'}，每项为形状 (96,) 的数组（无数据的时段为 NaN）
+        """
+        last = datetime.strptime(end_date, '%Y-%m-%d').date()
+        first = last - timedelta(days=days - 1)
+        if not self.enabled:
+            values = load_span(self.db[MARKET_COLLECTIONS[market]], first, last)
+            prices = values[:, :, FIELD_INDEX['avg_clearing_price']]
+            valid = ~np.isnan(prices)
+            filled = np.where(valid, prices, 0.0)
+            return _band_result(np.stack([valid.sum(axis=0), filled.sum(axis=0), (filled * filled).sum(axis=0)]),
+                                prices)
+
+        key = (market, end_date, days)
+        with self._lock:
+            cube = self._cube(market)
+            cached = self._bands.get(key)
+            if cached is not None and not cube.changed_since(cached[0], last):
+                self._bands.move_to_end(key)
+                return cached[1]
+            result = _band_result(cube.window_moments(first, last),
+                                  cube.span(first, last)[:, :, FIELD_INDEX['avg_clearing_price']])
+            self._bands[key] = (cube.revision, result)
+            while len(self._bands) > BAND_CACHE_SIZE:
+                self._bands.popitem(last=False)
+            return result
+
+    def day_docs(self, market: str, date_str: str) -> List[Dict[str, Any]]:
+        """
+        业务日的价格文档，等价于 find({'date_str': date_str}).sort('datetime', 1)（仅包含立方体字段）
+        """
+        values = self.day(market, date_str)
+        if values is None:
+            return []
+        return _docs_from_values(datetime.strptime(date_str, '%Y-%m-%d').date(), values, range(SLOTS_PER_DAY))
+
+
+# 全局服务实例
+price_cube = PriceCube()
@@ -96,6 +96,27 @@ class PricingModelService:
         # 获取模型信息
         model = self.collection.find_one({"model_code": model_code})
 
+        return self.validate_config_for_model(model, model_code, config)
+
+    def validate_config_for_model(
+        self,
+        model: Optional[Dict[str, Any]],
+        model_code: str,
+        config: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        根据已查询到的模型文档验证定价配置（不访问数据库）
+
+        供异步服务层在自行查询模型后复用同一套校验规则。
+
+        Args:
+            model: pricing_models 集合中的模型文档，不存在时为 None
+            model_code: 模型代码
+            config: 定价配置字典
+
+        Returns:
+            校验结果 {"valid": bool, "errors": [], "warnings": []}
+        """
         if not model:
             return {
                 "valid": False,
@@ -0,0 +1,62 @@
+"""
+分时段聚合（向量化）
+
+按尖峰/高峰/平段/低谷/深谷对 96 点数据做分组统计，供市场总览、价格对比、价差归因等接口共用，
+以后的负荷、结算分析也直接复用，不再各自维护 {时段: [值, ...]} 的收集器逐点追加。
+
+输入：
+    values: 形状 (..., 96) 的数组，最后一维为时段，缺失为 NaN；前面的维度可以是天数、指标等
+    periods: 时段编号（PERIOD_ORDER 下标，其他时段为 -1），可广播到 values 的形状，
+             通常为 tou_service.period_matrix() 的结果或 market_kpi.period_codes() 的单日数组
+
+一次调用用 (时段数, ..., 96) 的掩码同时得到各时段的点数、求和、均值以及加权均值（VWAP）。
+"""
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+PERIOD_ORDER = ("尖峰", "高峰", "平段", "低谷", "深谷")
+
+# 统计量：count / sum / mean，传入权重时另有 weight / weighted / vwap
+PeriodStats = Dict[str, np.ndarray]
+
+
+def period_stats(values: np.ndarray, periods: np.ndarray, weights: Optional[np.ndarray] = None,
+                 valid: Optional[np.ndarray] = None, total: Optional[str] = None,
+                 names: Sequence[str] = PERIOD_ORDER) -> Dict[str, PeriodStats]:
+    """
+    按分时时段聚合
+
+    Args:
+        values: 形状 (..., 96) 的数值，缺失为 NaN
+        periods: 时段编号，可广播到 values 的形状
+        weights: 权重（如出清电量），形状同 values；传入时计算加权均值
+        valid: 参与统计的点，默认为 values 非 NaN 的点
+        total: 不为空时另外返回该键下的全部时段合计
+        names: 时段编号对应的时段名称
+
+    Returns:
+        {时段名称: {'count', 'sum', 'mean'[, 'weight', 'weighted', 'vwap']}}，每项为去掉最后一维后的数组；
+        没有有效点时 mean / vwap 为 NaN
+    """
+    values = np.asarray(values, dtype=float)
+    if valid is None:
+        valid = ~np.isnan(values)
+    codes = np.arange(len(names)).reshape((-1,) + (1,) * values.ndim)
+    masks = (np.broadcast_to(periods, values.shape)[None] == codes) & valid
+    groups = list(names)
+    if total is not None:
+        masks = np.concatenate([np.broadcast_to(valid, values.shape)[None], masks])
+        groups.insert(0, total)
+
+    count = masks.sum(axis=-1)
+    summed = np.where(masks, values, 0).sum(axis=-1)
+    stats = {'count': count, 'sum': summed}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stats['mean'] = np.where(count > 0, summed / count, np.nan)
+        if weights is not None:
+            weight = np.where(masks, weights, 0).sum(axis=-1)
+            weighted = np.where(masks, values * weights, 0).sum(axis=-1)
+            stats.update(weight=weight, weighted=weighted, vwap=np.where(weight > 0, weighted / weight, np.nan))
+    return {name: {key: array[i] for key, array in stats.items()} for i, name in enumerate(groups)}
@@ -0,0 +1,236 @@
+"""
+分时电价（TOU）时段服务
+
+tou_rules 集合按月份声明尖峰/高峰/低谷/深谷时段，未覆盖的时刻为平段。
+本模块把规则编译为每个月 96 个时段（按时段开始时刻 "00:00".."23:45"）的时段表，
+并提供 {time_str: 时段名称} 映射以及 KPI 引擎使用的 (天数, 96) 时段编号矩阵。
+
+规则版本：规则可带 effective_from / effective_to（YYYY-MM-DD，均含当天，缺省为不限），
+调整规则时新增一版并结束旧版（scripts/tou_rules_version.py），历史日期仍按当时生效的规则分析。
+全部规则的生效起止日把时间轴切成若干区间，每个区间内生效的规则不变：
+区间起点有序列表 + 每个区间 12 个月的编译结果构成区间索引，按日期查找只需一次二分查找。
+
+编译结果缓存在进程内：tou_rules 只有十几条文档，首次使用时一次性读取全部规则并编译；
+之后每隔 [MARKET] tou_refresh_seconds 秒（默认 60）重新读取规则，内容变化时重新编译。
+修改规则后需要立即生效时调用 tou_service.invalidate()。
+"""
+
+import bisect
+import hashlib
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from webapp.services.market_kpi import period_codes
+from webapp.services.tou_aggregation import PERIOD_ORDER
+from webapp.tools.mongo import ANALYTICS_DATABASE, get_config
+
+# 规则重叠时后应用的优先
+_RULE_PRIORITY = ["高峰", "低谷", "尖峰", "深谷"]
+# 一天 96 个时段的开始时刻
+SLOT_START_STRS = tuple(f"{m // 60:02d}:{m % 60:02d}" for m in range(0, 1440, 15))
+
+
+def _minutes(time_str: str) -> int:
+    """HH:MM 转换为当天分钟数（24:00 为 1440）"""
+    if time_str == '24:00':
+        return 1440
+    parsed = datetime.strptime(time_str, '%H:%M')
+    return parsed.hour * 60 + parsed.minute
+
+
+def compile_periods(rules: Iterable[Dict[str, Any]]) -> Tuple[str, ...]:
+    """
+    把一个月适用的分时规则编译为 96 个时段的时段名称
+
+    Args:
+        rules: tou_rules 文档（period_type / start_time / end_time）
+
+    Returns:
+        长度 96 的元组，第 i 项为开始时刻 i*15 分钟的时段所属时段名称
+    """
+    periods = ["平段"] * 96
+    sorted_rules = sorted(rules, key=lambda r: _RULE_PRIORITY.index(r['period_type'])
+                          if r['period_type'] in _RULE_PRIORITY else -1)
+    for rule in sorted_rules:
+        # 开始时刻落在 [start, end) 内的时段属于该规则
+        first = -(-_minutes(rule['start_time']) // 15)
+        last = -(-_minutes(rule['end_time']) // 15)
+        periods[first:last] = [rule['period_type']] * max(last - first, 0)
+    return tuple(periods)
+
+
+def build_tou_map(rules: Iterable[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    把一个月适用的分时规则展开为 96 个时刻的时段映射
+
+    Args:
+        rules: tou_rules 文档（period_type / start_time / end_time）
+
+    Returns:
+        {"00:00": "低谷", ..., "23:45": "平段"}
+    """
+    return dict(zip(SLOT_START_STRS, compile_periods(rules)))
+
+
+class _CompiledMonth:
+    """一个月的编译结果；signature 为时段表内容的摘要（内容相同的时段表摘要相同）"""
+
+    def __init__(self, periods: Tuple[str, ...]):
+        self.periods = periods
+        self.tou_map = dict(zip(SLOT_START_STRS, periods))
+        self.codes = period_codes(self.tou_map)
+        self.start_codes = np.array([PERIOD_ORDER.index(p) if p in PERIOD_ORDER else -1 for p in periods], dtype=np.int8)
+        self.signature = hashlib.blake2b('|'.join(periods).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _date_str(value: Any) -> Optional[str]:
+    """生效日期统一为 YYYY-MM-DD 字符串（兼容 datetime 存储），缺省为 None"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.strftime('%Y-%m-%d')
+    return str(value)[:10]
+
+
+def _day_str(day: Any) -> str:
+    return day if isinstance(day, str) else day.strftime('%Y-%m-%d')
+
+
+def _next_day(day: str) -> str:
+    return (datetime.strptime(day, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+def compile_versions(docs: Sequence[Dict[str, Any]]) -> Tuple[List[str], List[Dict[int, _CompiledMonth]]]:
+    """
+    把带生效日期的规则编译为区间索引
+
+    Args:
+        docs: tou_rules 文档（months / period_type / start_time / end_time / effective_from / effective_to）
+
+    Returns:
+        (区间起点列表, 每个区间 {月份: 编译结果})；第一个区间起点为 ''，表示最早的日期
+    """
+    starts = {''}
+    for doc in docs:
+        if _date_str(doc.get('effective_from')):
+            starts.add(_date_str(doc.get('effective_from')))
+        if _date_str(doc.get('effective_to')):
+            starts.add(_next_day(_date_str(doc.get('effective_to'))))
+    bounds = sorted(starts)
+
+    # 内容相同的时段表共用一个编译结果
+    compiled: Dict[Tuple[str, ...], _CompiledMonth] = {}
+    tables = []
+    for start in bounds:
+        active = [doc for doc in docs
+                  if (_date_str(doc.get('effective_from')) or '') <= start
+                  and (_date_str(doc.get('effective_to')) is None or _date_str(doc.get('effective_to')) >= start)]
+        table = {}
+        for month in range(1, 13):
+            periods = compile_periods(doc for doc in active if month in (doc.get('months') or []))
+            if periods not in compiled:
+                compiled[periods] = _CompiledMonth(periods)
+            table[month] = compiled[periods]
+        tables.append(table)
+    return bounds, tables
+
+
+class TouService:
+    """分时时段查询服务（编译结果进程内缓存）"""
+
+    def __init__(self, db):
+        self.db = db
+        self.collection = self.db.tou_rules
+        self.refresh_seconds = float(get_config('MARKET', 'tou_refresh_seconds', 60))
+        self._lock = threading.Lock()
+        self._rules: Optional[List[Tuple]] = None
+        self._bounds: List[str] = []
+        self._tables: List[Dict[int, _CompiledMonth]] = []
+        self._checked_at = 0.0
+
+    def invalidate(self):
+        """丢弃编译结果，下次访问时重新读取规则"""
+        with self._lock:
+            self._rules = None
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._rules is not None and now - self._checked_at < self.refresh_seconds:
+            return
+        docs = list(self.collection.find({}, {'_id': 0, 'months': 1, 'period_type': 1, 'start_time': 1,
+                                             'end_time': 1, 'effective_from': 1, 'effective_to': 1}))
+        rules = sorted((tuple(doc.get('months') or []), doc.get('period_type'), doc.get('start_time'),
+                        doc.get('end_time'), _date_str(doc.get('effective_from')) or '',
+                        _date_str(doc.get('effective_to')) or '') for doc in docs)
+        if rules != self._rules:
+            self._bounds, self._tables = compile_versions(docs)
+            self._rules = rules
+        self._checked_at = now
+
+    def _compiled(self, day: Any) -> _CompiledMonth:
+        """指定日期生效的编译结果（day 为 YYYY-MM-DD 字符串、date 或 datetime）"""
+        day_str = _day_str(day)
+        with self._lock:
+            self._refresh()
+            return self._tables[bisect.bisect_right(self._bounds, day_str) - 1][int(day_str[5:7])]
+
+    def _compiled_many(self, dates: Sequence[str]) -> List[_CompiledMonth]:
+        with self._lock:
+            self._refresh()
+            bounds, tables = self._bounds, self._tables
+        return [tables[bisect.bisect_right(bounds, day) - 1][int(day[5:7])] for day in dates]
+
+    def get_tou_map(self, date: datetime) -> Dict[str, str]:
+        """
+        指定日期生效的时段映射
+
+        Args:
+            date: 日期
+
+        Returns:
+            {time_str: 时段名称}（按时段开始时刻 "00:00".."23:45"）
+        """
+        return dict(self._compiled(date).tou_map)
+
+    def slot_periods(self, day: Any) -> Tuple[str, ...]:
+        """
+        指定日期 96 个时段（按开始时刻 "00:00".."23:45"）的时段名称
+
+        Args:
+            day: 日期（YYYY-MM-DD 字符串、date 或 datetime）
+        """
+        return self._compiled(day).periods
+
+    def signatures(self, dates: Sequence[str]) -> List[str]:
+        """
+        日期列表对应时段表的内容摘要，用于判断按旧规则计算的汇总是否过期
+
+        Args:
+            dates: 日期字符串列表 YYYY-MM-DD
+        """
+        return [compiled.signature for compiled in self._compiled_many(dates)]
+
+    def period_matrix(self, dates: Sequence[str], by_slot_start: bool = False) -> np.ndarray:
+        """
+        日期列表对应的时段编号矩阵（按各日期生效的规则版本）
+
+        Args:
+            dates: 日期字符串列表 YYYY-MM-DD
+            by_slot_start: 列按时段开始时刻 "00:00".."23:45" 排列（与 slot_periods 一致）；
+                默认按价格立方体的 time_str "00:15".."24:00" 查映射（见 market_kpi.period_codes）
+
+        Returns:
+            形状 (天数, 96) 的时段编号（tou_aggregation.PERIOD_ORDER 下标）
+        """
+        periods = np.empty((len(dates), 96), dtype=np.int8)
+        for i, compiled in enumerate(self._compiled_many(dates)):
+            periods[i] = compiled.start_codes if by_slot_start else compiled.codes
+        return periods
+
+
+# 全局服务实例
+tou_service = TouService(ANALYTICS_DATABASE)
@@ -0,0 +1,186 @@
+"""
+市场数据的 HTTP 缓存
+
+已结束业务日的现货价格数据不会再变化，对应接口的响应可以：
+- 按响应内容计算 ETag，请求携带匹配的 If-None-Match 时直接返回 304
+- 对历史日期下发较长的 Cache-Control，对当日及未来日期要求浏览器每次用 ETag 重新验证
+- 在进程内缓存历史日期的响应体及其 gzip / brotli 压缩结果，重复访问不再查询数据库和重新压缩
+
+用法（路由中）：
+    cached = market_day_cache.lookup(request, date)
+    if cached is not None:
+        return cached
+    ... 计算 content ...
+    return market_day_cache.respond(request, date, content, has_data=bool(docs))
+
+配置（~/.exds/config.ini 的 [MARKET] 节）：
+- closed_day_lag: 早于今天多少天的业务日视为已结束，默认 2（实时数据通常次日才补齐，昨天仍按未结束处理）
+- day_cache_size: 进程内缓存的响应数，默认 512
+- day_cache_ttl: 进程内缓存有效期（秒），默认 3600，用于兜底数据订正的场景
+"""
+
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+from webapp.tools.mongo import get_config
+from webapp.tools.responses import dumps
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只提供 gzip
+    brotli = None
+
+# 小于该字节数的响应不压缩
+MIN_COMPRESS_SIZE = 1000
+# 历史日期：浏览器缓存 1 天（数据已结束，不会变化）
+CLOSED_DAY_CACHE_CONTROL = "private, max-age=86400"
+# 当日/未来日期：每次都用 ETag 向服务端验证
+OPEN_DAY_CACHE_CONTROL = "private, no-cache"
+
+
+class _Entry:
+    """缓存条目：原始响应体、ETag 以及按需生成的压缩结果"""
+
+    __slots__ = ("body", "etag", "encoded", "expires_at")
+
+    def __init__(self, body: bytes, etag: str, expires_at: float):
+        self.body = body
+        self.etag = etag
+        self.encoded: Dict[str, bytes] = {}
+        self.expires_at = expires_at
+
+
+def _make_etag(body: bytes) -> str:
+    # 压缩后的字节不同但语义一致，因此使用弱 ETag
+    return 'W/"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:]
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def _choose_encoding(request: Request) -> Optional[str]:
+    accept = request.headers.get("accept-encoding", "")
+    encodings = {part.split(";")[0].strip().lower() for part in accept.split(",")}
+    if brotli is not None and "br" in encodings:
+        return "br"
+    if "gzip" in encodings:
+        return "gzip"
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+class MarketDayCache:
+    """按业务日缓存市场数据接口的响应，并处理 ETag / 条件请求 / 压缩"""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None,
+                 closed_day_lag: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else int(get_config('MARKET', 'day_cache_size', 512))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(get_config('MARKET', 'day_cache_ttl', 3600))
+        self.closed_day_lag = closed_day_lag if closed_day_lag is not None else int(get_config('MARKET', 'closed_day_lag', 2))
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_closed_day(self, date_str: str) -> bool:
+        """业务日是否已结束（数据不再变化）"""
+        try:
+            day = datetime.strptime(date_str, "%Y-%m-%d").date()
+        except (TypeError, ValueError):
+            return False
+        return day <= date.today() - timedelta(days=self.closed_day_lag)
+
+    @staticmethod
+    def _key(request: Request) -> Tuple[str, str]:
+        return request.url.path, "&".join(sorted(request.url.query.split("&")))
+
+    def _get(self, key) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _put(self, key, entry: _Entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """清空进程内缓存（数据订正后调用）"""
+        with self._lock:
+            self._entries.clear()
+
+    def _build_response(self, request: Request, entry: _Entry, cache_control: str) -> Response:
+        headers = {"ETag": entry.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if _etag_matches(request, entry.etag):
+            return Response(status_code=304, headers=headers)
+
+        body = entry.body
+        encoding = _choose_encoding(request) if len(body) >= MIN_COMPRESS_SIZE else None
+        if encoding:
+            encoded = entry.encoded.get(encoding)
+            if encoded is None:
+                encoded = entry.encoded[encoding] = _compress(body, encoding)
+            body = encoded
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def lookup(self, request: Request, date_str: str) -> Optional[Response]:
+        """
+        命中进程内缓存时直接返回响应（200 或 304），否则返回 None
+
+        Args:
+            request: 当前请求
+            date_str: 业务日期 YYYY-MM-DD
+        """
+        if not self.is_closed_day(date_str):
+            return None
+        entry = self._get(self._key(request))
+        if entry is None:
+            return None
+        return self._build_response(request, entry, CLOSED_DAY_CACHE_CONTROL)
+
+    def respond(self, request: Request, date_str: str, content: Any, has_data: bool = True) -> Response:
+        """
+        编码响应内容并生成带 ETag 的响应；历史日期且有数据时写入进程内缓存
+
+        Args:
+            request: 当前请求
+            date_str: 业务日期 YYYY-MM-DD
+            content: 响应内容（可包含 ObjectId / datetime 等 Mongo 类型）
+            has_data: 是否查到了数据；没有数据的历史日期可能尚未导入，不做长期缓存
+        """
+        body = dumps(content)
+        immutable = has_data and self.is_closed_day(date_str)
+        entry = _Entry(body, _make_etag(body), time.monotonic() + self.ttl_seconds)
+        if immutable:
+            self._put(self._key(request), entry)
+        return self._build_response(request, entry, CLOSED_DAY_CACHE_CONTROL if immutable else OPEN_DAY_CACHE_CONTROL)
+
+
+# 全局实例：市场价格分析接口共用
+market_day_cache = MarketDayCache()
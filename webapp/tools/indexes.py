@@ -0,0 +1,259 @@
+"""
+MongoDB 索引注册表
+
+集中声明系统各集合所需的索引，并提供幂等的对账（reconcile）方法：
+- 应用启动时由 webapp.main 的 lifespan 在后台任务中调用一次 ensure_indexes_async（不阻塞接口服务，
+  大集合上的新索引可能需要较长时间，也可以部署前用脚本预建）
+- 运维脚本 scripts/create_indexes.py 调用同步版本 ensure_indexes
+
+对账规则：
+- 已存在同名索引，或已存在相同键模式（名称不同）的索引时跳过，避免索引冲突报错
+- 只创建缺失的索引；逐个创建，单个索引失败（如唯一索引遇到重复数据）不影响其他索引
+- 索引创建失败不应阻止服务启动，通过 logging 记录失败的集合和索引名（ERROR 级别）
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+
+logger = logging.getLogger(__name__)
+
+class IndexSpec:
+    """单个索引的声明"""
+
+    def __init__(self, keys: List[Tuple[str, Any]], name: str, description: str = "", **options):
+        self.keys = keys
+        self.name = name
+        self.description = description
+        self.options = options
+
+    @property
+    def key_pattern(self) -> Tuple[Tuple[str, Any], ...]:
+        return tuple(self.keys)
+
+
+# 现货价格集合（日前/实时结构完全一致）
+_SPOT_PRICE_INDEXES = [
+    IndexSpec([('datetime', ASCENDING)], 'idx_datetime_unique', '时间戳唯一索引', unique=True),
+    IndexSpec([('date_str', ASCENDING), ('time_str', ASCENDING)], 'idx_date_time_str', '业务日+业务时刻索引'),
+    # 等值条件在前：单个时段跨日期区间的查询（分时段分析、价格矩阵）
+    IndexSpec([('time_str', ASCENDING), ('date_str', ASCENDING)], 'idx_time_str_date_str', '业务时刻+业务日索引'),
+]
+
+INDEX_REGISTRY: Dict[str, List[IndexSpec]] = {
+    # ---------------- 客户档案 ----------------
+    'customers': [
+        # 1. 基础查询索引
+        IndexSpec([('user_name', ASCENDING)], 'idx_user_name', '客户全称索引（用于精确查询和唯一性检查）'),
+        IndexSpec([('short_name', ASCENDING)], 'idx_short_name', '客户简称索引'),
+        IndexSpec([('status', ASCENDING)], 'idx_status', '状态索引'),
+        # 2. 组合查询索引（用于列表筛选）
+        IndexSpec([('status', ASCENDING), ('created_at', DESCENDING)], 'idx_status_created_at', '状态+创建时间（列表查询）'),
+        IndexSpec([('status', ASCENDING), ('user_type', ASCENDING), ('created_at', DESCENDING)], 'idx_status_user_type', '状态+客户类型'),
+        IndexSpec([('status', ASCENDING), ('industry', ASCENDING), ('created_at', DESCENDING)], 'idx_status_industry', '状态+行业'),
+        IndexSpec([('status', ASCENDING), ('region', ASCENDING), ('created_at', DESCENDING)], 'idx_status_region', '状态+地区'),
+        IndexSpec([('status', ASCENDING), ('voltage', ASCENDING), ('created_at', DESCENDING)], 'idx_status_voltage', '状态+电压等级'),
+        # 3. 搜索索引
+        IndexSpec([('user_name', 'text'), ('short_name', 'text')], 'idx_search_text', '全文搜索索引（客户名称搜索）',
+                  default_language='none'),
+        # 4. 嵌套数据索引（用于户号和计量点查询）
+        IndexSpec([('utility_accounts.account_id', ASCENDING)], 'idx_account_id', '户号索引'),
+        IndexSpec([('utility_accounts.metering_points.metering_point_id', ASCENDING)], 'idx_metering_point_id', '计量点ID索引'),
+        IndexSpec([('utility_accounts.metering_points.meter.meter_id', ASCENDING)], 'idx_meter_id', '电表资产号索引'),
+        # 5. 时间索引
+        IndexSpec([('created_at', DESCENDING)], 'idx_created_at', '创建时间索引（排序）'),
+        IndexSpec([('updated_at', DESCENDING)], 'idx_updated_at', '更新时间索引（排序）'),
+        # 6. 操作人索引
+        IndexSpec([('created_by', ASCENDING)], 'idx_created_by', '创建人索引'),
+        IndexSpec([('updated_by', ASCENDING)], 'idx_updated_by', '更新人索引'),
+    ],
+
+    # ---------------- 零售合同 ----------------
+    'retail_contracts': [
+        # 1. 基础查询索引
+        IndexSpec([('package_name', ASCENDING)], 'idx_package_name', '套餐名称索引'),
+        IndexSpec([('customer_name', ASCENDING)], 'idx_customer_name', '客户名称索引'),
+        IndexSpec([('contract_name', ASCENDING)], 'idx_contract_name', '合同名称索引'),
+        IndexSpec([('purchase_start_month', ASCENDING)], 'idx_purchase_start_month', '购电开始月份索引'),
+        IndexSpec([('purchase_end_month', ASCENDING)], 'idx_purchase_end_month', '购电结束月份索引'),
+        # 2. 关联查询索引
+        IndexSpec([('package_id', ASCENDING)], 'idx_package_id', '套餐ID索引（合同数统计）'),
+        IndexSpec([('customer_id', ASCENDING)], 'idx_customer_id', '客户ID索引'),
+        # 3. 组合查询索引（优化筛选查询）
+        IndexSpec([('package_name', ASCENDING), ('purchase_start_month', DESCENDING)], 'idx_package_start', '套餐+开始月份'),
+        IndexSpec([('customer_name', ASCENDING), ('purchase_start_month', DESCENDING)], 'idx_customer_start', '客户+开始月份'),
+        IndexSpec([('contract_name', ASCENDING), ('purchase_start_month', DESCENDING)], 'idx_contract_start', '合同+开始月份'),
+        # 4. 日期范围重叠检查索引
+        IndexSpec([('customer_id', ASCENDING), ('purchase_start_month', ASCENDING), ('purchase_end_month', ASCENDING)],
+                  'idx_customer_date_range', '客户日期范围重叠检查'),
+        # 5. 时间索引
+        IndexSpec([('created_at', DESCENDING)], 'idx_created_at', '创建时间索引（排序）'),
+        IndexSpec([('updated_at', DESCENDING)], 'idx_updated_at', '更新时间索引（排序）'),
+    ],
+
+    # ---------------- 零售套餐 ----------------
+    'retail_packages': [
+        # 唯一索引：保证套餐名称唯一（PackageService 依赖 DuplicateKeyError 判断重名）
+        IndexSpec([('package_name', ASCENDING)], 'idx_package_name_unique', '套餐名称唯一索引', unique=True),
+        IndexSpec([('status', ASCENDING)], 'idx_status', '状态索引'),
+        IndexSpec([('package_type', ASCENDING)], 'idx_package_type', '套餐类型索引'),
+        IndexSpec([('created_at', DESCENDING)], 'idx_created_at', '创建时间索引（排序）'),
+        IndexSpec([('status', ASCENDING), ('package_type', ASCENDING), ('created_at', DESCENDING)],
+                  'idx_status_type_created', '状态+类型+创建时间'),
+    ],
+
+    # ---------------- 价格数据 ----------------
+    'day_ahead_spot_price': _SPOT_PRICE_INDEXES,
+    'real_time_spot_price': _SPOT_PRICE_INDEXES,
+    'spot_settlement_period': [
+        IndexSpec([('operating_date', ASCENDING), ('period', ASCENDING)], 'idx_operating_date_period_unique',
+                  '业务日+时段唯一索引（按业务日区间导出）', unique=True),
+    ],
+    'tou_rules': [
+        IndexSpec([('months', ASCENDING)], 'idx_months', '分时规则适用月份索引'),
+    ],
+    'market_daily_summary': [
+        IndexSpec([('date_str', ASCENDING)], 'idx_date_str_unique', '业务日唯一索引', unique=True),
+        IndexSpec([('month', ASCENDING), ('date_str', ASCENDING)], 'idx_month_date_str', '月份+业务日（月度视图）'),
+        # 逐日极值索引：前 N 天 / 阈值查询（见 MarketSummaryService.top_days）
+        IndexSpec([('extremes.max_rt_price', DESCENDING), ('date_str', ASCENDING)], 'idx_extremes_max_rt_price', '实时最高价'),
+        IndexSpec([('extremes.min_rt_price', ASCENDING), ('date_str', ASCENDING)], 'idx_extremes_min_rt_price', '实时最低价'),
+        IndexSpec([('extremes.max_positive_spread', DESCENDING), ('date_str', ASCENDING)],
+                  'idx_extremes_max_positive_spread', '最大正价差'),
+        IndexSpec([('extremes.max_negative_spread', ASCENDING), ('date_str', ASCENDING)],
+                  'idx_extremes_max_negative_spread', '最大负价差'),
+        IndexSpec([('extremes.max_abs_ramp', DESCENDING), ('date_str', ASCENDING)], 'idx_extremes_max_abs_ramp', '最大价格爬坡'),
+    ],
+
+    'data_catalog': [
+        IndexSpec([('dataset', ASCENDING), ('key', ASCENDING)], 'idx_dataset_key_unique', '数据集+分组键唯一索引', unique=True),
+    ],
+
+    # ---------------- 负荷数据 ----------------
+    'user_load_data': [
+        IndexSpec([('meter_id', ASCENDING), ('timestamp', ASCENDING)], 'idx_meter_timestamp', '电表+时间（负荷曲线/日电量查询）'),
+        IndexSpec([('user_id', ASCENDING), ('meter_id', ASCENDING)], 'idx_user_meter', '用户+电表（电表列表查询）'),
+    ],
+    'meter_catalog': [
+        IndexSpec([('meter_id', ASCENDING)], 'idx_meter_id_unique', '电表唯一索引', unique=True),
+        IndexSpec([('user_id', ASCENDING), ('meter_id', ASCENDING)], 'idx_user_meter', '用户+电表（电表列表查询）'),
+        IndexSpec([('user_name', ASCENDING), ('user_id', ASCENDING)], 'idx_user_name_user', '用户名+用户（用户列表查询）'),
+    ],
+    'meter_availability': [
+        IndexSpec([('meter_id', ASCENDING), ('year', ASCENDING)], 'idx_meter_year_unique',
+                  '电表+年份唯一索引（数据可用性批量查询）', unique=True),
+    ],
+    'meter_daily_energy': [
+        IndexSpec([('meter_id', ASCENDING), ('date_str', ASCENDING)], 'idx_meter_date_str_unique',
+                  '电表+业务日唯一索引（日/月电量查询）', unique=True),
+    ],
+    'mp_load_curve': [
+        IndexSpec([('mp_id', ASCENDING), ('datetime', ASCENDING)], 'idx_mp_datetime_unique', '计量点+时间唯一索引', unique=True),
+    ],
+    'meter_data': [
+        IndexSpec([('表号', ASCENDING), ('日期时间', ASCENDING)], 'idx_meter_datetime', '表号+日期时间（电表时序查询）'),
+    ],
+
+    # ---------------- 诊断数据 ----------------
+    'diagnostics_slow_queries': [
+        # 慢查询记录只保留 30 天
+        IndexSpec([('timestamp', ASCENDING)], 'idx_timestamp_ttl', '记录时间（TTL 30 天）', expireAfterSeconds=30 * 24 * 3600),
+        IndexSpec([('collection', ASCENDING), ('command_name', ASCENDING)], 'idx_collection_command', '集合+命令（报表汇总）'),
+    ],
+}
+
+
+def _plan(specs: Iterable[IndexSpec], existing: List[Dict[str, Any]]) -> List[IndexSpec]:
+    """根据现有索引，计算需要新建的索引"""
+    existing_names = {idx.get('name') for idx in existing}
+    existing_keys = {tuple(idx['key'].items()) for idx in existing if 'key' in idx}
+    # 文本索引的键模式在服务端被改写为 _fts/_ftsx，只能按名称或类型判断
+    has_text_index = any('_fts' in dict(idx.get('key', {})) for idx in existing)
+
+    missing = []
+    for spec in specs:
+        if spec.name in existing_names or spec.key_pattern in existing_keys:
+            continue
+        if has_text_index and any(direction == 'text' for _, direction in spec.keys):
+            continue
+        missing.append(spec)
+    return missing
+
+
+def _selected(collections: Optional[Iterable[str]]) -> Dict[str, List[IndexSpec]]:
+    if collections is None:
+        return INDEX_REGISTRY
+    return {name: INDEX_REGISTRY[name] for name in collections}
+
+
+def ensure_indexes(db, collections: Optional[Iterable[str]] = None, verbose: bool = False) -> Dict[str, List[str]]:
+    """
+    同步对账：创建注册表中缺失的索引（供脚本使用）
+
+    Args:
+        db: pymongo Database
+        collections: 仅处理指定集合，默认处理全部
+        verbose: 是否打印每个索引的处理结果
+
+    Returns:
+        {集合名: [新建的索引名]}
+    """
+    created = {}
+    for collection_name, specs in _selected(collections).items():
+        collection = db[collection_name]
+        created[collection_name] = []
+        try:
+            missing = _plan(specs, list(collection.list_indexes()))
+        except Exception as e:
+            print(f"读取 {collection_name} 索引时出错: {str(e)}")
+            continue
+
+        for spec in specs:
+            if spec not in missing:
+                if verbose:
+                    print(f"  ✅ [{collection_name}] {spec.name} 已存在")
+                continue
+            try:
+                collection.create_index(spec.keys, name=spec.name, **spec.options)
+                created[collection_name].append(spec.name)
+                if verbose:
+                    print(f"  ✅ [{collection_name}] 创建索引 {spec.name}: {spec.description}")
+            except Exception as e:
+                # 单个索引创建失败不影响其他索引，记录错误即可
+                print(f"  ❌ [{collection_name}] 创建索引 {spec.name} 失败: {str(e)}")
+    return created
+
+
+async def ensure_indexes_async(db, collections: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+    """
+    异步对账：创建注册表中缺失的索引（应用启动时调用一次）
+
+    Args:
+        db: pymongo AsyncDatabase
+        collections: 仅处理指定集合，默认处理全部
+
+    Returns:
+        {集合名: [新建的索引名]}
+    """
+    created = {}
+    for collection_name, specs in _selected(collections).items():
+        collection = db[collection_name]
+        created[collection_name] = []
+        try:
+            cursor = await collection.list_indexes()
+            missing = _plan(specs, await cursor.to_list())
+        except Exception:
+            # 索引对账失败不应该阻止服务启动，记录错误即可
+            logger.exception("读取 %s 索引时出错", collection_name)
+            continue
+
+        for spec in missing:
+            try:
+                await collection.create_index(spec.keys, name=spec.name, **spec.options)
+                created[collection_name].append(spec.name)
+                logger.info("已为 %s 创建索引: %s", collection_name, spec.name)
+            except Exception:
+                # 如唯一索引遇到重复数据：服务继续运行，但该索引缺失，需要人工处理后重新对账
+                logger.exception("创建 %s 索引 %s 失败（%s）", collection_name, spec.name, spec.description)
+    return created
@@ -0,0 +1,179 @@
+"""
+运行指标采集（Prometheus 格式）
+
+- MetricsMiddleware：纯 ASGI 中间件，按路由模板记录请求耗时直方图
+- MongoCommandMetrics：pymongo CommandListener，把每条 Mongo 命令的次数、耗时、返回文档数
+  归属到发起它的请求路由上
+- 指标通过 webapp.main 中的 GET /metrics 暴露
+
+归属原理：中间件在请求开始时把 ASGI scope 放入 contextvar，路由匹配后 scope['route']
+即为当前路由。异步客户端在同一个任务中发布命令事件；同步 def 路由运行在线程池中，
+starlette/anyio 会把 contextvar 复制到工作线程，因此监听器都能读到所属请求。
+"""
+
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from pymongo import monitoring
+
+# 不属于任何请求的命令（启动时的索引对账、脚本等）使用的路由标签
+NO_ROUTE = "none"
+# 未匹配到路由的请求（404）统一归为一个标签，避免标签基数爆炸
+UNMATCHED_ROUTE = "unmatched"
+
+HTTP_REQUEST_DURATION = Histogram(
+    "exds_http_request_duration_seconds",
+    "HTTP 请求耗时（秒）",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+MONGO_COMMANDS = Counter(
+    "exds_mongo_commands_total",
+    "Mongo 命令次数",
+    ["route", "collection", "command", "outcome"],
+)
+MONGO_COMMAND_DURATION = Histogram(
+    "exds_mongo_command_duration_seconds",
+    "Mongo 命令耗时（秒，驱动侧测量）",
+    ["route", "collection", "command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+MONGO_DOCUMENTS_RETURNED = Counter(
+    "exds_mongo_documents_returned_total",
+    "Mongo 命令返回的文档数",
+    ["route", "collection", "command"],
+)
+MONGO_COMMANDS_PER_REQUEST = Histogram(
+    "exds_mongo_commands_per_request",
+    "单个请求发出的 Mongo 命令数",
+    ["route"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 500),
+)
+
+# 当前请求的上下文：{'scope': ASGI scope, 'commands': 命令计数}
+_request_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("exds_request_context", default=None)
+
+
+def route_label(scope: Optional[Dict[str, Any]]) -> str:
+    """根据 ASGI scope 取路由模板（如 /api/v1/customers/{customer_id}）作为标签"""
+    if scope is None:
+        return NO_ROUTE
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+def current_route() -> str:
+    """当前上下文所属的请求路由标签"""
+    context = _request_context.get()
+    return route_label(context["scope"]) if context else NO_ROUTE
+
+
+class MetricsMiddleware:
+    """按路由记录 HTTP 请求耗时的 ASGI 中间件"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        context = {"scope": scope, "commands": 0}
+        token = _request_context.set(context)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = route_label(scope)
+            HTTP_REQUEST_DURATION.labels(scope["method"], route, str(status_code)).observe(
+                time.perf_counter() - start)
+            MONGO_COMMANDS_PER_REQUEST.labels(route).observe(context["commands"])
+            _request_context.reset(token)
+
+
+def _command_collection(command_name: str, command: Dict[str, Any]) -> str:
+    """从命令文档中取集合名（getMore 的集合在 collection 字段中）"""
+    if command_name == "getMore":
+        return str(command.get("collection", ""))
+    value = command.get(command_name)
+    return value if isinstance(value, str) else ""
+
+
+def _documents_returned(reply: Dict[str, Any]) -> int:
+    """估算命令返回的文档数"""
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+        return len(batch) if batch is not None else 0
+    if "values" in reply:  # distinct
+        return len(reply["values"])
+    if reply.get("value") is not None:  # findAndModify
+        return 1
+    return 0
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    把 Mongo 命令的次数、耗时和返回文档数归属到请求路由上
+
+    started 事件中记录集合名（succeeded 事件不含命令体），按 (连接, request_id) 关联。
+    """
+
+    # 不计入指标的内部命令
+    IGNORED_COMMANDS = {"hello", "isMaster", "ismaster", "ping", "saslStart", "saslContinue", "endSessions"}
+
+    def __init__(self):
+        self._pending: Dict[Any, str] = {}
+
+    def started(self, event):
+        if event.command_name in self.IGNORED_COMMANDS:
+            return
+        self._pending[(event.connection_id, event.request_id)] = _command_collection(
+            event.command_name, event.command)
+
+    def succeeded(self, event):
+        self._finish(event, "success", event.reply)
+
+    def failed(self, event):
+        self._finish(event, "failure", None)
+
+    def _finish(self, event, outcome: str, reply: Optional[Dict[str, Any]]):
+        collection = self._pending.pop((event.connection_id, event.request_id), None)
+        if collection is None:
+            return
+
+        context = _request_context.get()
+        route = route_label(context["scope"]) if context else NO_ROUTE
+        if context:
+            context["commands"] += 1
+
+        command = event.command_name
+        MONGO_COMMANDS.labels(route, collection, command, outcome).inc()
+        MONGO_COMMAND_DURATION.labels(route, collection, command).observe(event.duration_micros / 1e6)
+        if reply is not None:
+            MONGO_DOCUMENTS_RETURNED.labels(route, collection, command).inc(_documents_returned(reply))
+
+
+def render_metrics():
+    """
+    生成 Prometheus 文本格式的指标
+
+    Returns:
+        (内容, Content-Type)
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+# 全局监听器实例，由 webapp.tools.mongo 在创建客户端时注册
+mongo_command_metrics = MongoCommandMetrics()
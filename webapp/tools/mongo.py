@@ -1,9 +1,12 @@
 import os
 import configparser
 import json
+import time
 import pymongo
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
 
-import os
+from webapp.tools.metrics import mongo_command_metrics
+from webapp.tools.slow_query import slow_query_recorder
 
 # --- 路径定义 ---
 # 获取用户主目录
@@ -44,13 +47,46 @@ DEFAULT_DB_URI = f"mongodb://{os.getenv('MONGODB', 'localhost')}"
 
 # 从config.ini获取URI，如果不存在，则使用并设置默认值
 MONGO_URI = get_config('MONGODB', 'uri', default_value=DEFAULT_DB_URI)
-# 从config.ini获取数据库名，如果不存在，则使用并设置默认值
-DB_NAME = get_config('MONGODB', 'database', default_value='exds')
+
+
+def get_mongo_setting(option, default_value):
+    """
+    读取 MongoDB 相关配置：环境变量 MONGODB_<OPTION> 优先，其次 config.ini 的 [MONGODB] 节，最后使用默认值。
+
+    :param option: 配置项名称 (e.g., 'max_pool_size')，对应环境变量 MONGODB_MAX_POOL_SIZE
+    :param default_value: 默认值
+    :return: 配置值（字符串）
+    """
+    env_value = os.getenv(f'MONGODB_{option.upper()}')
+    if env_value is not None:
+        return env_value
+    return get_config('MONGODB', option, default_value=default_value)
+
+
+# 从环境变量 MONGODB_DATABASE 或 config.ini 获取数据库名，如果不存在，则使用并设置默认值
+# （基准测试等场景通过环境变量切换到独立的数据库）
+DB_NAME = get_mongo_setting('database', 'exds')
+
+
+# --- 连接池配置 ---
+# 每个进程一个客户端，同步/异步客户端各自维护一个连接池
+MAX_POOL_SIZE = int(get_mongo_setting('max_pool_size', 50))
+MIN_POOL_SIZE = int(get_mongo_setting('min_pool_size', 0))
+SERVER_SELECTION_TIMEOUT_MS = int(get_mongo_setting('server_selection_timeout_ms', 5000))
+# 0 表示不设置 socket 超时（pymongo 默认行为）
+SOCKET_TIMEOUT_MS = int(get_mongo_setting('socket_timeout_ms', 30000))
+# 网络压缩：按顺序与服务端协商，可配置 zstd / snappy / zlib，留空表示不压缩。
+# zstd 依赖 zstandard、snappy 依赖 python-snappy，未安装时 pymongo 会告警并忽略该项
+COMPRESSORS = get_mongo_setting('compressors', 'zstd,zlib')
+# 分析类路由（价格、负荷曲线等只读查询）的读偏好，副本集下可把读压力分流到从节点
+ANALYTICS_READ_PREFERENCE = get_mongo_setting('analytics_read_preference', 'secondaryPreferred')
 
 
 class DbClient:
     """
     数据库客户端类，用于封装MongoDB的连接逻辑。
+    同步客户端和异步客户端都在第一次访问时创建，之后在整个进程内复用，
+    以保证连接池只有一份；进程退出时调用 close / aclose 释放连接。
     """
 
     def __init__(self, uri=None):
@@ -59,16 +95,91 @@ class DbClient:
         :param uri: (可选) 如果提供，则直接使用此URI。
         """
         self.mongo_uri = uri if uri is not None else MONGO_URI
+        self._client = None
+        self._async_client = None
+
+    @property
+    def client_options(self):
+        """
+        MongoClient / AsyncMongoClient 的公共连接参数
+        :return: dict
+        """
+        options = {
+            'maxPoolSize': MAX_POOL_SIZE,
+            'minPoolSize': MIN_POOL_SIZE,
+            'serverSelectionTimeoutMS': SERVER_SELECTION_TIMEOUT_MS,
+            'socketTimeoutMS': SOCKET_TIMEOUT_MS or None,
+            # 命令监听器：按请求路由统计命令次数/耗时/返回文档数（见 webapp/tools/metrics.py），
+            # 以及慢查询自动 explain（见 webapp/tools/slow_query.py）
+            'event_listeners': [mongo_command_metrics, slow_query_recorder],
+        }
+        if COMPRESSORS:
+            options['compressors'] = COMPRESSORS
+        return options
 
     @property
     def client(self):
         """
         使用 @property 装饰器，实现延迟连接。
-        只有当第一次访问 .client 属性时，才会真正创建MongoClient实例并建立连接。
+        只有当第一次访问 .client 属性时，才会真正创建MongoClient实例，之后始终返回同一个实例。
         :return: pymongo.MongoClient 实例
         """
         # print(f"Connecting to MongoDB at {self.mongo_uri}...") # 已移除此行以避免泄露密码
-        return pymongo.MongoClient(self.mongo_uri)
+        if self._client is None:
+            self._client = pymongo.MongoClient(self.mongo_uri, **self.client_options)
+        return self._client
+
+    @property
+    def async_client(self):
+        """
+        异步客户端，供 FastAPI 的 async 路由及其服务层使用。
+        pymongo.AsyncMongoClient 直接运行在事件循环上，不会阻塞其他请求。
+        :return: pymongo.AsyncMongoClient 实例
+        """
+        if self._async_client is None:
+            self._async_client = pymongo.AsyncMongoClient(self.mongo_uri, **self.client_options)
+        return self._async_client
+
+    @property
+    def analytics_read_preference(self):
+        """分析类查询使用的读偏好"""
+        mode = read_pref_mode_from_name(ANALYTICS_READ_PREFERENCE)
+        return make_read_preference(mode, None)
+
+    def ping(self):
+        """
+        同步健康检查
+        :return: (是否可用, 往返耗时毫秒或错误信息)
+        """
+        start = time.perf_counter()
+        try:
+            self.client.admin.command('ping')
+            return True, round((time.perf_counter() - start) * 1000, 2)
+        except Exception as e:
+            return False, str(e)
+
+    async def ping_async(self):
+        """
+        异步健康检查（供 /health 接口使用）
+        :return: (是否可用, 往返耗时毫秒或错误信息)
+        """
+        start = time.perf_counter()
+        try:
+            await self.async_client.admin.command('ping')
+            return True, round((time.perf_counter() - start) * 1000, 2)
+        except Exception as e:
+            return False, str(e)
+
+    def close(self):
+        """关闭同步客户端（关闭后不可再使用）"""
+        if self._client is not None:
+            self._client.close()
+
+    async def aclose(self):
+        """关闭异步客户端和同步客户端（应用关闭时调用，关闭后不可再使用）"""
+        if self._async_client is not None:
+            await self._async_client.close()
+        self.close()
 
 
 # --- 全局单例 --- 
@@ -77,4 +188,12 @@ MONGO_CLIENT = DbClient()
 # 直接获取数据库对象，供其他模块导入和使用
 # 这样可以确保整个应用共享同一个数据库连接池
 DATABASE = MONGO_CLIENT.client[DB_NAME]
+# 异步数据库对象：所有 async def 路由及其服务层必须使用它，
+# 同步的 DATABASE 仅保留给脚本和同步（def）路由使用
+ASYNC_DATABASE = MONGO_CLIENT.async_client[DB_NAME]
+# 分析类路由（市场价格、负荷曲线）使用的数据库对象，共享同一连接池，只是读偏好不同
+ANALYTICS_DATABASE = MONGO_CLIENT.client.get_database(
+    DB_NAME, read_preference=MONGO_CLIENT.analytics_read_preference)
+ASYNC_ANALYTICS_DATABASE = MONGO_CLIENT.async_client.get_database(
+    DB_NAME, read_preference=MONGO_CLIENT.analytics_read_preference)
 # print(f"Database object '{DB_NAME}' created.") # 已移除此行以减少不必要的输出
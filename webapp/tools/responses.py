@@ -0,0 +1,46 @@
+"""
+JSON 响应类
+
+BSONResponse 基于 orjson，一次编码即可输出包含 MongoDB 原生类型的数据：
+- ObjectId -> 字符串
+- datetime -> ISO 8601 字符串（orjson 原生支持）
+- Decimal128 / Decimal -> 浮点数
+- NaN / Infinity -> null（orjson 默认行为）
+
+作为 FastAPI 的默认响应类（webapp.main）。直接返回 Mongo 文档的路由应 `return BSONResponse(docs)`，
+跳过 FastAPI 的 jsonable_encoder，避免先转换成中间对象再编码的两次遍历。
+"""
+
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from bson import Decimal128, ObjectId
+from fastapi.responses import ORJSONResponse
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def bson_default(obj: Any) -> Any:
+    """orjson 无法原生处理的类型的转换函数"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal128):
+        return float(obj.to_decimal())
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """使用与 BSONResponse 相同规则编码为 JSON 字节串"""
+    return orjson.dumps(content, default=bson_default, option=_ORJSON_OPTIONS)
+
+
+class BSONResponse(ORJSONResponse):
+    """支持 ObjectId / datetime / Decimal128 的 orjson 响应类"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
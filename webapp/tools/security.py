@@ -5,11 +5,12 @@ from typing import Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from starlette.concurrency import run_in_threadpool
 from jose import JWTError, jwt
 from pydantic import BaseModel
 
 # This is a relative import, assuming the mongo tool is in the same 'tools' directory
-from .mongo import DATABASE as db
+from .mongo import ASYNC_DATABASE as db
 
 # --- Password Hashing ---
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -68,16 +69,17 @@ class UserInDB(User):
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 # --- Database & Auth Functions (Moved from main.py) ---
-def get_user(db_session, username: str):
-    user = db_session.users.find_one({"username": username})
+async def get_user(db_session, username: str):
+    user = await db_session.users.find_one({"username": username})
     if user:
         return UserInDB(**user)
 
-def authenticate_user(db_session, username: str, password: str):
-    user = get_user(db_session, username)
+async def authenticate_user(db_session, username: str, password: str):
+    user = await get_user(db_session, username)
     if not user or not user.is_active:
         return False
-    if not verify_password(password, user.hashed_password):
+    # bcrypt 校验是CPU密集操作，放入线程池避免阻塞事件循环
+    if not await run_in_threadpool(verify_password, password, user.hashed_password):
         return False
     return user
 
@@ -106,7 +108,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
     
-    user = get_user(db, username=token_data.username)
+    user = await get_user(db, username=token_data.username)
     
     if user is None:
         raise credentials_exception
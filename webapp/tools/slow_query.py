@@ -0,0 +1,239 @@
+"""
+慢查询记录器
+
+pymongo CommandListener：命令耗时超过阈值时，在后台线程中对同一命令执行 explain（executionStats），
+把计划摘要（COLLSCAN/IXSCAN、扫描文档数 vs 返回文档数等）写入诊断集合 diagnostics_slow_queries，
+供 scripts/slow_query_report.py 汇总排名。
+
+配置（~/.exds/config.ini 的 [DIAGNOSTICS] 节，或 DIAGNOSTICS_<OPTION> 环境变量）：
+- slow_query_enabled: 是否启用，默认 true
+- slow_query_ms: 慢查询阈值（毫秒），默认 200
+
+注意：监听器回调运行在发出命令的线程/事件循环中，不能在其中执行数据库操作，
+因此 explain 和写入都交给后台线程，队列满时直接丢弃，保证不影响业务请求。
+"""
+
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import monitoring
+
+from webapp.tools.metrics import current_route
+
+SLOW_QUERY_COLLECTION = 'diagnostics_slow_queries'
+
+# 可以 explain 的命令
+EXPLAINABLE_COMMANDS = {'find', 'aggregate', 'count', 'distinct', 'update', 'delete', 'findAndModify'}
+# explain 时需要去掉的会话/集群元数据字段
+_COMMAND_META_FIELDS = {'lsid', '$db', '$clusterTime', '$readPreference', 'txnNumber',
+                        'autocommit', 'startTransaction', 'signature', 'apiVersion', 'apiStrict'}
+# 命令快照中保留的字段长度上限，避免超大 pipeline / $in 列表撑爆诊断集合
+_MAX_COMMAND_TEXT = 4000
+
+
+def _get_setting(option, default_value):
+    """环境变量 DIAGNOSTICS_<OPTION> 优先，其次 config.ini 的 [DIAGNOSTICS] 节"""
+    env_value = os.getenv(f'DIAGNOSTICS_{option.upper()}')
+    if env_value is not None:
+        return env_value
+    # 延迟导入，避免与 webapp.tools.mongo 循环依赖
+    from webapp.tools.mongo import get_config
+    return get_config('DIAGNOSTICS', option, default_value=default_value)
+
+
+def query_shape(value: Any) -> Any:
+    """
+    把命令中的字面值替换为 '?'，得到查询形状，用于把同一类查询归并统计
+
+    Args:
+        value: 命令或其中的子文档
+
+    Returns:
+        与原结构相同、叶子值被替换后的对象
+    """
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # $in 等长列表只保留第一个元素的形状
+        return [query_shape(value[0])] if value else []
+    return '?'
+
+
+def _collect_plan(node: Any, stages: List[str], index_names: List[str]):
+    """递归收集执行计划中的阶段名和索引名"""
+    if isinstance(node, dict):
+        stage = node.get('stage')
+        if isinstance(stage, str):
+            stages.append(stage)
+        index_name = node.get('indexName')
+        if isinstance(index_name, str) and index_name not in index_names:
+            index_names.append(index_name)
+        for key, item in node.items():
+            if key in ('rejectedPlans', 'allPlansExecution'):
+                continue
+            _collect_plan(item, stages, index_names)
+    elif isinstance(node, list):
+        for item in node:
+            _collect_plan(item, stages, index_names)
+
+
+def _find_section(explain: Dict[str, Any], name: str) -> Optional[Dict[str, Any]]:
+    """取 explain 结果中的 queryPlanner / executionStats（聚合命令可能位于 stages[0].$cursor 中）"""
+    if name in explain:
+        return explain[name]
+    for stage in explain.get('stages', []):
+        cursor_stage = stage.get('$cursor') if isinstance(stage, dict) else None
+        if cursor_stage and name in cursor_stage:
+            return cursor_stage[name]
+    return None
+
+
+def summarize_explain(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    从 explain 结果中提取计划摘要
+
+    Args:
+        explain: explain 命令的返回值（executionStats 级别）
+
+    Returns:
+        计划摘要字典
+    """
+    stages, index_names = [], []
+    planner = _find_section(explain, 'queryPlanner') or {}
+    _collect_plan(planner.get('winningPlan', {}), stages, index_names)
+
+    stats = _find_section(explain, 'executionStats') or {}
+    docs_examined = stats.get('totalDocsExamined')
+    returned = stats.get('nReturned')
+    return {
+        'plan_stages': stages,
+        'index_names': index_names,
+        'has_collscan': 'COLLSCAN' in stages,
+        'docs_examined': docs_examined,
+        'keys_examined': stats.get('totalKeysExamined'),
+        'n_returned': returned,
+        'execution_time_ms': stats.get('executionTimeMillis'),
+        # 扫描/返回比越大说明索引越差；返回 0 条时按 1 计算
+        'examined_ratio': round(docs_examined / max(returned or 0, 1), 2) if docs_examined is not None else None,
+    }
+
+
+class SlowQueryRecorder(monitoring.CommandListener):
+    """超过阈值的命令自动 explain 并写入诊断集合"""
+
+    def __init__(self, threshold_ms: Optional[float] = None, enabled: Optional[bool] = None, max_queue: int = 1000):
+        self._threshold_ms = threshold_ms
+        self._enabled = enabled
+        self._pending: Dict[Any, Dict[str, Any]] = {}
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        if self._enabled is None:
+            self._enabled = str(_get_setting('slow_query_enabled', 'true')).lower() in ('1', 'true', 'yes', 'on')
+        return self._enabled
+
+    @property
+    def threshold_ms(self) -> float:
+        if self._threshold_ms is None:
+            self._threshold_ms = float(_get_setting('slow_query_ms', 200))
+        return self._threshold_ms
+
+    def started(self, event):
+        if event.command_name not in EXPLAINABLE_COMMANDS or not self.enabled:
+            return
+        self._pending[(event.connection_id, event.request_id)] = {
+            'database': event.database_name,
+            'command': dict(event.command),
+            'route': current_route(),
+        }
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.threshold_ms:
+            return
+
+        pending['duration_ms'] = round(duration_ms, 2)
+        pending['command_name'] = event.command_name
+        pending['timestamp'] = datetime.now()
+        try:
+            self._queue.put_nowait(pending)
+        except queue.Full:
+            return
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='slow-query-recorder', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        # 后台线程使用同步客户端；explain 和 insert 不在 EXPLAINABLE_COMMANDS 中，不会被再次记录
+        from webapp.tools.mongo import MONGO_CLIENT
+        client = MONGO_CLIENT.client
+        while True:
+            item = self._queue.get()
+            try:
+                self.record(client, item)
+            except Exception as e:
+                print(f"记录慢查询失败: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def record(self, client, item: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        对慢命令执行 explain 并写入诊断集合
+
+        Args:
+            client: pymongo.MongoClient
+            item: started/succeeded 事件中收集的命令信息
+
+        Returns:
+            写入的诊断文档
+        """
+        command = {key: value for key, value in item['command'].items() if key not in _COMMAND_META_FIELDS}
+        command_name = item['command_name']
+        collection = command.get(command_name)
+        database = client[item['database']]
+
+        doc = {
+            'timestamp': item['timestamp'],
+            'route': item['route'],
+            'database': item['database'],
+            'collection': collection if isinstance(collection, str) else '',
+            'command_name': command_name,
+            'duration_ms': item['duration_ms'],
+            'shape': json.dumps(query_shape(command), ensure_ascii=False, sort_keys=True),
+            'command': json.dumps(command, ensure_ascii=False, default=str)[:_MAX_COMMAND_TEXT],
+        }
+        try:
+            explain = database.command({'explain': command, 'verbosity': 'executionStats'})
+            doc.update(summarize_explain(explain))
+        except Exception as e:
+            doc['explain_error'] = str(e)
+
+        from webapp.tools.mongo import DB_NAME
+        client[DB_NAME][SLOW_QUERY_COLLECTION].insert_one(doc)
+        return doc
+
+
+# 全局记录器实例，由 webapp.tools.mongo 在创建客户端时注册
+slow_query_recorder = SlowQueryRecorder()
@@ -0,0 +1,138 @@
+"""
+表格数据流式导出（CSV / Parquet）
+
+从 Mongo 游标逐批读取文档并编码为字节块，供 StreamingResponse 直接下发：
+- 每批最多 EXPORT_BATCH_ROWS 行，编码后立即释放，内存占用与导出区间大小无关
+- CSV：首行为字段名，datetime 输出为 "YYYY-MM-DD HH:MM:SS"，缺失值为空
+- Parquet：每批写成一个行组（row group），写入器的输出随写随取，最后补写文件尾
+
+Parquet 依赖 pyarrow（可选依赖），未安装时 PARQUET_AVAILABLE 为 False。
+"""
+
+import csv
+import io
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow 为可选依赖，未安装时只提供 CSV 导出
+    pa = None
+    pq = None
+
+PARQUET_AVAILABLE = pa is not None
+
+# 每批编码的行数
+EXPORT_BATCH_ROWS = 10000
+
+# 字段类型：'datetime' / 'string' / 'int' / 'float'
+FieldTypes = Dict[str, str]
+
+
+def _batches(docs: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+def stream_csv(docs: Iterable[Dict[str, Any]], fields: List[str],
+               batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[bytes]:
+    """
+    把文档流编码为 CSV 字节块
+
+    Args:
+        docs: 文档迭代器（通常为 Mongo 游标）
+        fields: 输出的字段及顺序
+        batch_rows: 每块包含的行数
+
+    Returns:
+        UTF-8 编码的 CSV 字节块生成器
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    yield buffer.getvalue().encode('utf-8')
+
+    for batch in _batches(docs, batch_rows):
+        buffer.seek(0)
+        buffer.truncate(0)
+        writer.writerows([_csv_value(doc.get(field)) for field in fields] for doc in batch)
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkSink:
+    """Parquet 写入器的输出端：记录已写入的总字节数（写入器据此计算偏移），缓存的数据由调用方取走"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _arrow_schema(fields: List[str], types: FieldTypes):
+    arrow_types = {'datetime': pa.timestamp('ms'), 'string': pa.string(), 'int': pa.int64(), 'float': pa.float64()}
+    return pa.schema([(field, arrow_types[types.get(field, 'string')]) for field in fields])
+
+
+def stream_parquet(docs: Iterable[Dict[str, Any]], fields: List[str], types: FieldTypes,
+                   batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[bytes]:
+    """
+    把文档流编码为 Parquet 字节块（每批一个行组）
+
+    Args:
+        docs: 文档迭代器（通常为 Mongo 游标）
+        fields: 输出的字段及顺序
+        types: 字段类型，未声明的字段按字符串处理
+        batch_rows: 每个行组的行数
+
+    Returns:
+        Parquet 文件的字节块生成器
+    """
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("未安装 pyarrow，无法导出 Parquet")
+    schema = _arrow_schema(fields, types)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema, compression='snappy')
+    try:
+        for batch in _batches(docs, batch_rows):
+            columns = [[doc.get(field) for doc in batch] for field in fields]
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=schema.field(i).type) for i, column in enumerate(columns)], schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
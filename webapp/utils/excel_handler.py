@@ -8,10 +8,6 @@ import pandas as pd
 import io
 from datetime import datetime
 from typing import List, Dict, Any, Tuple, Optional
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from tools.mongo import DATABASE
 from bson import ObjectId
 
 
@@ -236,7 +232,7 @@ class DataValidator:
 
         return errors
 
-    def validate_related_data(self, row_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def validate_related_data(self, row_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         校验关联数据存在性
 
@@ -251,14 +247,14 @@ class DataValidator:
 
         # 校验套餐存在性
         if row_data['套餐']:
-            package = self.db.retail_packages.find_one({
+            package = await self.db.retail_packages.find_one({
                 "package_name": {"$regex": row_data['套餐'], "$options": "i"},
                 "status": "active"
             })
 
             if not package:
                 # 尝试精确匹配
-                exact_package = self.db.retail_packages.find_one({
+                exact_package = await self.db.retail_packages.find_one({
                     "package_name": row_data['套餐'],
                     "status": "active"
                 })
@@ -274,14 +270,14 @@ class DataValidator:
 
         # 校验客户存在性
         if row_data['购买用户']:
-            customer = self.db.customers.find_one({
+            customer = await self.db.customers.find_one({
                 "user_name": row_data['购买用户'],
                 "status": "active"
             })
 
             if not customer:
                 # 尝试使用company_name字段
-                customer = self.db.customers.find_one({
+                customer = await self.db.customers.find_one({
                     "company_name": row_data['购买用户'],
                     "status": "active"
                 })
@@ -342,7 +338,7 @@ class DataValidator:
 
         return errors
 
-    def validate_contract_uniqueness(self, customer_id: str, start_date: datetime,
+    async def validate_contract_uniqueness(self, customer_id: str, start_date: datetime,
                                    end_date: datetime, row_number: int) -> List[Dict[str, Any]]:
         """
         校验合同唯一性（同一客户在相同时间段不能有重复合同）
@@ -369,7 +365,7 @@ class DataValidator:
             ]
         }
 
-        existing_contract = self.db.retail_contracts.find_one(query)
+        existing_contract = await self.db.retail_contracts.find_one(query)
 
         if existing_contract:
             contract_name = existing_contract.get('contract_name', '未知合同')
@@ -390,7 +386,7 @@ class ContractDataTransformer:
     def __init__(self, db):
         self.db = db
 
-    def transform_row_to_contract(self, row_data: Dict[str, Any], operator: str) -> Dict[str, Any]:
+    async def transform_row_to_contract(self, row_data: Dict[str, Any], operator: str) -> Dict[str, Any]:
         """
         将Excel行数据转换为合同数据格式
 
@@ -420,7 +416,7 @@ class ContractDataTransformer:
         )
 
         # 3. 查询关联数据ID
-        package = self.db.retail_packages.find_one({
+        package = await self.db.retail_packages.find_one({
             "package_name": {"$regex": row_data['套餐'], "$options": "i"},
             "status": "active"
         })
@@ -430,14 +426,14 @@ class ContractDataTransformer:
 
         contract_data['package_id'] = str(package['_id'])
 
-        customer = self.db.customers.find_one({
+        customer = await self.db.customers.find_one({
             "user_name": row_data['购买用户'],
             "status": "active"
         })
 
         if not customer:
             # 尝试使用company_name字段
-            customer = self.db.customers.find_one({
+            customer = await self.db.customers.find_one({
                 "company_name": row_data['购买用户'],
                 "status": "active"
             })
@@ -448,7 +444,7 @@ class ContractDataTransformer:
         contract_data['customer_id'] = str(customer['_id'])
 
         # 4. 生成合同名称
-        contract_data['contract_name'] = self._generate_contract_name(
+        contract_data['contract_name'] = await self._generate_contract_name(
             contract_data['customer_id'],
             contract_data['purchase_start_month']
         )
@@ -464,7 +460,7 @@ class ContractDataTransformer:
 
         return contract_data
 
-    def _generate_contract_name(self, customer_id: str, purchase_start_month: datetime) -> str:
+    async def _generate_contract_name(self, customer_id: str, purchase_start_month: datetime) -> str:
         """
         自动生成合同名称
 
@@ -476,7 +472,7 @@ class ContractDataTransformer:
             str: 生成的合同名称
         """
         # 获取客户信息
-        customer = self.db.customers.find_one({
+        customer = await self.db.customers.find_one({
             "_id": ObjectId(customer_id),
             "status": "active"
         })